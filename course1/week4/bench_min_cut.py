@@ -0,0 +1,84 @@
+#!/Users/kcolletti1/opt/anaconda3/bin/python3
+
+'''
+   run from command line with either
+   $ python bench_min_cut.py [num_verts ...]
+   $ ./bench_min_cut.py [num_verts ...]
+   if no sizes are given, graphs of 25, 50, 100, 200 and 400 vertices are used by default
+
+   This code compares the min cut engines of Graph on random graphs of increasing size, to help
+   pick an engine by graph size. Each graph is two dense random halves joined by a few random
+   edges (a planted cut, which is the min cut as long as every vertex has more edges than that),
+   with about the same density as kargerMinCut.txt. For every graph we time the deterministic
+   Stoer-Wagner algorithm, ~log(n)^2 runs of Karger-Stein, and Karger's algorithm run until we
+   are 99% sure of the answer (or for at most time_budget seconds, reporting how sure we got).
+'''
+
+from graph import Graph
+import numpy as np
+from numpy import random as nprand
+import sys
+import time
+
+
+def random_cut_graph(num_verts, degree=25, num_crossing=5):
+    ''' Return a Graph of two random halves of num_verts, joined by num_crossing edges. '''
+    half = num_verts // 2
+    adj = {v: set() for v in range(1, num_verts + 1)}
+    for lo, hi in [(1, half), (half + 1, num_verts)]:
+        size = hi - lo + 1
+        for v in range(lo, hi + 1):
+            for u in nprand.choice(size, min(degree // 2, size - 1), replace=False) + lo:
+                if u != v:
+                    adj[v].add(int(u))
+                    adj[int(u)].add(v)
+    for _ in range(num_crossing):
+        v, u = nprand.randint(1, half + 1), nprand.randint(half + 1, num_verts + 1)
+        adj[v].add(u)
+        adj[u].add(v)
+
+    graph = Graph()
+    for v in adj:
+        graph.add_vertex(v, sorted(adj[v]))
+    return graph
+
+
+def main():
+    nprand.seed(1)
+    sizes = [int(n) for n in sys.argv[1:]] or [25, 50, 100, 200, 400]
+    time_budget = 30
+
+    print('\n {0:>6} {1:>7}  {2:<14} {3:>5} {4:>10}  {5}'.format(
+          'verts', 'edges', 'engine', 'cut', 'seconds', 'notes'))
+    for num_verts in sizes:
+        graph = random_cut_graph(num_verts)
+        runs = []
+
+        t0 = time.time()
+        min_cut, _ = graph.find_min_cut_stoer_wagner()
+        runs.append(['Stoer-Wagner', min_cut, time.time() - t0, 'exact'])
+
+        t0 = time.time()
+        sample_size = int(np.ceil(np.log2(num_verts)**2))
+        min_cut, _ = graph.find_min_cut_karger_stein(sample_size)
+        runs.append(['Karger-Stein', min_cut, time.time() - t0, '{0} runs'.format(sample_size)])
+
+        t0 = time.time()
+        min_cut, _, stats = graph.find_min_cut_parallel(failure_prob=0.01, time_budget=time_budget,
+                                                        seed=1)
+        runs.append(['Karger', min_cut, time.time() - t0, '{0} trials, {1:.4f} sure'.format(
+                     stats['trials'], stats['confidence'])])
+
+        for engine, min_cut, total, notes in runs:
+            print(' {0:>6} {1:>7}  {2:<14} {3:>5} {4:>10.4f}  {5}'.format(
+                  num_verts, graph.num_edges, engine, min_cut, total, notes))
+
+
+if __name__ == "__main__":
+    t0 = time.time()
+    main()
+    t1 = time.time()
+
+    print('\n This code ran in {0:.5f} seconds.\n'.format(t1 - t0))
+
+    raise SystemExit
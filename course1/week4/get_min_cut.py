@@ -4,6 +4,7 @@
 from graph import Graph
 import numpy as np
 from numpy import random as nprand
+import sys
 import time
 
 
@@ -11,12 +12,47 @@ def main():
     randseed = nprand.randint(1,10000)
     nprand.seed(randseed)
 
+    if len(sys.argv) < 2:
+        alg_choice = 'K'  # default to Karger's algorithm
+    else:
+        alg_choice = sys.argv[1]
+    if alg_choice not in ['K', 'KP', 'KS', 'SW']:
+        print('\n Usage: get_min_cut.py [alg_choice [num_workers]], where alg_choice is K (default),',
+              'KP (Karger trials in parallel), KS (Karger-Stein) or SW (Stoer-Wagner, deterministic)\n')
+        return
+
     test_graph = Graph()
     with open('kargerMinCut.txt') as graph_info:
         for graph_line in graph_info:
             graph_line = [int(v) for v in graph_line.strip().split('\t')]
             test_graph.add_vertex(graph_line[0], graph_line[1:])
 
+    if alg_choice == 'KS':
+        # ~log(n)^2 runs of Karger-Stein are enough, rather than ~n^2 * log(n) runs of Karger's
+        sample_size = int(np.ceil(np.log2(test_graph.num_verts)**2))
+        min_cut, (cut_a, cut_b) = test_graph.find_min_cut_karger_stein(sample_size)
+        print('\n The min cut found by this algorithm is:', min_cut,
+              'from a sample size of', sample_size, 'Karger-Stein runs')
+        print('\nvertices in min cut groups:\n', sorted(cut_a), '\nand\n', sorted(cut_b), '\n')
+        return
+
+    if alg_choice == 'SW':
+        min_cut, (cut_a, cut_b) = test_graph.find_min_cut_stoer_wagner()
+        print('\n The min cut found by the Stoer-Wagner algorithm is:', min_cut)
+        print('\nvertices in min cut groups:\n', sorted(cut_a), '\nand\n', sorted(cut_b), '\n')
+        return
+
+    if alg_choice == 'KP':
+        # run trials until we are 99% sure we've seen the min cut, or for at most 1 minute
+        num_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+        min_cut, (cut_a, cut_b), stats = test_graph.find_min_cut_parallel(
+            failure_prob=0.01, time_budget=60, num_workers=num_workers, seed=randseed)
+        print('\n The min cut found by this algorithm is:', min_cut, 'seen', stats['times_seen'],
+              'times in', stats['trials'], 'trials ({0:.0f} trials/sec)'.format(stats['trials_per_sec']))
+        print('\n Chance that this is the min cut is at least {0:.4f}'.format(stats['confidence']))
+        print('\nvertices in min cut groups:\n', sorted(cut_a), '\nand\n', sorted(cut_b), '\n')
+        return
+
     sample_size_ideal = int(test_graph.num_verts**2 * np.log2(test_graph.num_verts))
     sample_size = 2200
 
@@ -35,7 +71,6 @@ def main():
 
     print('\n The min cut found by this algorithm is:', min_cut,
           'from a sample size of', sample_size)
-    #print('\nvertices in min cut groups:\n', cut_a, '\nand\n', cut_b, '\n')  # not yet implemented
 
 
 if __name__ == "__main__":
@@ -5,11 +5,244 @@
     two vertices can be merged into one, picking one of them to keep
     and moving all edges connected to the other over to the one we
     are keeping (deleting any self-loops). Karger's randomized contraction
-    algorithm is also implemented to find a minimum cut of a graph.
+    algorithm is also implemented to find a minimum cut of a graph, along
+    with the Karger-Stein recursive version of it, which shares the early
+    contractions (that rarely go wrong) between many runs of the later ones.
+    For an answer with no chance of being wrong, the deterministic
+    Stoer-Wagner min cut algorithm is implemented as well.
 '''
 
+from array import array
+from collections import deque
 from copy import deepcopy as dcopy
+from heap import IndexedMaxHeap
+from multiprocessing import Pool
+import numpy as np
 from numpy import random as nprand
+import time
+
+
+def karger_trial(tails, heads, num_verts, rng=nprand):
+    '''
+        One run of Karger's contraction algorithm on the graph with verts 0..num_verts-1 and edges
+        (tails[i], heads[i]), without copying or rewriting any graph. Picking a uniformally random
+        edge that isn't a self-loop, over and over, is the same as going through the edges in one
+        random order (a random permutation) and skipping the ones that have become self-loops, just
+        like kruskal's algo. So the merged verts are tracked with a disjoint set (union-find) kept
+        in flat typed arrays (parent pointers with path halving, union by size), stopping once
+        there are only two groups left. The crossing edges are then counted in one vectorized pass.
+        Runs in O(m alpha(n)) time. The random order comes from rng (numpy's global random state
+        unless given a Generator). Return the tuple (number of crossing edges, boolean array of the
+        verts on the same side of the cut as vert 0).
+    '''
+    parent = array('q', range(num_verts))
+    size = array('q', [1]) * num_verts
+    edge_tails, edge_heads = tails.tolist(), heads.tolist()
+    num_groups = num_verts
+
+    for edge in rng.permutation(len(edge_tails)).tolist():
+        if num_groups <= 2:
+            break
+        leader1, leader2 = edge_tails[edge], edge_heads[edge]
+        while parent[leader1] != leader1:
+            parent[leader1] = parent[parent[leader1]]
+            leader1 = parent[leader1]
+        while parent[leader2] != leader2:
+            parent[leader2] = parent[parent[leader2]]
+            leader2 = parent[leader2]
+        if leader1 == leader2:  # this edge is a self-loop now, skip it
+            continue
+
+        # merge the two groups, pointing the leader of the smaller one at the larger one
+        if size[leader1] < size[leader2]:
+            leader1, leader2 = leader2, leader1
+        parent[leader2] = leader1
+        size[leader1] += size[leader2]
+        num_groups -= 1
+
+    # point every vert straight at its leader, all at once
+    leaders = np.frombuffer(parent, dtype=np.int64).copy()
+    while True:
+        next_leaders = leaders[leaders]
+        if (next_leaders == leaders).all():
+            break
+        leaders = next_leaders
+
+    side_a = leaders == leaders[0]
+    return int(np.count_nonzero(side_a[tails] != side_a[heads])), side_a
+
+
+# globals for the worker processes of Graph.find_min_cut_parallel, set by init_karger_worker
+karger_tails = karger_heads = None
+karger_num_verts = 0
+
+
+def init_karger_worker(tails, heads, num_verts):
+    ''' Pool initializer, keep the flat edge arrays of the graph for every trial. '''
+    global karger_tails, karger_heads, karger_num_verts
+    karger_tails, karger_heads, karger_num_verts = tails, heads, num_verts
+
+
+def karger_worker_batch(task):
+    '''
+        Run a batch of karger_trial runs, given as (seed, batch number, number of trials). Each
+        batch draws from its own random stream, seeded by both the seed and the batch number,
+        so the same batch always gives the same cuts no matter which worker runs it, or when.
+        Return the tuple (batch number, min cut found, times it was found, its side of vert 0).
+    '''
+    seed, batch, num_trials = task
+    rng = nprand.default_rng([seed, batch])
+    min_cut, times_seen, min_side = float('inf'), 0, None
+    for _ in range(num_trials):
+        cut, side_a = karger_trial(karger_tails, karger_heads, karger_num_verts, rng)
+        if cut < min_cut:
+            min_cut, times_seen, min_side = cut, 1, side_a
+        elif cut == min_cut:
+            times_seen += 1
+    return batch, min_cut, times_seen, min_side
+
+
+def contract_edges(tails, heads, weights, num_verts, num_left):
+    '''
+        Run Karger's contraction on the graph with verts 0..num_verts-1 and edges (tails[i],
+        heads[i]) standing in for weights[i] parallel edges, until only num_left verts are left
+        (or no edges, if the graph isn't connected). Rather than copying and rewriting a Graph
+        object, each vert just has a label (the merged vert it now belongs to) and the list of
+        the verts it holds, and the smaller group is relabelled on every merge. Edges are picked
+        with probability proportional to their weight; ones that have become self-loops are
+        just skipped, which still picks each remaining parallel edge with equal probability.
+        Return the tuple (tails, heads, weights, groups) of the contracted graph with its verts
+        renumbered 0..k-1 and parallel edges merged again, groups[i] being the verts in vert i.
+    '''
+    label = list(range(num_verts))
+    groups = [[v] for v in range(num_verts)]
+    cum_weights = np.cumsum(weights)
+    edge_tails, edge_heads = tails.tolist(), heads.tolist()
+
+    while num_verts > num_left:
+        # pick a batch of uniformally distributed random (parallel) edges at once
+        num_merged = 0
+        picks = np.searchsorted(cum_weights, nprand.random_sample(2*(num_verts - num_left) + 8)
+                                * cum_weights[-1], side='right')
+        for edge in picks.tolist():
+            v1, v2 = label[edge_tails[edge]], label[edge_heads[edge]]
+            if v1 == v2:  # this is a self-loop now, skip it
+                continue
+
+            # merge the two verts, moving the smaller group over onto the larger one
+            if len(groups[v1]) < len(groups[v2]):
+                v1, v2 = v2, v1
+            for v in groups[v2]:
+                label[v] = v1
+            groups[v1] += groups[v2]
+            groups[v2] = None
+            num_verts -= 1
+            num_merged += 1
+            if num_verts == num_left:
+                break
+
+        if num_merged == 0:  # could just be unlucky, or every edge left could be a self-loop
+            label_arr = np.array(label)
+            if not (label_arr[tails] != label_arr[heads]).any():
+                break
+
+    # renumber the verts that are left 0..k-1, dropping self-loops and merging parallel edges
+    label = np.array(label)
+    left = np.unique(label)
+    new_tails = np.searchsorted(left, label[tails])
+    new_heads = np.searchsorted(left, label[heads])
+    keep = new_tails != new_heads
+    edge_keys = np.minimum(new_tails, new_heads)[keep]*len(left) + np.maximum(new_tails, new_heads)[keep]
+    edge_keys, edge_ind = np.unique(edge_keys, return_inverse=True)
+    new_weights = np.bincount(edge_ind, weights=weights[keep]).astype(np.int64)
+    return edge_keys // len(left), edge_keys % len(left), new_weights, [groups[v] for v in left]
+
+
+def stoer_wagner_cut(tails, heads, weights, num_verts):
+    '''
+        Find the min cut of the graph with verts 0..num_verts-1 and undirected edges (tails[i],
+        heads[i]) of weight weights[i] with the deterministic Stoer-Wagner algorithm. Each phase
+        orders the verts by maximum adjacency: starting from any vert, keep adding the vert with
+        the most edge weight into the verts added so far (an indexed max heap keyed on that weight,
+        raised as each vert is added). The weight into the last vert t is then the min cut between
+        it and the one added before it, s (the cut of the phase), and any cut that doesn't split s
+        and t is still there after merging t into s. So after n-1 phases, the smallest cut of the
+        phase is the min cut. Runs in O(n m log(n)) time. Return the tuple (weight of crossing
+        edges, list of the verts on one side of the cut).
+    '''
+    # merge parallel edges, and keep the weights between neighbors in a dict for each vert
+    adj = [{} for _ in range(num_verts)]
+    for v1, v2, weight in zip(tails.tolist(), heads.tolist(), weights.tolist()):
+        if v1 != v2:
+            adj[v1][v2] = adj[v1].get(v2, 0) + weight
+            adj[v2][v1] = adj[v2].get(v1, 0) + weight
+    groups = [[v] for v in range(num_verts)]
+    verts_left = list(range(num_verts))
+    heap = IndexedMaxHeap()
+    min_cut, cut_a = float('inf'), None
+
+    while len(verts_left) > 1:
+        heap.heapify(verts_left, [0] * len(verts_left))
+        s = t = None
+        while heap.size > 0:
+            s = t
+            t, cut_of_phase = heap.extract_max()
+            for v, weight in adj[t].items():
+                if v in heap:
+                    heap.increase_key(v, heap.get_key(v) + weight)
+
+        if cut_of_phase < min_cut:
+            min_cut, cut_a = cut_of_phase, list(groups[t])
+
+        # merge t into s, adding up the weights of the edges they both had to the same vert
+        for v, weight in adj[t].items():
+            del adj[v][t]
+            if v != s:
+                adj[s][v] = adj[s].get(v, 0) + weight
+                adj[v][s] = adj[v].get(s, 0) + weight
+        adj[t] = None
+        groups[s] += groups[t]
+        verts_left.remove(t)
+
+    return min_cut, cut_a
+
+
+def brute_force_cut(tails, heads, weights, num_verts):
+    '''
+        Find the min cut of a small graph with verts 0..num_verts-1 (and edge weights, see
+        contract_edges) by checking every way to split its verts in two (vert num_verts-1 always
+        on side 0). Return the tuple (weight of crossing edges, list of the verts on side 1).
+    '''
+    masks = np.arange(1, 2**(num_verts - 1))[:, None]  # bit v of mask is the side of vert v
+    crossing = (((masks >> tails) & 1) != ((masks >> heads) & 1)) @ weights
+    best = int(np.argmin(crossing))
+    return int(crossing[best]), [v for v in range(num_verts) if (int(masks[best, 0]) >> v) & 1]
+
+
+def karger_stein_cut(tails, heads, weights, num_verts):
+    '''
+        One run of the Karger-Stein algorithm on the graph with verts 0..num_verts-1 (and edge
+        weights, see contract_edges). The first contractions are unlikely to merge across the
+        min cut, most mistakes happen at the very end, so contract down to ~num_verts/sqrt(2)
+        verts just once (still keeping the min cut with probability ~1/2), and recurse twice
+        from there, only repeating the riskier later contractions. Graphs of up to 10 verts are
+        solved by brute force. Return the tuple (weight of crossing edges, list of the verts on
+        one side of the cut).
+    '''
+    if len(tails) == 0:  # no edges between any of the verts left, the graph isn't connected
+        return 0, [0]
+    if num_verts <= 10:
+        return brute_force_cut(tails, heads, weights, num_verts)
+
+    num_left = int(np.ceil(1 + num_verts / np.sqrt(2)))
+    min_cut, cut_a = float('inf'), None
+    for _ in range(2):
+        sub_tails, sub_heads, sub_weights, groups = contract_edges(tails, heads, weights,
+                                                                   num_verts, num_left)
+        sub_cut, sub_a = karger_stein_cut(sub_tails, sub_heads, sub_weights, len(groups))
+        if sub_cut < min_cut:
+            min_cut, cut_a = sub_cut, [v for sub_v in sub_a for v in groups[sub_v]]
+    return min_cut, cut_a
 
 
 class Graph:
@@ -105,37 +338,150 @@ class Graph:
         self.vertices.pop(source)
 
 
-    def __find_cut__(self, g) -> int: #(int, (set,set)):
+    def __edge_arrays__(self):
         '''
-            Helper function to find_min_cut. This function actually implements
-            one iteration of Karger's contraction algorithm.
+            Helper function for the min cut algos, to number the verts 0..n-1 and lay out the
+            edges as flat arrays of their two endpoints. Return the tuple (list of the verts,
+            array of the edge tails, array of the edge heads).
         '''
-        while g.num_verts > 2:
-            # pick a uniformally distributed random edge from edges remaining
-            rand_edge = list(g.edges)[nprand.randint(0, g.num_edges)]
-            # merge the two vertices that this edge connects
-            g.merge_vertices(rand_edge)
- 
-        # return the number of crossing edges by the cut found using this algorithm
-        return g.num_edges
- 
- 
+        verts = list(self.vertices)
+        vert_ids = {v: i for i, v in enumerate(verts)}
+        tails = np.array([vert_ids[v1] for v1, _ in self.edges.values()], dtype=np.int64)
+        heads = np.array([vert_ids[v2] for _, v2 in self.edges.values()], dtype=np.int64)
+        return verts, tails, heads
+
+
     def find_min_cut(self, sample_size=10) -> int:
         '''
             Use Karger's randomized algorithm to contract vertices on a graph
             until there are only two left to find a cut. This function takes a
             graph as input, and outputs the minimum number of crossing vertices.
             If we use a large enough sample size (~ n^2 * log(n)), it is statistically
-            very unlikely that the answer given from this algorithm is wrong.
+            very unlikely that the answer given from this algorithm is wrong. The graph
+            is turned into flat arrays of edges once, and each run is a single pass over
+            a random permutation of them (see karger_trial), with no copy of the graph.
         '''
+        verts, tails, heads = self.__edge_arrays__()
         min_cut = float('inf')
- 
+
         for _ in range(sample_size):
-            min_cut_sample = self.__find_cut__(g=self.copy())  # run iteration on deep copy of the graph
-            #(min_cut_sample, (cut_a, cut_b)) = find_cut(test_graph.copy())
+            min_cut_sample, _ = karger_trial(tails, heads, len(verts))
             if min_cut_sample < min_cut:
                 min_cut = min_cut_sample
- 
+
         return min_cut
 
 
+    def find_min_cut_karger_stein(self, sample_size=None):
+        '''
+            Use the Karger-Stein recursive contraction algorithm (see karger_stein_cut) to find
+            a min cut of the graph. Each run finds the min cut with probability ~1/log(n), rather
+            than ~1/n^2 for one of Karger's runs, so a sample size of ~log(n)^2 runs (the default)
+            is already very unlikely to give a wrong answer, instead of ~n^2 * log(n). The graph
+            is turned into flat arrays of edges once, and never copied. Return the tuple (min number
+            of crossing edges, (set of verts on one side of the cut, set of verts on the other)).
+        '''
+        verts, tails, heads = self.__edge_arrays__()
+        weights = np.ones(len(tails), dtype=np.int64)
+        if sample_size is None:
+            sample_size = int(np.ceil(np.log2(max(len(verts), 2))**2))
+
+        min_cut, cut_a = float('inf'), None
+        for _ in range(sample_size):
+            min_cut_sample, sample_a = karger_stein_cut(tails, heads, weights, len(verts))
+            if min_cut_sample < min_cut:
+                min_cut, cut_a = min_cut_sample, sample_a
+
+        cut_a = {verts[v] for v in cut_a}
+        return min_cut, (cut_a, set(verts) - cut_a)
+
+
+    def find_min_cut_stoer_wagner(self):
+        '''
+            Use the deterministic Stoer-Wagner algorithm (see stoer_wagner_cut) to find a min
+            cut of the graph, with no chance of a wrong answer. Return the tuple (min number of
+            crossing edges, (set of verts on one side of the cut, set of verts on the other)).
+        '''
+        verts, tails, heads = self.__edge_arrays__()
+        if len(verts) < 2:
+            return 0, (set(verts), set())
+        min_cut, cut_a = stoer_wagner_cut(tails, heads, np.ones(len(tails), dtype=np.int64),
+                                          len(verts))
+        cut_a = {verts[v] for v in cut_a}
+        return min_cut, (cut_a, set(verts) - cut_a)
+
+
+    def find_min_cut_parallel(self, failure_prob=0.01, time_budget=None, num_workers=4, seed=None,
+                              batch_size=500):
+        '''
+            Run Karger's algorithm (see karger_trial) over a pool of num_workers processes, in
+            batches of batch_size trials, until the chance that none of the trials found a min cut
+            is at most failure_prob, or time_budget seconds have gone by (whichever comes first).
+            Either one can be None, to only stop on the other (but not both, which raises a
+            ValueError). A single trial finds a given min cut with probability at least
+            2/(n(n-1)), so after T trials we've missed it with probability at most
+            (1 - 2/(n(n-1)))^T. At least one batch is always run, and time_budget is only checked
+            between batches (no new batch is handed out once it is up, and we stop waiting on the
+            ones still running), so a run can go over it by up to a batch's worth of time: for big
+            graphs, pick a batch_size that takes well under time_budget. Each batch has its
+            own random stream seeded from seed and its batch number, so with the same seed the same
+            trials give the same answer (batches are combined in order, not as they finish). Return
+            the tuple (min number of crossing edges, (set of verts on one side, set on the other),
+            dict of stats: trials run, seconds, trials per second, times the min cut was found, and
+            the confidence 1 - (chance of having missed the min cut in that many trials)).
+        '''
+        if failure_prob is None and time_budget is None:
+            raise ValueError('Warning: need a failure_prob or a time_budget to know when to stop')
+        verts, tails, heads = self.__edge_arrays__()
+        if len(verts) <= 2:  # there's only the one cut, no need for any trials
+            cut_a = set(verts[:1])
+            stats = {'trials': 0, 'seconds': 0, 'trials_per_sec': 0, 'times_seen': 1,
+                     'confidence': 1}
+            return int(np.count_nonzero(tails != heads)), (cut_a, set(verts) - cut_a), stats
+
+        if seed is None:
+            seed = int(nprand.randint(2**31))
+        success_prob = 2 / (len(verts) * (len(verts) - 1))
+        if failure_prob is not None and failure_prob > 0:
+            trials_needed = int(np.ceil(np.log(failure_prob) / np.log1p(-success_prob)))
+            num_batches = max(-(-trials_needed // batch_size), 1)
+        elif time_budget is None:
+            raise ValueError('Warning: failure_prob {0} can never be reached without a time_budget'
+                             .format(failure_prob))
+        else:  # no chance of failing is good enough, so only stop once time is up
+            num_batches = float('inf')
+
+        t0 = time.time()
+        results = {}
+        # only keep a couple of batches per worker queued up, so we can stop right on time
+        with Pool(num_workers, initializer=init_karger_worker,
+                  initargs=(tails, heads, len(verts))) as pool:
+            pending = deque()
+            next_batch = 0
+            while next_batch < num_batches or pending:
+                out_of_time = time_budget is not None and time.time() - t0 > time_budget
+                while (next_batch < num_batches and len(pending) < 2*num_workers
+                       and not (out_of_time and next_batch > 0)):
+                    pending.append(pool.apply_async(karger_worker_batch,
+                                                    ((seed, next_batch, batch_size),)))
+                    next_batch += 1
+                batch, min_cut, times_seen, min_side = pending.popleft().get()
+                results[batch] = (min_cut, times_seen, min_side)
+                if time_budget is not None and time.time() - t0 > time_budget:
+                    break
+        total = time.time() - t0
+
+        min_cut, times_seen, min_side = float('inf'), 0, None
+        for batch in sorted(results):
+            if results[batch][0] < min_cut:
+                min_cut, times_seen, min_side = results[batch]
+            elif results[batch][0] == min_cut:
+                times_seen += results[batch][1]
+
+        trials = len(results) * batch_size
+        cut_a = {v for v, side in zip(verts, min_side) if side}
+        stats = {'trials': trials, 'seconds': total, 'trials_per_sec': trials / total,
+                 'times_seen': times_seen, 'confidence': 1 - (1 - success_prob)**trials}
+        return min_cut, (cut_a, set(verts) - cut_a), stats
+
+
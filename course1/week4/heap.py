@@ -0,0 +1,261 @@
+'''
+    my implementation of an indexed d-ary heap (the same one as in the heap.py of the other weeks),
+    used as a max heap for the maximum adjacency ordering in the Stoer-Wagner min cut algorithm.
+    every item is an id (i.e. a vertex number) with a key, and a dict from id to position in the
+    heap gives O(1) lookups of an item's key or position, and O(log(n)) increase-key without any
+    delete and re-insert.
+'''
+
+class IndexedMinHeap:
+    '''
+       Indexed d-ary min heap. Rather than storing the values themselves (and needing every value
+       to carry its own id, like .vert or .char_val, to be found again), every item is an id (any
+       hashable, i.e. a vertex) with a key (i.e. its path len), kept in two parallel lists in heap
+       order, along with a dict of {id: index in heap} for O(1) find and O(log(n)) decrease key.
+       Each node has arity children (2, 4 or 8 make sense): a wider heap is shallower, so sifting
+       up (insert, decrease key) passes through fewer levels, while sifting down (extract min) has
+       to compare more children on each level. Dijkstra/Prim do many more decrease keys than
+       extract mins, which favors a wider heap, though in python the arities end up within a few
+       percent of each other (see course2/week2/bench_dijkstra.py). Sifting moves the item being
+       sifted into place once at the end, instead of swapping it at every level.
+    '''
+    def __init__(self, arity=2):
+        if arity < 2:
+            raise ValueError('Warning: heap arity must be at least 2, not {0}'.format(arity))
+        self.arity = arity
+        self.keys = []  # key of the item at each index of the heap
+        self.ids = []   # id of the item at each index of the heap
+        self.pos = {}   # dict of {item id: index in heap}
+        self.size = 0
+
+
+    def __len__(self): return self.size
+
+    def __contains__(self, item_id): return item_id in self.pos
+
+
+    def __sift_up__(self, i):
+        '''
+           Move the item at index i up the heap tree until its parent's key is no larger.
+           O(log_d(n)) runtime worst case.
+        '''
+        keys, ids, pos, arity = self.keys, self.ids, self.pos, self.arity
+        key, item_id = keys[i], ids[i]
+        while i > 0:
+            parent = (i - 1) // arity
+            if keys[parent] <= key:
+                break
+            # move the parent down into the hole, the item keeps moving up
+            keys[i] = keys[parent]
+            ids[i] = ids[parent]
+            pos[ids[i]] = i
+            i = parent
+        keys[i] = key
+        ids[i] = item_id
+        pos[item_id] = i
+
+
+    def __sift_down__(self, i):
+        '''
+           Move the item at index i down the heap tree until none of its children have a smaller
+           key. O(d*log_d(n)) runtime worst case.
+        '''
+        keys, ids, pos, arity, size = self.keys, self.ids, self.pos, self.arity, self.size
+        key, item_id = keys[i], ids[i]
+        while True:
+            first_child = arity*i + 1
+            if first_child >= size:
+                break
+            # find the child with the smallest key
+            child, child_key = first_child, keys[first_child]
+            if arity == 2:
+                if first_child + 1 < size and keys[first_child + 1] < child_key:
+                    child, child_key = first_child + 1, keys[first_child + 1]
+            else:
+                for c in range(first_child + 1, min(first_child + arity, size)):
+                    if keys[c] < child_key:
+                        child, child_key = c, keys[c]
+            if child_key >= key:
+                break
+            # move the min child up into the hole, the item keeps moving down
+            keys[i] = keys[child]
+            ids[i] = ids[child]
+            pos[ids[i]] = i
+            i = child
+        keys[i] = key
+        ids[i] = item_id
+        pos[item_id] = i
+
+
+    def insert(self, item_id, key):
+        ''' Insert item_id (which must not be in the heap yet) with key. O(log_d(n)) '''
+        self.keys.append(key)
+        self.ids.append(item_id)
+        self.size += 1
+        self.__sift_up__(self.size - 1)
+
+
+    def __heapify__(self, ids, keys):
+        '''
+           Add the items ids (none of which can be in the heap yet) with keys, rebuilding the heap
+           bottom up: every node from the last parent back to the root is sifted down into place.
+           Most nodes are near the bottom of the tree and only sift down a level or two, so this
+           runs in O(n) time (n = size of the heap after adding them).
+        '''
+        ids, keys = list(ids), list(keys)
+        if len(ids) != len(keys):
+            raise ValueError('Warning: got {0} ids but {1} keys'.format(len(ids), len(keys)))
+        self.pos.update(zip(ids, range(self.size, self.size + len(ids))))
+        self.ids.extend(ids)
+        self.keys.extend(keys)
+        self.size += len(ids)
+        for i in range((self.size - 2) // self.arity, -1, -1):
+            self.__sift_down__(i)
+
+
+    def __insert_many__(self, ids, keys):
+        '''
+           Add the items ids with keys, either one at a time, or (if there are many of them relative
+           to the heap, when k*log(n) inserts would cost more than rebuilding the whole heap) all at
+           once with heapify. O(min(k*log(n), n)) for k items.
+        '''
+        ids, keys = list(ids), list(keys)
+        new_size = self.size + len(ids)
+        if len(ids) * new_size.bit_length() >= new_size:
+            self.__heapify__(ids, keys)
+            return
+        for item_id, key in zip(ids, keys):
+            self.keys.append(key)
+            self.ids.append(item_id)
+            self.size += 1
+            self.__sift_up__(self.size - 1)
+
+
+    def __extract_k__(self, k):
+        '''
+           Remove the k items with the smallest keys from the heap (all of them if k >= size), and
+           return them as a list of (item id, key) tuples in order. If the whole heap is taken, it
+           is just sorted instead. O(k*log(n))
+        '''
+        if k < self.size:
+            return [self.extract_min() for _ in range(k)]
+        top = sorted(zip(self.keys, range(self.size)))
+        top = [(self.ids[i], key) for key, i in top]
+        self.keys, self.ids, self.pos, self.size = [], [], {}, 0
+        return top
+
+
+    def heapify(self, ids, keys): self.__heapify__(ids, keys)
+
+    def insert_many(self, ids, keys): self.__insert_many__(ids, keys)
+
+    def extract_k(self, k): return self.__extract_k__(k)
+
+
+    def find(self, item_id):
+        ''' Find and return index of item_id in heap if it exists. If not, return None. O(1) '''
+        return self.pos.get(item_id)
+
+
+    def get_key(self, item_id):
+        ''' Return the key of item_id, None if it is not in the heap. O(1) '''
+        i = self.pos.get(item_id)
+        return self.keys[i] if i is not None else None
+
+
+    def get_min(self):
+        ''' Return the tuple (item id, key) with the smallest key, None if empty heap. '''
+        return (self.ids[0], self.keys[0]) if self.size > 0 else None
+
+
+    def extract_min(self):
+        ''' Remove and return the tuple (item id, key) with the smallest key, None if empty heap. '''
+        if self.size == 0:
+            return None
+        top = (self.ids[0], self.keys[0])
+        del self.pos[top[0]]
+        self.size -= 1
+        last_key, last_id = self.keys.pop(), self.ids.pop()
+        if self.size > 0:
+            self.keys[0], self.ids[0] = last_key, last_id
+            self.__sift_down__(0)
+        return top
+
+
+    def decrease_key(self, item_id, key):
+        '''
+           Lower the key of item_id to key if that is smaller than its current key, and sift it up
+           into place. Return key if it was changed, None if not (or item_id isn't in the heap).
+        '''
+        i = self.pos.get(item_id)
+        if i is None or key >= self.keys[i]:
+            return None
+        self.keys[i] = key
+        self.__sift_up__(i)
+        return key
+
+
+    def update_key(self, item_id, key):
+        ''' Change the key of item_id (which must be in the heap) to key, up or down. O(log_d(n)) '''
+        i = self.pos[item_id]
+        self.keys[i] = key
+        self.__sift_up__(i)
+        self.__sift_down__(self.pos[item_id])
+
+
+    def delete(self, item_id):
+        ''' Delete and return the tuple (item_id, key) if it's in the heap. If not, return None. '''
+        i = self.pos.get(item_id)
+        if i is None:
+            return None
+        deleted = (item_id, self.keys[i])
+        del self.pos[item_id]
+        self.size -= 1
+        last_key, last_id = self.keys.pop(), self.ids.pop()
+        if i < self.size:  # fill the hole with the last item, and sift it whichever way it needs
+            self.keys[i], self.ids[i] = last_key, last_id
+            self.__sift_up__(i)
+            self.__sift_down__(self.pos[last_id])
+        return deleted
+
+
+class IndexedMaxHeap(IndexedMinHeap):
+    '''
+       Indexed d-ary max heap, implemented with the indexed min heap above with the keys negated
+       as they go in (and again as they come out), so keys need to be able to be negated.
+    '''
+    def insert(self, item_id, key): super().insert(item_id, -key)
+
+    def heapify(self, ids, keys): self.__heapify__(ids, [-key for key in keys])
+
+    def insert_many(self, ids, keys): self.__insert_many__(ids, [-key for key in keys])
+
+    def extract_k(self, k): return [(item_id, -key) for item_id, key in self.__extract_k__(k)]
+
+
+    def get_key(self, item_id):
+        key = super().get_key(item_id)
+        return -key if key is not None else None
+
+
+    def get_max(self):
+        top = self.get_min()
+        return (top[0], -top[1]) if top is not None else None
+
+
+    def extract_max(self):
+        top = self.extract_min()
+        return (top[0], -top[1]) if top is not None else None
+
+
+    def increase_key(self, item_id, key):
+        ''' Raise the key of item_id to key if larger. Return key if it was changed, else None. '''
+        return key if self.decrease_key(item_id, -key) is not None else None
+
+
+    def update_key(self, item_id, key): super().update_key(item_id, -key)
+
+
+    def delete(self, item_id):
+        deleted = super().delete(item_id)
+        return (deleted[0], -deleted[1]) if deleted is not None else None
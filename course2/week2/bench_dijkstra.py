@@ -0,0 +1,134 @@
+#!/Users/kcolletti1/opt/anaconda3/bin/python3
+
+'''
+   run from command line with either
+   $ python bench_dijkstra.py [num_verts ...]
+   $ ./bench_dijkstra.py [num_verts ...]
+   if no sizes are given, graphs of 1000, 10000 and 100000 vertices are used by default
+
+   This code compares the priority queues used by dijkstra's algorithm. First the indexed d-ary
+   heap (see heap.py) with 2, 4 and 8 children per node, to help pick the arity for the shortest
+   path and spanning tree code. For every size we time a raw mix of heap operations the way
+   dijkstra's algorithm uses them (heapify every vert, then extract the min and decrease the keys
+   of a few of the verts left, until the heap is empty), and then dijkstra's algorithm itself on
+   a random graph with ~5 edges per vert. Then the heap against the monotone integer queues
+   (Dial's bucket queue and the radix heap) and the lazy deletion heapq mode, on random graphs
+   with small to large int edge weights, along with the queue backend='auto' picks for each. All of the queues give the same
+   shortest paths, which is checked along the way.
+'''
+
+from graph import Graph, DIAL_MAX_WEIGHT
+from heap import IndexedMinHeap
+from numpy import random as nprand
+import sys
+import time
+
+
+def random_graph(num_verts, degree=5, max_weight=1000):
+    ''' Return a Graph of num_verts, with ~degree random edges per vert of weight 1..max_weight. '''
+    graph = Graph()
+    num_edges = num_verts * degree
+    tails = nprand.randint(1, num_verts + 1, num_edges).tolist()
+    heads = nprand.randint(1, num_verts + 1, num_edges).tolist()
+    weights = nprand.randint(1, max_weight + 1, num_edges).tolist()
+    for v in range(1, num_verts):  # a path through all the verts, so every vert is reachable
+        graph.add_edge(v, v + 1, max_weight)
+    for tail, head, weight in zip(tails, heads, weights):
+        if tail != head:
+            graph.add_edge(tail, head, weight)
+    return graph
+
+
+def heap_ops_mix(arity, keys, decreases):
+    '''
+       Heapify items i with keys keys[i] for every i, then until the heap is empty extract the min
+       and lower the keys of the items in the next row of decreases (a list of (item, amount) rows)
+    '''
+    heap = IndexedMinHeap(arity)
+    heap.heapify(range(len(keys)), keys)
+    row = 0
+    while heap.size > 0:
+        _, key = heap.extract_min()
+        for item, amount in decreases[row]:
+            if item in heap:
+                heap.decrease_key(item, heap.get_key(item) - amount)
+        row += 1
+
+
+def bench_arities(sizes):
+    ''' Time the heap operations mix and dijkstra's algo with heap arities of 2, 4 and 8. '''
+    arities = [2, 4, 8]
+
+    print('\n {0:>7} {1:>8}  {2:<10} {3:>6} {4:>10}'.format(
+          'verts', 'edges', 'test', 'arity', 'seconds'))
+    for num_verts in sizes:
+        keys = nprand.randint(0, 10**6, num_verts).tolist()
+        decreases = [list(zip(nprand.randint(0, num_verts, 5).tolist(),
+                              nprand.randint(0, 10**3, 5).tolist())) for _ in range(num_verts)]
+        graph = random_graph(num_verts)
+
+        shortest_paths = None
+        for arity in arities:
+            t0 = time.time()
+            heap_ops_mix(arity, keys, decreases)
+            total = time.time() - t0
+            print(' {0:>7} {1:>8}  {2:<10} {3:>6} {4:>10.4f}'.format(
+                  num_verts, graph.num_edges, 'heap ops', arity, total))
+
+        for arity in arities:
+            t0 = time.time()
+            paths = graph.compute_shortest_paths_heap(1, arity)
+            total = time.time() - t0
+            if shortest_paths is not None and paths != shortest_paths:
+                raise RuntimeError('Warning: arity {0} gave different shortest paths'.format(arity))
+            shortest_paths = paths
+            print(' {0:>7} {1:>8}  {2:<10} {3:>6} {4:>10.4f}'.format(
+                  num_verts, graph.num_edges, 'dijkstra', arity, total))
+
+
+def bench_backends(sizes):
+    '''
+       Time dijkstra's algo with the heap, Dial bucket queue, radix heap and lazy heapq backends, on
+       graphs with int edge weights up to 10, 1000, 10**4 and 10**6. The bucket queue is skipped
+       for weights much larger than DIAL_MAX_WEIGHT, where it would mostly scan empty buckets.
+    '''
+    max_weights = [10, 1000, 10**4, 10**6]
+
+    print('\n {0:>7} {1:>8} {2:>8}  {3:<7} {4:>10} {5:>8}  {6}'.format(
+          'verts', 'edges', 'max wt', 'queue', 'seconds', 'speedup', 'notes'))
+    for num_verts in sizes:
+        for max_weight in max_weights:
+            graph = random_graph(num_verts, max_weight=max_weight)
+            auto_backend = graph.dijkstra_backend()[0]
+
+            shortest_paths, heap_total = None, None
+            for backend in ['heap', 'dial', 'radix', 'lazy']:
+                if backend == 'dial' and max_weight > 4*DIAL_MAX_WEIGHT:
+                    continue
+                t0 = time.time()
+                paths = graph.compute_shortest_paths_heap(1, backend=backend)
+                total = time.time() - t0
+                if shortest_paths is not None and paths != shortest_paths:
+                    raise RuntimeError('Warning: {0} gave different shortest paths'.format(backend))
+                shortest_paths = paths
+                heap_total = heap_total or total
+                print(' {0:>7} {1:>8} {2:>8}  {3:<7} {4:>10.4f} {5:>7.2f}x  {6}'.format(
+                      num_verts, graph.num_edges, max_weight, backend, total, heap_total / total,
+                      'auto' if backend == auto_backend else ''))
+
+
+def main():
+    nprand.seed(1)
+    sizes = [int(n) for n in sys.argv[1:]] or [1000, 10000, 100000]
+    bench_arities(sizes)
+    bench_backends(sizes)
+
+
+if __name__ == "__main__":
+    t0 = time.time()
+    main()
+    t1 = time.time()
+
+    print('\n This code ran in {0:.5f} seconds.\n'.format(t1 - t0))
+
+    raise SystemExit
@@ -0,0 +1,106 @@
+#!/Users/kcolletti1/opt/anaconda3/bin/python3
+
+'''
+   run from command line with either
+   $ python bench_route_queries.py [grid_size [num_queries [num_landmarks]]]
+   $ ./bench_route_queries.py [grid_size [num_queries [num_landmarks]]]
+   if no options are given, a 300 x 300 grid, 100 queries and 16 landmarks are used by default
+
+   This code compares the point to point shortest path queries of Graph on a road network like
+   graph: a grid of verts, each joined to its neighbors to the right and below by an edge of
+   random weight (with a few edges left out, so not every route is a straight line). We time the
+   preprocessing (picking the landmarks for ALT, and building the contraction hierarchy, both of
+   which are saved to and loaded back from a file), and then for a set of random (source, target)
+   pairs we time dijkstra's algo stopping at the target, bidirectional dijkstra, ALT and the
+   contraction hierarchy, and report how many verts each explored on average. Every query's path
+   len is checked against a full run of dijkstra's algo.
+'''
+
+from graph import Graph, ContractionHierarchy
+from numpy import random as nprand
+import os
+import sys
+import time
+
+
+def grid_graph(grid_size, max_weight=100, skip_prob=0.1):
+    ''' Return a Graph of a grid_size x grid_size grid, with random edge weights 1..max_weight. '''
+    graph = Graph()
+    for row in range(grid_size):
+        for col in range(grid_size):
+            vert = row*grid_size + col + 1
+            if col + 1 < grid_size and nprand.random() >= skip_prob:
+                graph.add_edge(vert, vert + 1, int(nprand.randint(1, max_weight + 1)))
+            if row + 1 < grid_size and nprand.random() >= skip_prob:
+                graph.add_edge(vert, vert + grid_size, int(nprand.randint(1, max_weight + 1)))
+    return graph
+
+
+def main():
+    nprand.seed(1)
+    grid_size = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    num_landmarks = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    graph = grid_graph(grid_size)
+    verts = list(graph.vertices)
+    print('\n graph has {0} verts and {1} edges'.format(graph.num_verts, graph.num_edges))
+
+    landmarks_fname = 'grid{0}.landmarks'.format(grid_size)
+    t0 = time.time()
+    graph.compute_landmarks(num_landmarks, fname=landmarks_fname)
+    print(' picked {0} landmarks in {1:.4f} seconds'.format(num_landmarks, time.time() - t0))
+    t0 = time.time()
+    if not graph.load_landmarks(landmarks_fname):
+        raise RuntimeError('Warning: could not load back the landmarks from ' + landmarks_fname)
+    print(' loaded them back from disk in {0:.4f} seconds'.format(time.time() - t0))
+    os.remove(landmarks_fname)
+
+    ch_fname = 'grid{0}.ch'.format(grid_size)
+    t0 = time.time()
+    ContractionHierarchy(graph, fname=ch_fname)
+    print(' built the contraction hierarchy in {0:.4f} seconds'.format(time.time() - t0))
+    t0 = time.time()
+    hierarchy = ContractionHierarchy(graph, fname=ch_fname)
+    print(' loaded it back from disk in {0:.4f} seconds ({1} shortcuts)'.format(
+          time.time() - t0, hierarchy.num_shortcuts))
+    os.remove(ch_fname)
+
+    queries = [tuple(nprand.choice(len(verts), 2, replace=False)) for _ in range(num_queries)]
+    queries = [(verts[i], verts[j]) for i, j in queries]
+    expected = {}
+    t0 = time.time()
+    for source, target in queries:
+        if source not in expected:
+            expected[source] = graph.compute_shortest_paths_heap(source)
+    full_total = (time.time() - t0) / len(expected)
+
+    engines = [('dijkstra', lambda s, t: graph.shortest_path_alt(s, t, use_landmarks=False)),
+               ('bidirectional', lambda s, t: graph.shortest_path(s, t) + (None,)),
+               ('ALT', graph.shortest_path_alt),
+               ('CH', hierarchy.shortest_path)]
+    print('\n {0:<14} {1:>12} {2:>10} {3:>10}'.format('query', 'ms/query', 'speedup', 'explored'))
+    print(' {0:<14} {1:>12.3f} {2:>9.2f}x {3:>10}'.format('full dijkstra', 1000*full_total, 1,
+                                                        graph.num_verts))
+    for name, engine in engines:
+        explored = 0
+        t0 = time.time()
+        for source, target in queries:
+            path_len, path, num_explored = engine(source, target)
+            if path_len != expected[source][target]:
+                raise RuntimeError('Warning: {0} got the wrong path len from {1} to {2}'.format(
+                                   name, source, target))
+            explored += num_explored or 0
+        total = (time.time() - t0) / num_queries
+        print(' {0:<14} {1:>12.3f} {2:>9.2f}x {3:>10}'.format(name, 1000*total, full_total / total,
+              explored // num_queries if name != 'bidirectional' else '-'))
+
+
+if __name__ == "__main__":
+    t0 = time.time()
+    main()
+    t1 = time.time()
+
+    print('\n This code ran in {0:.5f} seconds.\n'.format(t1 - t0))
+
+    raise SystemExit
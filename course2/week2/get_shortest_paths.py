@@ -21,7 +21,10 @@ def main():
     source_vert = 1
     dest_verts = [7, 37, 59, 82, 99, 115, 133, 165, 188, 197]
     #shortest_paths = test_graph.compute_shortest_paths_naive(source_vert)  # both algos give same result!
-    shortest_paths = test_graph.compute_shortest_paths_heap(source_vert)
+    #shortest_paths = test_graph.compute_shortest_paths_heap(source_vert)
+    # we only need the paths to dest_verts, so stop dijkstra's algo once they've all been found
+    shortest_paths = {dest: path_len for dest, (path_len, _) in
+                      test_graph.shortest_paths(source_vert, dest_verts).items()}
 
     print('\n The lengths of the shortest paths from vertex 1 to the vertices\n',
           dest_verts, '\n are:\n')
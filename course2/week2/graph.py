@@ -4,27 +4,141 @@
     containing the vertex num and a list of vertices connected to it.
 '''
 
+from array import array
 from copy import deepcopy as dcopy
+from heapq import heappush, heappop
+from itertools import chain
+import hashlib
+import numbers
 from stack import Stack
-from queue import Queue
 from heap import *
-
-
-class Vert_Path:
-    def __init__(self, vert=None, path_len=float('inf')):
-        self.vert = vert
-        self.path_len = path_len
-
-    def set_path_len(self, new_path_len):
-        self.path_len = new_path_len
-
-    # make all ordering comparisons based on path_len
-    def __lt__(self, other): return self.path_len < other.path_len
-    def __le__(self, other): return self.path_len <= other.path_len
-    def __gt__(self, other): return self.path_len > other.path_len
-    def __ge__(self, other): return self.path_len >= other.path_len
-    def __eq__(self, other): return self.path_len == other.path_len
-    def __ne__(self, other): return self.path_len != other.path_len
+from graph_loader import read_arrays, write_arrays
+import numpy as np
+
+
+# largest edge weight that dijkstra's algo uses a Dial bucket queue for (with backend='auto'); with
+# larger weights it uses a radix heap instead, as the bucket queue would mostly scan empty buckets
+DIAL_MAX_WEIGHT = 2**12
+
+
+def tarjan_scc(out_start, out_verts):
+    '''
+       Compute the strongly connected components of a directed graph with vertices numbered 0..n-1,
+       given in compressed sparse row form (the edges pointing out of vertex v point to the verts at
+       out_verts[out_start[v]:out_start[v+1]]), using Tarjan's algorithm. Unlike Kosaraju's
+       algorithm this only takes one DFS pass, and doesn't need the reverse graph or any sorting
+       of finish times. Each vertex gets an index in the order the DFS first reaches it, and a
+       lowlink, the smallest index reachable from it through the DFS tree below it plus one more
+       edge back to a vertex that is still on the SCC stack. A vertex whose lowlink is its own
+       index is the root of an SCC, which is then everything above it on the SCC stack. The DFS
+       is iterative, keeping each vertex on the call stack along with the position of the next of
+       its edges to look at, and all state is kept in local typed arrays (no globals), so this is
+       safe to run on several graphs at once. Runs in O(n + m) time. Returns the tuple (array of
+       the component id of every vertex, list of the size of every component); components are
+       numbered 0, 1, ... in the order they are found, which is a reverse topological order.
+    '''
+    n = len(out_start) - 1
+    index = array('q', [-1]) * n  # order each vertex is first reached, -1 if not reached yet
+    low = array('q', [0]) * n
+    comp = array('q', [-1]) * n  # component id, -1 while the vertex is still on the SCC stack
+    comp_sizes = []
+    scc_stack = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        scc_stack.append(root)
+        call_stack = [root]
+        next_edge = [out_start[root]]
+
+        while call_stack:
+            vert = call_stack[-1]
+            e, end = next_edge[-1], out_start[vert + 1]
+            while e < end:
+                next_vert = out_verts[e]
+                e += 1
+                if index[next_vert] == -1:  # not reached yet, go explore it first
+                    break
+                if comp[next_vert] == -1 and index[next_vert] < low[vert]:  # still on SCC stack
+                    low[vert] = index[next_vert]
+            else:  # finished exploring all of vert's edges
+                call_stack.pop()
+                next_edge.pop()
+                if call_stack and low[vert] < low[call_stack[-1]]:
+                    low[call_stack[-1]] = low[vert]
+                if low[vert] == index[vert]:  # vert is the root of an SCC, pop it off the SCC stack
+                    scc_vert = None
+                    size = 0
+                    while scc_vert != vert:
+                        scc_vert = scc_stack.pop()
+                        comp[scc_vert] = len(comp_sizes)
+                        size += 1
+                    comp_sizes.append(size)
+                continue
+
+            next_edge[-1] = e
+            index[next_vert] = low[next_vert] = counter
+            counter += 1
+            scc_stack.append(next_vert)
+            call_stack.append(next_vert)
+            next_edge.append(out_start[next_vert])
+
+    return comp, comp_sizes
+
+
+def bfs_csr(out_start, out_verts, sources, targets=None):
+    '''
+       Breadth first search from all of the verts in sources at once (numbered 0..n-1), on a graph
+       in compressed sparse row form (see tarjan_scc). Rather than taking verts off a queue one at a
+       time, this expands a whole level (frontier) of the search at once with numpy: gather every
+       edge out of the frontier, keep the ones pointing to verts not reached yet, and those verts
+       (each with the first frontier vert found pointing to it as its parent) are the next frontier.
+       If targets is given, the search stops after the level where the last of them is reached.
+       Returns the tuple of arrays (hop count from the nearest source to every vert, -1 if it was not
+       reached, parent of every vert on a shortest path back to a source, -1 for sources/unreached).
+    '''
+    n = len(out_start) - 1
+    dist = np.full(n, -1, dtype=np.int64)
+    parent = np.full(n, -1, dtype=np.int64)
+    frontier = np.unique(np.asarray(sources, dtype=np.int64))
+    dist[frontier] = 0
+    if targets is not None:
+        targets = np.asarray(targets, dtype=np.int64)
+
+    level = 0
+    while len(frontier) and (targets is None or (dist[targets] == -1).any()):
+        begins = np.asarray(out_start[frontier], dtype=np.int64)
+        counts = out_start[frontier + 1] - begins
+        offsets = np.repeat(begins - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        heads = out_verts[offsets]
+        new = dist[heads] == -1
+        heads, first = np.unique(heads[new], return_index=True)
+        level += 1
+        dist[heads] = level
+        parent[heads] = np.repeat(frontier, counts)[new][first]
+        frontier = heads
+    return dist, parent
+
+
+def scc_groups(comp_ids, comp_sizes, labels=None):
+    '''
+       Turn the component ids of the verts (-1 for labels that aren't verts) and the component sizes
+       returned by compute_scc_ids into the dict of each components vertices, with the first vert of
+       each component as its leader. The verts are given by their index in comp_ids, or by labels.
+    '''
+    if len(comp_sizes) == 0:
+        return {}
+    verts = np.flatnonzero(comp_ids >= 0)
+    verts = verts[np.argsort(comp_ids[verts], kind='stable')]
+    if labels is not None:
+        verts = np.asarray(labels)[verts]
+    leaders = {}
+    for scc in np.split(verts, np.cumsum(comp_sizes)[:-1]):
+        leaders[int(scc[0])] = set(scc.tolist())
+    return leaders
 
 
 class Graph:
@@ -36,6 +150,14 @@ class Graph:
         self.edges = {} 
         self.num_edges = 0
         self.num_verts = 0
+        # largest edge weight, and whether every weight is a non-negative int (python or numpy),
+        # kept up to date by add_edge so dijkstra_backend doesn't have to scan every edge
+        self.max_weight = 0
+        self.int_weights = True
+        # ALT preprocessing (see compute_landmarks): the landmark verts, and a dict of
+        # {vert: tuple of its shortest path lens to every landmark}
+        self.landmarks = None
+        self.landmark_dists = None
 
 
     def copy(self):
@@ -44,6 +166,8 @@ class Graph:
         new_graph.edges = dcopy(self.edges)
         new_graph.num_edges = int(self.num_edges)
         new_graph.num_verts = int(self.num_verts)
+        new_graph.max_weight = self.max_weight
+        new_graph.int_weights = self.int_weights
         return new_graph
 
 
@@ -60,6 +184,8 @@ class Graph:
         # increment number of edges and add vertex pointers to this edge
         self.num_edges += 1
         self.edges[self.num_edges] = [vert1, vert2, weight]
+        self.max_weight = max(self.max_weight, weight)
+        self.int_weights = self.int_weights and isinstance(weight, numbers.Integral) and weight >= 0
 
         # add both vertices/edge# to vertex dict (and increment number of vertices if needed)
         self.__update_vert__(vert1)
@@ -130,83 +256,392 @@ class Graph:
         return shortest_paths
 
 
-    def compute_shortest_paths_heap(self, source: int):
+    def dijkstra_backend(self):
+        '''
+           Pick the priority queue for dijkstra's algo from the range of the edge weights: a Dial
+           bucket queue for non-negative int weights up to DIAL_MAX_WEIGHT, a radix heap for larger
+           non-negative int weights, and the indexed d-ary heap otherwise (i.e. float weights).
+           Return the tuple (backend name, largest edge weight). O(1), as add_edge keeps track
+           of the weights.
+        '''
+        if not self.int_weights:
+            return 'heap', self.max_weight
+        return ('dial' if self.max_weight <= DIAL_MAX_WEIGHT else 'radix'), self.max_weight
+
+
+    def compute_shortest_paths_heap(self, source: int, arity=4, backend='auto'):
         '''
            Use Dijkstra's algorithm to compute the shortest path from source vertex to all
-           other vertices in the graph. If no path exists, set shortest path = None.
-           This function uses a min-heap data structure to keep track of next edge to look at,
-           runs O(m*log(n)) time
+           other vertices in the graph. If no path exists, set shortest path = +inf.
+           The priority queue that keeps track of next edge to look at is picked with backend:
+           'heap' for an indexed min-heap (with arity children per node, see heap.py), runs
+           O(m*log(n)) time, or for non-negative int edge weights 'dial' for a Dial bucket queue,
+           runs O(m + n*C) time with C the largest edge weight, or 'radix' for a radix heap, runs
+           O(m + n*log(C)) time. backend='auto' picks one of these from the edge weights of the
+           graph, and backend='lazy' uses python's heapq instead (see __shortest_paths_lazy__).
         '''
+        if backend == 'auto':
+            backend, max_weight = self.dijkstra_backend()
+        elif backend == 'dial':
+            max_weight = self.max_weight
+        if backend == 'dial':
+            return self.__shortest_paths_monotone__(source, DialQueue(max_weight))
+        if backend == 'radix':
+            return self.__shortest_paths_monotone__(source, RadixHeap())
+        if backend == 'lazy':
+            return self.__shortest_paths_lazy__(source)
+        if backend != 'heap':
+            raise ValueError('Warning: dijkstra backend needs to be one of auto, heap, dial, radix or lazy')
+
         # initialize shortest path dict of {dest vertex: path len}
         shortest_paths = {v: None for v in self.vertices}
 
-        # initialize a min heap to store all vertices and their shortest path lengths
-        # add all vertices to heap as data structure Vert_Path, with +inf as initial path len
-        # and set source vertex path len to be 0
-        poss_edges_heap = MinHeap()
-        for vert in self.vertices:
-            poss_edges_heap.insert(Vert_Path(vert))
-        poss_edges_heap.delete(source)
-        poss_edges_heap.insert(Vert_Path(vert=source, path_len=0))
+        # initialize an indexed min heap to store all vertices keyed by their shortest path lengths
+        # add all vertices to heap at once with +inf as initial path len, and source vertex path
+        # len of 0 (heapify builds the heap in O(n), rather than O(n*log(n)) for n inserts)
+        poss_edges_heap = IndexedMinHeap(arity)
+        poss_edges_heap.heapify(self.vertices, (0 if vert == source else float('inf')
+                                                for vert in self.vertices))
 
         while poss_edges_heap.size != 0:  # O(1)
             # extract min from heap - this vertex gets added to our "conquered" vertices
             # and its shortest path gets set
-            next_vp = poss_edges_heap.extract_min()  # this vertex is no longer in our heap, O(log(n))
-            vert = next_vp.vert
-            path = next_vp.path_len
+            vert, path = poss_edges_heap.extract_min()  # this vertex is no longer in our heap, O(log(n))
             shortest_paths[vert] = path
 
             # go through all edges vert points to in this graph, if connecting vert
-            # is not in heap we don't care. otherwise, find it in the heap, and check
-            # if we need to update the path len to a shorter one
+            # is not in heap we don't care. otherwise, check if we need to update
+            # the path len to a shorter one
             for edge in self.vertices[vert]:
                 # extract the vertex and edge length that this edge contains
                 dest_vert = self.edges[edge][0] if self.edges[edge][0] != vert else self.edges[edge][1]
                 edge_len = self.edges[edge][2]
 
-                # check if this vertex is in the heap, and if so find it's index
-                heap_ind = poss_edges_heap.find(dest_vert)
-                if heap_ind == None:  # this vertex has already been explored, we can skip this
+                # decrease key only changes the path len if it is smaller than the current one
+                # (and the vert is still in the heap), and sifts it up accordingly, O(log(n))
+                poss_edges_heap.decrease_key(dest_vert, path + edge_len)
+
+        return shortest_paths
+
+
+    def __shortest_paths_monotone__(self, source, poss_edges_queue):
+        '''
+           Dijkstra's algorithm with a monotone integer priority queue (DialQueue or RadixHeap from
+           heap.py). These can't hold +inf keys, so rather than starting with every vertex in the
+           queue, only the verts that have been reached so far are in it. Unreached verts end up
+           with a shortest path of +inf, same as compute_shortest_paths_heap.
+        '''
+        shortest_paths = {v: float('inf') for v in self.vertices}
+        explored = set()
+        poss_edges_queue.insert(source, 0)
+
+        while poss_edges_queue.size != 0:
+            vert, path = poss_edges_queue.extract_min()
+            shortest_paths[vert] = path
+            explored.add(vert)
+
+            for edge in self.vertices[vert]:
+                dest_vert = self.edges[edge][0] if self.edges[edge][0] != vert else self.edges[edge][1]
+                if dest_vert in explored:
                     continue
+                # insert newly reached verts, otherwise lower the path len if this one is shorter
+                if dest_vert in poss_edges_queue:
+                    poss_edges_queue.decrease_key(dest_vert, path + self.edges[edge][2])
+                else:
+                    poss_edges_queue.insert(dest_vert, path + self.edges[edge][2])
+
+        return shortest_paths
 
-                # otherwise we need to update the path len of this vertex in the heap
-                # the heap data structure will automatically compare the values and only
-                # change it if it is smaller than the current path len, and sift accordingly
-                poss_edges_heap.update_len(vert=dest_vert, new_len=path+edge_len)
+
+    def __shortest_paths_lazy__(self, source):
+        '''
+           Dijkstra's algorithm with lazy deletion, on python's heapq (a binary heap implemented in
+           C) of plain (path len, vert) tuples. Rather than decreasing the key of a vert already in
+           the heap, a new entry is pushed whenever a shorter path to it is found, and the stale
+           entries left behind are skipped when they are popped (the vert has been explored by then).
+           Only verts that have been reached are ever pushed. There can be up to m entries in the
+           heap, so this runs in O(m*log(m)) = O(m*log(n)) time, but every heap operation runs in C.
+           Verts with the same path len are compared by their labels, so labels need to be orderable.
+        '''
+        shortest_paths = {v: float('inf') for v in self.vertices}
+        path_lens = {source: 0}  # shortest path len found so far to every vert reached
+        poss_edges_heap = [(0, source)]
+
+        while poss_edges_heap:
+            path, vert = heappop(poss_edges_heap)
+            if shortest_paths[vert] != float('inf'):  # stale entry, vert has already been explored
+                continue
+            shortest_paths[vert] = path
+
+            for edge in self.vertices[vert]:
+                vert1, vert2, edge_len = self.edges[edge]
+                dest_vert = vert2 if vert1 == vert else vert1
+                if path + edge_len < path_lens.get(dest_vert, float('inf')):
+                    path_lens[dest_vert] = path + edge_len
+                    heappush(poss_edges_heap, (path + edge_len, dest_vert))
 
         return shortest_paths
 
 
-    def BFS(self, start: int, forwards=True):
-        '''Breadth first search from start vertex. Can search reverse graph with forwards=False'''
-        # initialize all vertices as unexplored except for start vertex
-        explored = {v: False for v in list(self.vertices)}  # allow for vertices not labelled from 1..n
-        explored[start] = True
+    def __trace_path__(self, pred_verts, vert):
+        ''' Follow the dict of {vert: predecessor vert} back from vert, return the path ending at vert. '''
+        path = [vert]
+        while pred_verts[path[-1]] is not None:
+            path.append(pred_verts[path[-1]])
+        return path[::-1]
 
-        # initialize queue to track next vertices to explore, enqueue start vertex
-        verts = Queue()
-        verts.enqueue(start)
 
-        # while queue is not empty, keep exploring vertices
-        while not verts.is_empty():
-            # dequeue next vertex and try to explore any incident edges it has
-            vert = verts.dequeue()
+    def shortest_paths(self, source: int, targets):
+        '''
+           Dijkstra's algorithm from source vertex (with lazy deletion on heapq, see
+           __shortest_paths_lazy__), that stops as soon as every vertex in targets has been
+           explored, rather than going on to settle the whole graph. Return the dict of
+           {target: (shortest path len, path as a list of verts from source to target)}, with
+           (+inf, None) for targets that can't be reached from source.
+        '''
+        targets_left = set(targets)
+        results = {target: (float('inf'), None) for target in targets_left}
+        path_lens = {source: 0}
+        pred_verts = {source: None}
+        explored = set()
+        poss_edges_heap = [(0, source)]
+
+        while poss_edges_heap and targets_left:
+            path, vert = heappop(poss_edges_heap)
+            if vert in explored:  # stale entry
+                continue
+            explored.add(vert)
+            if vert in targets_left:
+                targets_left.remove(vert)
+                results[vert] = (path, self.__trace_path__(pred_verts, vert))
 
-            # go through all incident edges of this vertex
             for edge in self.vertices[vert]:
-                # get vertex corresponding to this edge
-                # if going through G, current vert will be 1st, so next_vert is in pos 1 (True)
-                # if going through G_rev, current vert will be 2nd, so next_vert is in pos 0 (False)
-                next_vert = self.edges[edge][forwards]
+                vert1, vert2, edge_len = self.edges[edge]
+                dest_vert = vert2 if vert1 == vert else vert1
+                if path + edge_len < path_lens.get(dest_vert, float('inf')):
+                    path_lens[dest_vert] = path + edge_len
+                    pred_verts[dest_vert] = vert
+                    heappush(poss_edges_heap, (path + edge_len, dest_vert))
 
-                # only interested in unexplored vertices and edges pointing AWAY from this vertex
-                if next_vert == vert or explored[next_vert]:
-                    continue
+        return results
 
-                # this is a vertex of interest, mark as explored and add to queue
-                explored[next_vert] = True
-                verts.enqeue(next_vert)
+
+    def shortest_path(self, source: int, target: int):
+        '''
+           Bidirectional Dijkstra's algorithm, for the shortest path between a single pair of verts.
+           One search goes out from source and one from target (the graph is undirected, so both
+           follow the same edges), each with lazy deletion on heapq, and we always step whichever
+           search has the smaller path len at the top of its heap. Whenever an edge leads to a vert
+           the other search has already reached, the two halves make a path from source to target,
+           and we keep the shortest of these. Once the path lens at the top of the two heaps add up
+           to at least the shortest path found, no path through an unexplored vert can be shorter,
+           so we stop. Each search only explores about the verts within half the distance of its
+           own start, so this touches a small part of the graph compared to a full Dijkstra run.
+           Return the tuple (shortest path len, path as a list of verts from source to target), or
+           (+inf, None) if target can't be reached from source.
+        '''
+        if source == target:
+            return 0, [source]
+
+        # index 0 is the search from source, index 1 the search from target
+        path_lens = ({source: 0}, {target: 0})
+        pred_verts = ({source: None}, {target: None})
+        explored = (set(), set())
+        poss_edges_heaps = ([(0, source)], [(0, target)])
+        best_len, meet_vert = float('inf'), None
+
+        while poss_edges_heaps[0] and poss_edges_heaps[1]:
+            if poss_edges_heaps[0][0][0] + poss_edges_heaps[1][0][0] >= best_len:
+                break
+            side = 0 if poss_edges_heaps[0][0][0] <= poss_edges_heaps[1][0][0] else 1
+            path, vert = heappop(poss_edges_heaps[side])
+            if vert in explored[side]:  # stale entry
+                continue
+            explored[side].add(vert)
+
+            lens, other_lens = path_lens[side], path_lens[1 - side]
+            for edge in self.vertices[vert]:
+                vert1, vert2, edge_len = self.edges[edge]
+                dest_vert = vert2 if vert1 == vert else vert1
+                if path + edge_len < lens.get(dest_vert, float('inf')):
+                    lens[dest_vert] = path + edge_len
+                    pred_verts[side][dest_vert] = vert
+                    heappush(poss_edges_heaps[side], (path + edge_len, dest_vert))
+                # the two searches meet at dest vert
+                if dest_vert in other_lens and lens[dest_vert] + other_lens[dest_vert] < best_len:
+                    best_len = lens[dest_vert] + other_lens[dest_vert]
+                    meet_vert = dest_vert
+
+        if meet_vert is None:
+            return float('inf'), None
+        return best_len, (self.__trace_path__(pred_verts[0], meet_vert)[:-1]
+                          + self.__trace_path__(pred_verts[1], meet_vert)[::-1])
+
+
+    def compute_landmarks(self, num_landmarks=16, fname=None, start=None):
+        '''
+           Preprocessing for ALT (A*, landmarks and the triangle inequality) shortest path queries,
+           see shortest_path_alt. Pick num_landmarks landmark verts by farthest point selection: the
+           first landmark is the vert farthest from start (any vert by default), and every landmark
+           after that is the vert farthest from all of the landmarks picked so far (the one with the
+           largest shortest path len to its closest landmark). Landmarks end up spread out around the
+           edges of the graph, which gives the best lower bounds. Verts that none of the landmarks so
+           far can reach count as infinitely far, so every connected component gets a landmark if
+           there are enough of them. One full dijkstra run per landmark, O(k*m*log(n)) time. The
+           graph is undirected, so the path lens from each landmark (forwards) are also the path
+           lens to it (backwards), and only one set of them is kept. If fname is given, the
+           landmarks are also saved to that file, for load_landmarks. Returns the landmark verts.
+        '''
+        labels = list(self.vertices)
+        if start is None:
+            start = labels[0]
+
+        landmarks = []
+        dists = np.empty((num_landmarks, len(labels)))
+        closest_dists = np.full(len(labels), np.inf)
+        paths = self.compute_shortest_paths_heap(start)
+        far_vert = max(labels, key=paths.get)
+        for i in range(min(num_landmarks, len(labels))):
+            landmarks.append(far_vert)
+            paths = self.compute_shortest_paths_heap(far_vert)
+            dists[i] = [paths[v] for v in labels]
+            np.minimum(closest_dists, dists[i], out=closest_dists)
+            far_vert = labels[int(np.argmax(closest_dists))]
+
+        arrays = [np.array(labels, dtype=np.int64), np.array(landmarks, dtype=np.int64),
+                  dists[:len(landmarks)]]
+        self.__set_landmarks__(*arrays)
+        if fname is not None:
+            write_arrays(fname, arrays, self.__landmarks_key__())
+        return landmarks
+
+
+    def __edges_hash__(self):
+        '''
+           Return a hash of the endpoints and weights of every edge of the graph, which files saved
+           for this graph are keyed on, so they are never loaded back for a graph that has the same
+           shape but different edges or weights. O(m) time, nothing next to the preprocessing.
+        '''
+        edges = list(self.edges.values())
+        edge_hash = hashlib.sha1()
+        for arr in [np.array([edge[0] for edge in edges], dtype=np.int64),
+                    np.array([edge[1] for edge in edges], dtype=np.int64),
+                    np.array([edge[2] for edge in edges])]:
+            edge_hash.update(arr.dtype.str.encode())
+            edge_hash.update(arr.tobytes())
+        return edge_hash.hexdigest()
+
+
+    def __landmarks_key__(self):
+        ''' Return the key landmark files of this graph are saved with (see graph_loader.write_arrays). '''
+        return ['landmarks', self.num_verts, self.num_edges, self.__edges_hash__()]
+
+
+    def __set_landmarks__(self, labels, landmarks, dists):
+        ''' Keep the landmark verts, and the shortest path lens from them to every vert by vert. '''
+        self.landmarks = landmarks.tolist()
+        self.landmark_dists = dict(zip(labels.tolist(), map(tuple, np.asarray(dists).T.tolist())))
+
+
+    def load_landmarks(self, fname):
+        '''
+           Load the landmarks saved by compute_landmarks to file fname. Returns True if they were
+           loaded, False if the file doesn't exist or was saved for a different graph (going by a
+           hash of its edges and their weights, see __edges_hash__).
+        '''
+        arrays = read_arrays(fname, self.__landmarks_key__())
+        if arrays is None:
+            return False
+        self.__set_landmarks__(*arrays)
+        return True
+
+
+    def shortest_path_alt(self, source: int, target: int, use_landmarks=True):
+        '''
+           A* search from source to target, with the landmarks from compute_landmarks (or
+           load_landmarks) as its heuristic. By the triangle inequality, for every landmark L the
+           shortest path len from vert v to target is at least |dist(L, target) - dist(L, v)|, and
+           the largest of these bounds over all landmarks is how far v still is from target (at
+           least). The search explores verts in order of path len so far plus this lower bound
+           (with lazy deletion on heapq), so it heads towards target instead of spreading out evenly
+           in every direction like dijkstra's algo does, and stops once target is explored. The
+           bounds are consistent, so every vert explored has its final shortest path len, same as in
+           dijkstra. Verts that the landmarks reaching target can't reach get a bound of +inf (they
+           can't reach target either), and are never explored. With use_landmarks=False, the bound
+           is always 0 and this is just dijkstra's algo stopping at target, to compare against.
+           Return the tuple (shortest path len, path as a list of verts from source to target,
+           number of verts explored), with (+inf, None, number explored) if there's no path.
+        '''
+        if use_landmarks and self.landmark_dists is None:
+            raise ValueError('Warning: no landmarks, run compute_landmarks or load_landmarks first')
+
+        if use_landmarks:
+            # only the landmarks that reach target are any use, the rest have no bound to give
+            landmark_dists = self.landmark_dists
+            target_dists = [(i, dist) for i, dist in enumerate(landmark_dists[target])
+                            if dist != float('inf')]
+            def lower_bound(vert):
+                vert_dists = landmark_dists[vert]
+                return max((abs(vert_dists[i] - dist) for i, dist in target_dists), default=0)
+        else:
+            def lower_bound(vert): return 0
+
+        path_lens = {source: 0}
+        pred_verts = {source: None}
+        explored = set()
+        poss_edges_heap = [(lower_bound(source), 0, source)]
+
+        while poss_edges_heap:
+            _, path, vert = heappop(poss_edges_heap)
+            if vert in explored:  # stale entry
+                continue
+            explored.add(vert)
+            if vert == target:
+                return path, self.__trace_path__(pred_verts, target), len(explored)
+
+            for edge in self.vertices[vert]:
+                vert1, vert2, edge_len = self.edges[edge]
+                dest_vert = vert2 if vert1 == vert else vert1
+                if path + edge_len < path_lens.get(dest_vert, float('inf')):
+                    bound = lower_bound(dest_vert)
+                    if bound == float('inf'):  # dest vert can't reach target
+                        continue
+                    path_lens[dest_vert] = path + edge_len
+                    pred_verts[dest_vert] = vert
+                    heappush(poss_edges_heap, (path + edge_len + bound, path + edge_len, dest_vert))
+
+        return float('inf'), None, len(explored)
+
+
+    def BFS(self, start, forwards=True, targets=None):
+        '''
+           Breadth first search from start vertex, or from every vertex in start at once if it is a list
+           (or array) of verts. Can search reverse graph with forwards=False, and stop as soon as all of
+           the verts in targets are reached. The edges are laid out in CSR arrays first, and then the
+           search is done a whole level at a time (see bfs_csr). Return the tuple of arrays (hop count
+           to every vert, parent vert of every vert on a shortest path), indexed by vert label, with -1
+           for unreached verts (and labels that aren't verts) and for the parents of the start verts.
+           Raises a KeyError if start or targets has a label that isn't a vert of the graph.
+        '''
+        labels, vert_index, out_start, out_verts = self.__csr_arrays__(forwards)
+        def vert_indices(verts):
+            ''' Return the numbers of the verts labelled verts, KeyError if one isn't a vert. '''
+            verts = np.atleast_1d(np.asarray(verts, dtype=np.int64))
+            for vert in verts.tolist():
+                if vert not in self.vertices:
+                    raise KeyError(vert)
+            return vert_index[verts]
+
+        sources = vert_indices(start)
+        if targets is not None:
+            targets = vert_indices(targets)
+        dist, parent = bfs_csr(out_start, out_verts, sources, targets)
+
+        label_dist = np.full(len(vert_index), -1, dtype=np.int64)
+        label_dist[labels] = dist
+        label_parent = np.full(len(vert_index), -1, dtype=np.int64)
+        label_parent[labels] = np.where(parent >= 0, labels[parent], -1)
+        return label_dist, label_parent
 
 
     def DFS(self, start: int, forwards=True):
@@ -240,91 +675,304 @@ class Graph:
                 verts.push(next_vert)
 
 
-    def __DFS_finishtime__(self, start: int, forwards=True):
-        '''depth first search from start vertex, tracking finishing times, helper for compute_scc'''
-        global label, label_ctr, explored
-
-        explored[start] = True
-        verts = Stack()
-        verts.push(start)
-
-        while not verts.is_empty():
-            vert = verts.top()  # which vertex is currently first in the stack
-            for edge in self.vertices[vert]:
-                next_vert = self.edges[edge][forwards]
-
-                # if edge points IN towards current vertex or we've seen it already, not interested
-                if next_vert == vert or explored[next_vert]:
-                    continue
-
-                # it is a vertex we're interested in, so mark as explored and add to stack
-                explored[next_vert] = True
-                verts.push(next_vert)
-
-            # done looping over all possible new vertices
-            if vert == verts.top():  # didn't put new vertices on stack, so we're done with top vertex
-                verts.pop()
-                # we've completely finished exploring this node, mark it's finishing time
-                label_ctr += 1
-                label[label_ctr] = vert
-
-
-    def __DFS_leaders__(self, start: int, forwards=True):
-        '''depth first search from start vertex, tracking leader vertex, helper for compute_scc'''
-        global leader_trckr, leaders, explored
-
-        explored[start] = True
-        verts = Stack()
-        verts.push(start)
-
-        while not verts.is_empty():
-            vert = verts.top()  # which vertex is currently first in the stack
-            for edge in self.vertices[vert]:
-                next_vert = self.edges[edge][forwards]
+    def __csr_arrays__(self, forwards=True):
+        '''
+           Helper function to number the verts 0..n-1 (in the order they were added to the graph)
+           and lay out the edges pointing away from (or towards, with forwards=False) each vert in
+           compressed sparse row form, so the edges of vert i point to the verts at
+           out_verts[out_start[i]:out_start[i+1]]. Self loops are left out. Return the tuple of arrays
+           (labels, vert_index, out_start, out_verts), where labels[i] is the label of vert i, and
+           vert_index[label] is the number of that vert (or -1 if label isn't a vert of the graph).
+        '''
+        labels = np.fromiter(self.vertices, dtype=np.int64, count=len(self.vertices))
+        vert_index = np.full(int(labels.max()) + 1, -1, dtype=np.int64)
+        vert_index[labels] = np.arange(len(labels))
+
+        # every vert holds all of its incident edges, in both directions
+        num_incident = np.fromiter((len(edges) for edges in self.vertices.values()),
+                                   dtype=np.int64, count=len(labels))
+        incident = np.fromiter(chain.from_iterable(self.vertices.values()), dtype=np.int64,
+                               count=int(num_incident.sum()))
+        verts = np.repeat(np.arange(len(labels)), num_incident)
+
+        # look up both ends of every edge, by edge id
+        edge_ids = np.fromiter(self.edges, dtype=np.int64, count=len(self.edges))
+        edge_ends = np.zeros((int(edge_ids.max(initial=0)) + 1, 2), dtype=np.int64)
+        edge_ends[edge_ids] = np.array([edge[:2] for edge in self.edges.values()],
+                                       dtype=np.int64).reshape(-1, 2)
+        near = vert_index[edge_ends[incident, int(not forwards)]]
+        far = vert_index[edge_ends[incident, int(forwards)]]
+
+        # only interested in edges pointing AWAY from this vertex
+        keep = (near == verts) & (far != verts)
+        out_start = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(verts[keep], minlength=len(labels)), out=out_start[1:])
+        return labels, vert_index, out_start, far[keep]
+
+
+    def compute_scc_ids(self):
+        '''
+           This function computes the strongly connected components of this graph using Tarjan's
+           single pass algorithm (see tarjan_scc), after numbering the verts 0..n-1 and laying out
+           the edges pointing away from each vert in CSR arrays. Return the tuple (array of the
+           component id of every vert, indexed by vert label, with -1 for labels that aren't verts
+           of the graph, array of the size of every component).
+        '''
+        if not self.vertices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        labels, vert_index, out_start, out_verts = self.__csr_arrays__()
 
-                # if edge points IN towards current vertex or we've seen it already, not interested
-                if next_vert == vert or explored[next_vert]:
-                    continue
+        comp, comp_sizes = tarjan_scc(out_start.tolist(), out_verts.tolist())
+        comp_ids = np.full(len(vert_index), -1, dtype=np.int64)
+        comp_ids[labels] = np.frombuffer(comp, dtype=np.int64)
+        return comp_ids, np.array(comp_sizes, dtype=np.int64)
 
-                # it is a vertex we're interested in: mark explored, track it's leader, add to stack
-                explored[next_vert] = True
-                leaders[leader_trckr].add(next_vert)
-                verts.push(next_vert)
 
-            # done looping over all possible new vertices
-            if vert == verts.top():  # didn't put new vertices on stack, so we're done with top vertex
-                verts.pop()
+    def compute_scc(self):
+        '''
+           This function computes the strongly connected components of this graph (see compute_scc_ids).
+           Return the dict of each components vertices (each with an arbitrary leader as key).
+        '''
+        comp_ids, comp_sizes = self.compute_scc_ids()
+        return scc_groups(comp_ids, comp_sizes)
+
+
+class ContractionHierarchy:
+    '''
+       This class answers shortest path queries between pairs of verts of a graph in a fraction of
+       the time of dijkstra's algo, after a (much slower) preprocessing step, for when the graph
+       doesn't change and we query it over and over (i.e. a road network). The preprocessing
+       contracts the verts one at a time in order of importance: a vert is taken out of the graph,
+       and wherever a shortest path between two of its neighbors went through it, a shortcut edge
+       is added between them with the len of that path (unless a witness search finds another path
+       that is no longer). Every vert's rank is when it was contracted, and at the end every edge
+       (or shortcut) goes up from the lower ranked vert to the higher one. The order comes from
+       the edge difference (shortcuts a contraction would add minus the edges it removes) plus the
+       number of neighbors already contracted, which keeps the contractions spread evenly over
+       the graph. These priorities are kept in an indexed min heap, and updated lazily: the vert
+       at the top has its priority recomputed, and is only contracted if it's still the smallest.
+       The upward edges are laid out in CSR arrays, which are saved to (and loaded back from, if
+       they are for this graph, with the same edges, weights and settle_limit) the binary file
+       fname, if given (see graph_loader.write_arrays).
+       Queries are then a bidirectional dijkstra from source and target that only ever goes up
+       to higher ranked verts (the graph is undirected, so the upward graph is also the downward
+       graph, reversed), and the shortcuts on the path found are unpacked back into the edges
+       they stand for. settle_limit bounds the number of verts each witness search explores:
+       witnesses a search gives up on just mean a few extra shortcuts, never wrong answers.
+    '''
+    def __init__(self, graph, fname=None, settle_limit=64):
+        key = ['contraction_hierarchy', graph.num_verts, graph.num_edges, settle_limit,
+               graph.__edges_hash__()]
+        arrays = read_arrays(fname, key) if fname is not None else None
+        if arrays is None:
+            arrays = self.__build__(graph, settle_limit)
+            if fname is not None:
+                write_arrays(fname, arrays, key)
+        self.__set_arrays__(*arrays)
+
+
+    def __witness_search__(self, adj, source, skip_vert, targets, max_dist, settle_limit):
+        '''
+           Dijkstra's algo in the graph adj from source, not going through skip_vert, that stops
+           once every vert in targets has been explored, once path lens go over max_dist, or
+           after exploring settle_limit verts. Return the dict of path lens found so far (each one
+           the len of an actual path, so no longer than the shortest path len to that vert).
+        '''
+        path_lens = {source: 0}
+        explored = set()
+        targets_left = len(targets)
+        poss_edges_heap = [(0, source)]
+        while poss_edges_heap and targets_left and len(explored) < settle_limit:
+            path, vert = heappop(poss_edges_heap)
+            if vert in explored:  # stale entry
+                continue
+            if path > max_dist:
+                break
+            explored.add(vert)
+            if vert in targets:
+                targets_left -= 1
+            for dest_vert, edge_len in adj[vert].items():
+                if dest_vert != skip_vert and path + edge_len < path_lens.get(dest_vert, float('inf')):
+                    path_lens[dest_vert] = path + edge_len
+                    heappush(poss_edges_heap, (path + edge_len, dest_vert))
+        return path_lens
 
 
-    def compute_scc(self):
+    def __shortcuts__(self, adj, vert, settle_limit):
+        '''
+           Return the list of shortcuts (neighbor 1, neighbor 2, path len) that contracting vert out
+           of the graph adj would need, one for every pair of its neighbors whose shortest path goes
+           through vert.
         '''
-           This function computes the strongly connected components of this graph
-           using Kosarju's algorithm. Return the dict of each components vertices.
+        neighbors = list(adj[vert].items())
+        shortcuts = []
+        for i, (vert1, edge_len1) in enumerate(neighbors):
+            targets = {vert2: edge_len1 + edge_len2 for vert2, edge_len2 in neighbors[i + 1:]}
+            if not targets:
+                continue
+            path_lens = self.__witness_search__(adj, vert1, vert, targets, max(targets.values()),
+                                                settle_limit)
+            for vert2, via_len in targets.items():
+                if path_lens.get(vert2, float('inf')) > via_len:
+                    shortcuts.append((vert1, vert2, via_len))
+        return shortcuts
+
+
+    def __build__(self, graph, settle_limit):
         '''
-        global label, label_ctr, leaders, leader_trckr, explored
+           Contract every vert of graph, and return the list of arrays [labels, ranks, up_start,
+           up_heads, up_weights, up_middle] laying out the upward graph: the edges going up from
+           vert index i are at positions up_start[i]:up_start[i+1] of the others, with up_middle
+           the vert index a shortcut skips over (-1 for original edges). Verts are numbered by
+           their position in labels. O(n * witness searches) time, minutes for big graphs.
+        '''
+        labels = list(graph.vertices)
+        vert_index = {v: i for i, v in enumerate(labels)}
+        n = len(labels)
+
+        # working graph as a dict of {neighbor: edge len} for every vert, keeping only the
+        # shortest of parallel edges and dropping self loops, and the vert every shortcut skips
+        adj = [{} for _ in range(n)]
+        for vert1, vert2, edge_len in graph.edges.values():
+            i, j = vert_index[vert1], vert_index[vert2]
+            if i != j and edge_len < adj[i].get(j, float('inf')):
+                adj[i][j] = adj[j][i] = edge_len
+        middles = {}  # {(vert index, vert index), smaller first: index of vert the shortcut skips}
+
+        contracted_neighbors = [0] * n
+        def priority(vert):
+            shortcuts = self.__shortcuts__(adj, vert, settle_limit)
+            return len(shortcuts) - len(adj[vert]) + contracted_neighbors[vert], shortcuts
+
+        verts_left = IndexedMinHeap()
+        verts_left.heapify(range(n), (priority(vert)[0] for vert in range(n)))
+        ranks = np.empty(n, dtype=np.int64)
+        up_edges = [None] * n
+        rank = 0
+        while verts_left.size != 0:
+            vert, _ = verts_left.extract_min()
+            vert_priority, shortcuts = priority(vert)
+            if verts_left.size != 0 and vert_priority > verts_left.get_min()[1]:
+                verts_left.insert(vert, vert_priority)  # not the least important vert any more
+                continue
+
+            # contract vert: everything it's still joined to is ranked higher
+            ranks[vert] = rank
+            rank += 1
+            up_edges[vert] = [(dest_vert, edge_len, middles.get((min(vert, dest_vert),
+                               max(vert, dest_vert)), -1)) for dest_vert, edge_len in adj[vert].items()]
+            for dest_vert in adj[vert]:
+                del adj[dest_vert][vert]
+                contracted_neighbors[dest_vert] += 1
+            adj[vert] = {}
+            for vert1, vert2, via_len in shortcuts:
+                adj[vert1][vert2] = adj[vert2][vert1] = via_len
+                middles[(min(vert1, vert2), max(vert1, vert2))] = vert
+
+        up_start = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(edges) for edges in up_edges], out=up_start[1:])
+        up_edges = list(chain.from_iterable(up_edges))
+        return [np.array(labels, dtype=np.int64), ranks, up_start,
+                np.array([edge[0] for edge in up_edges], dtype=np.int64),
+                np.array([edge[1] for edge in up_edges]),
+                np.array([edge[2] for edge in up_edges], dtype=np.int64)]
+
+
+    def __set_arrays__(self, labels, ranks, up_start, up_heads, up_weights, up_middle):
+        ''' Unpack the upward graph arrays into lists and dicts for fast queries. '''
+        self.labels = labels.tolist()
+        self.vert_index = {v: i for i, v in enumerate(self.labels)}
+        self.ranks = ranks.tolist()
+        starts, heads, weights = up_start.tolist(), up_heads.tolist(), up_weights.tolist()
+        self.up_adj = [list(zip(heads[starts[i]:starts[i + 1]], weights[starts[i]:starts[i + 1]]))
+                       for i in range(len(self.labels))]
+        # {(lower ranked vert index, higher ranked vert index): index of vert the shortcut skips}
+        self.middles = {}
+        for i in range(len(self.labels)):
+            for e in range(starts[i], starts[i + 1]):
+                if up_middle[e] != -1:
+                    self.middles[(i, heads[e])] = int(up_middle[e])
+        self.num_shortcuts = len(self.middles)
+
+
+    def __unpack__(self, path):
+        ''' Replace every shortcut on path (a list of vert indices) with the edges it stands for. '''
+        unpacked = [path[0]]
+        for vert1, vert2 in zip(path, path[1:]):
+            stack = [(vert1, vert2)]
+            while stack:
+                vert1, vert2 = stack.pop()
+                edge = (vert1, vert2) if self.ranks[vert1] < self.ranks[vert2] else (vert2, vert1)
+                if edge in self.middles:
+                    middle = self.middles[edge]
+                    stack.append((middle, vert2))  # the first half comes off the stack first
+                    stack.append((vert1, middle))
+                else:
+                    unpacked.append(vert2)
+        return unpacked
 
-        label = {}
-        label_ctr = 0
-        leaders = {}
-        leader_trckr = None
-        explored = {v: False for v in list(self.vertices)}  # allow for vertices not labelled from 1..n
 
-        # DFS on reverse of graph first from all nodes until all have been explored
-        for vert in self.vertices:
-            if not explored[vert]:
-                self.__DFS_finishtime__(start=vert, forwards=False)
-
-        # reset explored vertices to all being unexplored
-        explored = {v: False for v in list(self.vertices)}
-
-        # DFS on original (non-reversed) graph checking all vertices from largest finish time to smallest
-        for finish_time in range(self.num_verts, 0, -1):
-            # want the vertex corresponding to this finish time as calculated in previous step
-            vert = label[finish_time]
-            if not explored[vert]:
-                leader_trckr = vert
-                leaders[leader_trckr] = {vert}
-                self.__DFS_leaders__(start=vert)
-
-        # the SCC's are now contained in the leaders dict
-        return leaders
+    def shortest_path(self, source: int, target: int):
+        '''
+           Bidirectional dijkstra's algo on the upward graph, from source and from target. The
+           shortest path from source to target goes up and then down in rank (with shortcuts for
+           the verts it passes that were contracted earlier), so the two searches meet at its
+           highest ranked vert. Each search stops once the path len at the top of its heap is no
+           shorter than the shortest path found so far, and doesn't go on from verts that can be
+           reached with a shorter path through a higher ranked neighbor (stall on demand), as
+           those can't be on the shortest path. Return the tuple (shortest path len, path
+           as a list of verts from source to target, number of verts explored), with
+           (+inf, None, number explored) if there's no path.
+        '''
+        s, t = self.vert_index[source], self.vert_index[target]
+        if s == t:
+            return 0, [source], 1
+
+        # index 0 is the search from source, index 1 the search from target
+        path_lens = ({s: 0}, {t: 0})
+        pred_verts = ({s: None}, {t: None})
+        explored = (set(), set())
+        poss_edges_heaps = ([(0, s)], [(0, t)])
+        best_len, meet_vert = float('inf'), None
+
+        while poss_edges_heaps[0] or poss_edges_heaps[1]:
+            # step whichever search has the shorter path len at the top of its heap
+            if not poss_edges_heaps[1] or (poss_edges_heaps[0] and
+                                           poss_edges_heaps[0][0][0] <= poss_edges_heaps[1][0][0]):
+                side = 0
+            else:
+                side = 1
+            path, vert = heappop(poss_edges_heaps[side])
+            if path >= best_len:  # nothing left in this search can give a shorter path
+                poss_edges_heaps[side].clear()
+                continue
+            if vert in explored[side]:  # stale entry
+                continue
+            explored[side].add(vert)
+            if vert in path_lens[1 - side] and path + path_lens[1 - side][vert] < best_len:
+                best_len, meet_vert = path + path_lens[1 - side][vert], vert
+
+            # stall on demand: if a higher ranked neighbor was reached with a path that is shorter
+            # through it, then this vert isn't on any shortest path, so don't go on from it
+            lens = path_lens[side]
+            if any(lens.get(dest_vert, float('inf')) + edge_len < path
+                   for dest_vert, edge_len in self.up_adj[vert]):
+                continue
+            for dest_vert, edge_len in self.up_adj[vert]:
+                if path + edge_len < lens.get(dest_vert, float('inf')):
+                    lens[dest_vert] = path + edge_len
+                    pred_verts[side][dest_vert] = vert
+                    heappush(poss_edges_heaps[side], (path + edge_len, dest_vert))
+
+        num_explored = len(explored[0]) + len(explored[1])
+        if meet_vert is None:
+            return float('inf'), None, num_explored
+
+        up_path = [meet_vert]
+        while pred_verts[0][up_path[-1]] is not None:
+            up_path.append(pred_verts[0][up_path[-1]])
+        down_path = [meet_vert]
+        while pred_verts[1][down_path[-1]] is not None:
+            down_path.append(pred_verts[1][down_path[-1]])
+        path = self.__unpack__(up_path[::-1] + down_path[1:])
+        return best_len, [self.labels[i] for i in path], num_explored
@@ -8,17 +8,18 @@
 
 
 from graph import Graph
+from graph_loader import load_edge_list
 import time
 
 
 def main():
     test_graph = Graph()
 
-    with open('edges.txt') as graph_info:
-        _ = next(graph_info)  # don't need the first line of data file
-        for graph_line in graph_info:
-            data = [int(n) for n in graph_line.strip().split(' ')]
-            test_graph.add_edge(*data)
+    # don't need the first line of data file, parse the rest into arrays and add all edges at once
+    # (or memory map the arrays back from the cache file of a previous run, if it's up to date)
+    _, (verts1, verts2, weights) = load_edge_list('edges.txt', num_cols=3, header=True,
+                                                  cache=True)
+    test_graph.add_edges(verts1, verts2, weights)
 
     # compute MST using Prim's algorithm, return sum of all edges in it
     min_spantree_len = test_graph.compute_minspantree()
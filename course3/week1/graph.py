@@ -54,47 +54,59 @@ class Graph:
         self.__update_vert__(vert2)
 
 
-    def compute_minspantree(self):
+    def add_edges(self, verts1, verts2, weights):
         '''
-           Use Prim's algorithm to compute the MST of the graph. This function uses a
-           min-heap data structure to keep track of next edge to look at, runs in O(m*log(n))
-           time. The return value here is simply the sum of all edge costs belonging to the MST.
+           Add many edges to the graph at once, connecting verts1[i] and verts2[i] with weight of
+           weights[i], given as numpy arrays (i.e. from graph_loader). Same result as calling
+           add_edge on each edge, but without the overhead of three method calls per edge.
         '''
-        # initialize len of MST and a min heap to store all vertices and the shortest edge
-        # len incident on it add all vertices to heap as data structure Vert_Edge, with
-        # +inf as initial edge len and set source vertex edge len to be 0
+        vertices, edges = self.vertices, self.edges
+        edge = self.num_edges
+        for vert1, vert2, weight in zip(verts1.tolist(), verts2.tolist(), weights.tolist()):
+            edge += 1
+            edges[edge] = [vert1, vert2, weight]
+            for vert in (vert1, vert2):
+                if vert in vertices:
+                    vertices[vert].add(edge)
+                else:
+                    vertices[vert] = {edge}
+
+        self.num_edges = edge
+        self.num_verts = len(vertices)
+
+
+    def compute_minspantree(self, arity=4):
+        '''
+           Use Prim's algorithm to compute the MST of the graph. This function uses an indexed
+           min-heap (with arity children per node, see heap.py) to keep track of next edge to look
+           at, runs in O(m*log(n)) time. The return value here is simply the sum of all edge costs
+           belonging to the MST.
+        '''
+        # initialize len of MST and an indexed min heap to store all vertices keyed by the shortest
+        # edge len incident on it. add all vertices to heap at once (heapify, O(n)) with +inf as
+        # initial edge len and set source vertex edge len to be 0
         MST_len = 0
         source = list(self.vertices.keys())[0]  # pick an arbitrary vertex to start with
-        remaining_verts = MinHeap()
-        for vert in self.vertices:
-            remaining_verts.insert(Vert_Edge(vert))
-        remaining_verts.delete(source)
-        remaining_verts.insert(Vert_Edge(vert=source, min_edge=0))
+        remaining_verts = IndexedMinHeap(arity)
+        remaining_verts.heapify(self.vertices, (0 if vert == source else float('inf')
+                                                for vert in self.vertices))
 
         while remaining_verts.size != 0:  # O(1)
             # extract min from heap - this vertex gets added to our "conquered" vertices
             # and its shortest qualifying edge len (which is in heap) gets added to MST len
-            next_ve = remaining_verts.extract_min()  # this vertex is no longer in our heap, O(log(n))
-            vert = next_ve.vert
-            edge = next_ve.min_edge
+            vert, edge = remaining_verts.extract_min()  # this vertex is no longer in our heap, O(log(n))
             MST_len += edge
 
             # go through all edges vert connects to in this graph, if connecting vert
-            # is not in heap we don't care. otherwise, find it in the heap, and check
-            # if we need to update the shortest edge len
+            # is not in heap we don't care. otherwise, check if we need to update the
+            # shortest edge len
             for edge in self.vertices[vert]:
                 # extract the vertex and edge length that this edge contains
                 dest_vert = self.edges[edge][0] if self.edges[edge][0] != vert else self.edges[edge][1]
                 edge_len = self.edges[edge][2]
 
-                # check if this vertex is in the heap, and if so find it's index
-                heap_ind = remaining_verts.find(dest_vert)
-                if heap_ind == None:  # this vertex has already been explored, we can skip this
-                    continue
-
-                # otherwise we need to update the path len of this vertex in the heap
-                # the heap data structure will automatically compare the values and only
-                # change it if it is smaller than the current path len, and sift accordingly
-                remaining_verts.update_len(vert=dest_vert, new_len=edge_len)
+                # decrease key only changes the edge len if it is smaller than the current one
+                # (and the vert is still in the heap), and sifts it up accordingly, O(log(n))
+                remaining_verts.decrease_key(dest_vert, edge_len)
 
         return MST_len
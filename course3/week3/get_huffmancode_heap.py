@@ -21,7 +21,9 @@
    that). In this program, I implement the algorithm via maintaining the characters in a
    Min Heap, merging the two min characters from the heap into one, until all have been
    merged into one. This code ran in ~0.039130 seconds (compare to queue-version of this
-   algorithm which ran in ~0.023852 seconds).
+   algorithm which ran in ~0.023852 seconds). The heap is an indexed min heap of char
+   indices keyed by their weights (the Character objects themselves are kept in a dict by
+   index), so the heap only ever compares plain floats rather than Character objects.
 '''
 
 from data_structures import *
@@ -29,8 +31,10 @@ import time
 
 
 def main():
-    # initialize the min heap to store the characters sorted by their weights
-    alphabet = MinHeap()
+    # initialize the indexed min heap to store the characters' indices sorted by their weights,
+    # along with a dict of {char index: Character} for the characters currently in the heap
+    alphabet = IndexedMinHeap()
+    chars = {}
 
     with open('huffman.txt') as alphabet_info:
         num_chars = int(next(alphabet_info).strip())
@@ -43,9 +47,12 @@ def main():
                   'encoding length will trivially be 1')
             return
 
-        # go through the chars from input file, add them as Character objects to the heap
+        # go through the chars from input file, make them into Character objects
         for ind,char_weight in enumerate(alphabet_info):
-            alphabet.insert( Character( ind, float( char_weight.strip() ) ) )
+            chars[ind] = Character( ind, float( char_weight.strip() ) )
+
+    # add all of the chars to the heap at once, O(n)
+    alphabet.heapify(chars, [char.weight for char in chars.values()])
 
     # all of our characters are now in the heap. for this algo, we want to "merge" the two
     # minimum weight chars from our current alphabet. to do this, we extract the two min
@@ -56,13 +63,14 @@ def main():
     # as we merge, we build our binary tree of encodings, and at the end we have one value left
     # in the heap which is actually our encoding tree with all chars as leaves!
     while alphabet.size > 1:
-        min_char1 = alphabet.extract_min()
-        min_char2 = alphabet.extract_min()
+        (min_ind1, _), (min_ind2, _) = alphabet.extract_k(2)
+        min_char1, min_char2 = chars.pop(min_ind1), chars.pop(min_ind2)
         new_val = min_char1.char_val
         new_weight = min_char1.weight + min_char2.weight
         new_internal_char = Character(char_val=new_val, weight=new_weight,
                                       left=min_char1, right=min_char2)
-        alphabet.insert(new_internal_char)
+        chars[new_val] = new_internal_char
+        alphabet.insert(new_val, new_weight)
 
     # we've now merged all chars into one in our heap, and this val is our tree that
     # contains our alphabets optimal encoding based on the weights of characters provided!
@@ -72,7 +80,7 @@ def main():
     # when we see our first leaf, this is the minimum encoding length of a char in our alphabet
     # when we finally reach an empty level, this is max encoding length of a char in our alphabet
     BFS_queue = Queue()
-    BFS_queue.enqueue(alphabet.get_min())
+    BFS_queue.enqueue(chars[alphabet.get_min()[0]])
     depth = -1
     min_encoding = -1
     avg_encoding = 0
@@ -2,6 +2,7 @@
 
 
 from graph import Graph
+from graph_loader import load_edge_list, load_adjacency_list
 import sys
 import time
 
@@ -34,21 +35,14 @@ def main():
           '\n {0} using an iterative algorithm approach'.format(fname))
 
     test_graph = Graph()
-
+    # parse the whole file into arrays of sources, dests and costs at once, and add all edges
+    # (or memory map the arrays back from the cache file of a previous run, if it's up to date)
     if fname == 'dijkstraData.txt':
-        with open(fname) as graph_info:
-            for graph_line in graph_info:
-                data = graph_line.strip().split('\t')
-                source = int(data[0])
-                for dest_data in data[1:]:
-                    dest, cost = [int(d) for d in dest_data.split(',')]
-                    test_graph.add_edge(source, dest, cost)
-    else:
-        with open(fname) as graph_info:  # test with g1.txt, g2.txt, g3.txt, or large.txt
-            _ = next(graph_info)  # don't need the info in the first line of data file
-            for graph_line in graph_info:
-                source, dest, cost = [int(d) for d in graph_line.strip().split(' ')]
-                test_graph.add_edge(source, dest, cost)
+        sources, dests, costs = load_adjacency_list(fname, cache=True)
+    else:  # test with g1.txt, g2.txt, g3.txt, or large.txt
+        # don't need the info in the first line of data file
+        _, (sources, dests, costs) = load_edge_list(fname, num_cols=3, header=True, cache=True)
+    test_graph.add_edges(sources, dests, costs)
 
     # find all shortest paths from source vertex, result will be dict of dest_vert: path length
     source_vert = 1  # to test/check
@@ -56,11 +50,15 @@ def main():
 
     # both implementations give same result, but iterative method uses O(n) space and completes faster
     # while the recursive method uses O(n^2) space. both can recreate the actual shortest paths
-    shortest_paths = test_graph.compute_shortest_paths_BF_iter(source_vert)
+    # the work queue method only relaxes edges out of verts whose path changed, so it is faster
+    # still, and also gives us back the negative cycle it found (if any)
+    shortest_paths, neg_cycle = test_graph.compute_shortest_paths_BF_queue(source_vert)
+    #shortest_paths = test_graph.compute_shortest_paths_BF_iter(source_vert)
     #shortest_paths = test_graph.compute_shortest_paths_BF_recurs(source_vert)
 
     if shortest_paths == None:
         print('\n There are negative cycles present in this graph reachable from the source vertex!')
+        print('\n For example, the cycle {0}'.format(neg_cycle))
     else:
         print('\n The lengths of shortest paths from vert 1 to verts\n {0}\n are:\n'.format(dest_verts))
         print('\n {0}\n'.format(','.join([str(shortest_paths[dest]) for dest in dest_verts])))
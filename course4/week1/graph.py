@@ -3,28 +3,257 @@
 
 
 from heap import *
+from collections import deque, OrderedDict
+from heapq import heappush, heappop
+from multiprocessing import Pool, shared_memory
+import hashlib
+import numpy as np
+import os
 
 
-class Vert_Path:
+class APSPResult:
     '''
-       This class is used to instantiate objects to insert to a Min Heap, representing verts
-       while also tracking their current shortest path calculated, and comparing values
-       based on current shortest path length instead of vert number.
+       This class holds the answer to an all pairs shortest paths problem. Path lengths are kept in
+       one contiguous n x n numpy array (+inf where no path exists), with row/col i belonging to the
+       i-th vertex in sorted order, and a {vertex: row/col index} dict to look vertices up in O(1).
+       To reconstruct the actual paths, either the Floyd-Warshall max internal vertex array or the
+       Johnson (dijkstra) predecessor array is kept along with it. Both are n x n int32 arrays of
+       row/col indices, with -1 meaning there is no max internal/predecessor vertex.
     '''
-    def __init__(self, vert=None, path_len=float('inf')):
-        self.vert = vert
-        self.path_len = path_len
+    def __init__(self, verts, dists, max_internal=None, preds=None):
+        self.verts = verts
+        self.vert_ind = {v: i for i, v in enumerate(verts)}
+        self.dists = dists
+        self.max_internal = max_internal
+        self.preds = preds
 
-    def set_path_len(self, new_path_len):
-        self.path_len = new_path_len
 
-    # make all ordering comparisons based on path_len
-    def __lt__(self, other): return self.path_len < other.path_len
-    def __le__(self, other): return self.path_len <= other.path_len
-    def __gt__(self, other): return self.path_len > other.path_len
-    def __ge__(self, other): return self.path_len >= other.path_len
-    def __eq__(self, other): return self.path_len == other.path_len
-    def __ne__(self, other): return self.path_len != other.path_len
+    def dist(self, source, dest):
+        ''' Return the shortest path length from source vert to dest vert. O(1) '''
+        return self.dists[self.vert_ind[source], self.vert_ind[dest]]
+
+
+    def row(self, source):
+        ''' Return a view of the shortest path lens from source vert to every vert. O(1) '''
+        return self.dists[self.vert_ind[source]]
+
+
+    def col(self, dest):
+        ''' Return a view of the shortest path lens from every vert to dest vert. O(1) '''
+        return self.dists[:, self.vert_ind[dest]]
+
+
+    def argmin(self):
+        ''' Return (source, dest, path len) of the shortest shortest path in the graph. O(n^2) '''
+        i, j = np.unravel_index(np.argmin(self.dists), self.dists.shape)
+        return self.verts[i], self.verts[j], self.dists[i, j]
+
+
+    def path(self, source, dest):
+        '''
+           Reconstruct and return the shortest path from source vert to dest vert as a list of verts,
+           or None if there is no path. With the max internal verts (from Floyd-Warshall), we split
+           each pair (i,j) into the two sub-paths (i,mid) and (mid,j) until no pair has an internal
+           vertex left, using a stack rather than recursion. With the predecessor verts (from
+           Johnson) we just walk back from dest along the row of predecessors of source.
+        '''
+        i, j = self.vert_ind[source], self.vert_ind[dest]
+        if self.dists[i, j] == float('inf'):
+            return None
+        if i == j:
+            return [source]
+
+        if self.max_internal is not None:
+            path = []
+            pairs = [(i, j)]
+            while pairs:
+                i, j = pairs.pop()
+                mid = self.max_internal[i, j]
+                if mid == -1:
+                    path.append(self.verts[i])
+                else:  # push the second half first so we finish the first half before it
+                    pairs.append((mid, j))
+                    pairs.append((i, mid))
+            return path + [dest]
+
+        path = [dest]
+        while j != i:
+            j = self.preds[i, j]
+            path.append(self.verts[j])
+        return path[::-1]
+
+
+    def update_edge(self, source, dest, cost):
+        '''
+           Update the answers after an edge from source vert to dest vert weighing cost is added to
+           the graph (or an existing edge gets cheaper), without recomputing everything. The only new
+           paths are the ones that use the new edge, and a shortest path uses it at most once (else
+           it would contain a cycle through it), so the new shortest path from v to w is either the
+           old one, or the old path from v to source, then the new edge, then the old path from dest
+           to w. That's a single O(n^2) broadcast over all pairs. If the old path from dest back to
+           source plus the new edge costs less than 0, the new edge creates a negative cycle, so we
+           return None and leave the answers as they were. For the path reconstruction, the pairs
+           that got shorter have source as their max internal vertex (or dest, for paths starting at
+           source), or with predecessor verts, the same predecessor as on the path from dest (or
+           source itself for dest). Returns the number of pairs whose path len got shorter.
+        '''
+        i, j = self.vert_ind[source], self.vert_ind[dest]
+        if self.dists[j, i] + cost < 0:  # the new edge creates a negative cycle
+            return None
+
+        diff_path = self.dists[:, i, None] + cost + self.dists[None, j, :]
+        shorter = diff_path < self.dists
+        np.copyto(self.dists, diff_path, where=shorter)
+
+        if self.max_internal is not None:
+            new_mids = np.full(self.dists.shape, i, dtype=np.int32)
+            new_mids[i] = j  # paths starting at source go source -> dest -> w
+            new_mids[i, j] = -1  # and source -> dest is now just the edge itself
+            np.copyto(self.max_internal, new_mids, where=shorter)
+        if self.preds is not None:
+            new_preds = np.array(self.preds[j])
+            new_preds[j] = i
+            np.copyto(self.preds, new_preds[None, :], where=shorter)
+
+        return int(shorter.sum())
+
+
+# binary row files written by Graph.compute_APSP_Johnson_stream start with this header: the magic
+# bytes, then n and the n vertex labels (as int64), followed by n fixed width rows, where row i is
+# the n float64 path lens from vertex i followed by the n int32 predecessor vertex indices
+ROWS_MAGIC = b'APSPROW1'
+
+
+def rows_dtype(n):
+    ''' Return the numpy dtype of a single row of a binary row file of a graph with n verts. '''
+    return np.dtype([('dists', np.float64, (n,)), ('preds', np.int32, (n,))])
+
+
+def load_apsp_rows(fname):
+    '''
+       Memory map a binary row file written by Graph.compute_APSP_Johnson_stream, and return it as
+       an APSPResult. Nothing is read into memory until it is looked up. The map is copy on write,
+       so APSPResult.update_edge works on it, but the changes are only kept in memory (every page
+       it touches gets copied, which for update_edge is all of them) and never written to fname.
+    '''
+    with open(fname, 'rb') as rows_file:
+        if rows_file.read(len(ROWS_MAGIC)) != ROWS_MAGIC:
+            raise ValueError('Warning: {0} is not an APSP binary row file'.format(fname))
+        n = int(np.fromfile(rows_file, dtype=np.int64, count=1)[0])
+        verts = [int(v) for v in np.fromfile(rows_file, dtype=np.int64, count=n)]
+        header_size = rows_file.tell()
+    rows = np.memmap(fname, dtype=rows_dtype(n), mode='c', offset=header_size, shape=(n,))
+    return APSPResult(verts, rows['dists'], preds=rows['preds'])
+
+
+# the worker processes used by Graph.compute_APSP_Johnson_parallel each attach (once, when the
+# pool starts up) to the shared memory blocks holding the reweighted graph in compressed sparse
+# row form (out_start[i]:out_start[i+1] are the positions in out_verts/out_costs of the edges
+# pointing out of vertex index i), and keep these read-only numpy views of them as globals
+shared_blocks = []
+out_start = out_verts = out_costs = reweights = dijkstra_backend = None
+
+
+def init_johnson_worker(shared_arrays, vert_reweights, backend='heap'):
+    ''' Pool initializer, attach to the shared memory graph arrays by their block names. '''
+    global shared_blocks, out_start, out_verts, out_costs, reweights, dijkstra_backend
+
+    views = []
+    for name, shape, dtype in shared_arrays:
+        block = shared_memory.SharedMemory(name=name)
+        shared_blocks.append(block)  # keep a reference to the block so our view stays valid
+        views.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+    out_start, out_verts, out_costs = views
+    reweights = vert_reweights
+    dijkstra_backend = backend
+
+
+def dijkstra_csr(csr_start, csr_verts, csr_costs, source, arity=4, backend='heap'):
+    '''
+       Run dijkstra's algo from source vertex index on a graph in compressed sparse row form (see
+       Graph.get_reweighted_csr), and return an array of the shortest path lens to every vertex
+       index (+inf if no path exists) along with an int32 array of predecessor vertex indices (-1
+       for the source and verts with no path). With backend='heap' the verts are kept in an
+       indexed min heap with arity children per node (see heap.py), with backend='lazy' see
+       dijkstra_csr_lazy.
+    '''
+    if backend == 'lazy':
+        return dijkstra_csr_lazy(csr_start, csr_verts, csr_costs, source)
+    if backend != 'heap':
+        raise ValueError('Warning: dijkstra backend needs to be either heap or lazy')
+
+    n = len(csr_start) - 1
+    row = np.full(n, np.inf)
+    pred_row = np.full(n, -1, dtype=np.int32)
+
+    poss_edges_heap = IndexedMinHeap(arity)
+    poss_edges_heap.heapify(range(n), (0 if vert == source else float('inf') for vert in range(n)))
+
+    while poss_edges_heap.size != 0:
+        vert, path = poss_edges_heap.extract_min()
+        if path == float('inf'):  # the rest of the verts are unreachable from source
+            break
+        row[vert] = path
+
+        for e in range(csr_start[vert], csr_start[vert + 1]):
+            dest_vert = int(csr_verts[e])
+            if poss_edges_heap.decrease_key(dest_vert, path + csr_costs[e]) != None:
+                pred_row[dest_vert] = vert
+
+    return row, pred_row
+
+
+def dijkstra_csr_lazy(csr_start, csr_verts, csr_costs, source):
+    '''
+       Same as dijkstra_csr, but with lazy deletion on python's heapq (a binary heap implemented in
+       C) of plain (path len, vertex index) tuples. Instead of decreasing the key of a vert in the
+       heap, a new entry is pushed every time a shorter path to it is found, and stale entries are
+       skipped when they are popped. Only verts that have been reached are ever pushed, and the
+       out edges of each vert are read a whole slice at a time, so there is no per vert object or
+       python level comparison. O(m*log(n)) time.
+    '''
+    n = len(csr_start) - 1
+    starts = csr_start.tolist()
+    dists = [float('inf')] * n
+    preds = [-1] * n
+    explored = [False] * n
+    dists[source] = 0
+    poss_edges_heap = [(0, source)]
+
+    while poss_edges_heap:
+        path, vert = heappop(poss_edges_heap)
+        if explored[vert]:  # stale entry, vert has already been explored
+            continue
+        explored[vert] = True
+
+        start, end = starts[vert], starts[vert + 1]
+        for dest_vert, cost in zip(csr_verts[start:end].tolist(), csr_costs[start:end].tolist()):
+            if path + cost < dists[dest_vert]:
+                dists[dest_vert] = path + cost
+                preds[dest_vert] = vert
+                heappush(poss_edges_heap, (path + cost, dest_vert))
+
+    return np.array(dists), np.array(preds, dtype=np.int32)
+
+
+def johnson_worker_rows(sources):
+    '''
+       Run dijkstra's algo on the shared reweighted graph from each source vertex index in sources,
+       and return the sources along with (len(sources) x n) arrays of their rows of the final all
+       pairs shortest paths matrix (with the reweighting already undone) and predecessor matrix.
+    '''
+    n = len(out_start) - 1
+    rows = np.full((len(sources), n), np.inf)
+    pred_rows = np.full((len(sources), n), -1, dtype=np.int32)
+
+    for r, source in enumerate(sources):
+        rows[r], pred_rows[r] = dijkstra_csr(out_start, out_verts, out_costs, source,
+                                             backend=dijkstra_backend)
+
+        # re-adjust the shortest path lens to actual path length values
+        rows[r] += reweights - reweights[source]
+
+    return sources, rows, pred_rows
 
 
 class Graph:
@@ -57,6 +286,28 @@ class Graph:
         self.__update_vert__(dest, 1)
 
 
+    def add_edges(self, sources, dests, costs):
+        '''
+           Add many edges to the graph at once, pointing from sources[i] to dests[i] weighing
+           costs[i], given as numpy arrays (i.e. from graph_loader). Same result as calling add_edge
+           on each edge, but without the overhead of three method calls per edge.
+        '''
+        vertices, edges = self.vertices, self.edges
+        edge = self.num_edges
+        for source, dest, cost in zip(sources.tolist(), dests.tolist(), costs.tolist()):
+            edge += 1
+            edges[edge] = [source, dest, cost]
+            if source not in vertices:
+                vertices[source] = [set(), set()]
+            vertices[source][0].add(edge)
+            if dest not in vertices:
+                vertices[dest] = [set(), set()]
+            vertices[dest][1].add(edge)
+
+        self.num_edges = edge
+        self.num_verts = len(vertices)
+
+
     def delete_vertex(self, vert: int):
         removed_vert = self.vertices.pop(vert)  # try to remove vertex from dict
 
@@ -203,53 +454,152 @@ class Graph:
         return shortest_paths
 
 
-    def compute_shortest_paths_Dijkstra(self, source: int, edge_lens: dict):
+    def compute_shortest_paths_BF_queue(self, source: int):
+        '''
+           Use a work queue version of the Bellman-Ford algorithm to compute the shortest path from
+           source vertex to all other vertices in the graph. If no path exists, shortest path = +inf.
+           Instead of going over every edge in every iteration, we only relax the edges pointing out
+           of vertices whose path len changed since they were last looked at, keeping those vertices
+           in a FIFO queue (each vertex at most once). To detect negative cycles, we keep the tree of
+           predecessor verts (with each vertex's children) and use subtree disassembly: when a vertex
+           v gets a shorter path through u, all of v's descendants in the tree have path lens that
+           are now out of date, so we remove them from the tree (and skip them if they come up in the
+           queue, since they will get a shorter path through v later anyways). If u itself is one of
+           v's descendants, then the tree path from v to u plus the edge (u,v) is a negative cycle.
+           Each vertex removed from the tree had to be added to it first, so this only adds O(1)
+           amortized work per relaxation rather than checking every predecessor chain every round.
+           This is still O(nm) worst case, but usually much faster. Returns a tuple of the dict of
+           {dest vertex: path len} and None, or if there is a negative cycle reachable from source,
+           None and the list of verts in the cycle (in order, with an edge from the last to the first).
+        '''
+        shortest_paths = {v: float('inf') for v in self.vertices}
+        pred_verts = {v: None for v in self.vertices}
+        children = {v: set() for v in self.vertices}  # children of each vert in the pred tree
+        in_tree = {v: False for v in self.vertices}
+        shortest_paths[source] = 0
+        in_tree[source] = True
+
+        verts = deque([source])
+        queued = {source}
+        while verts:
+            vert = verts.popleft()
+            queued.remove(vert)
+            if not in_tree[vert]:  # path len out of date, it will be updated and queued again
+                continue
+
+            for edge in self.vertices[vert][0]:
+                _, dest_vert, cost = self.edges[edge]
+                new_path = shortest_paths[vert] + cost
+                if new_path >= shortest_paths[dest_vert]:
+                    continue
+
+                # disassemble the subtree of dest_vert, checking if vert is in it
+                subtree = [dest_vert]
+                while subtree:
+                    sub_vert = subtree.pop()
+                    if sub_vert == vert:  # we've found a negative cost cycle, uh oh
+                        cycle = [vert]
+                        while cycle[-1] != dest_vert:
+                            cycle.append(pred_verts[cycle[-1]])
+                        return None, cycle[::-1]
+                    if sub_vert != dest_vert:
+                        in_tree[sub_vert] = False
+                    subtree.extend(children[sub_vert])
+                    children[sub_vert] = set()
+
+                # now attach dest_vert to the tree under vert, and queue it up to look at
+                if pred_verts[dest_vert] != None:
+                    children[pred_verts[dest_vert]].discard(dest_vert)
+                shortest_paths[dest_vert] = new_path
+                pred_verts[dest_vert] = vert
+                children[vert].add(dest_vert)
+                in_tree[dest_vert] = True
+                if dest_vert not in queued:
+                    verts.append(dest_vert)
+                    queued.add(dest_vert)
+
+        return shortest_paths, None
+
+
+    def compute_shortest_paths_Dijkstra(self, source: int, edge_lens: dict, arity=4, backend='heap'):
         '''
            This method uses Dijkstra's algorithm to compute the shortest path from source vertex
-           to all other vertices in the graph. If no path exists, set shortest path = None.
-           This function uses a min-heap data structure to keep track of next edge to look at,
-           runs O(m*log(n)) time, and is slightly modified to use edge lengths passed into the
-           method rather than the edge lengths defined in the actual graph variables (for application
-           to Johnson's all pair shortest paths algo (see below)).
-        '''
-        # initialize shortest path dict of {dest vertex: path len}
-        shortest_paths = {'s{0}d{1}'.format(source, v): None for v in self.vertices}
-
-        # initialize a min heap to store all vertices and their shortest path lengths
-        # add all vertices to heap as data structure Vert_Path, with +inf as initial path len
-        # and set source vertex path len to be 0
-        poss_edges_heap = MinHeap()
-        for vert in self.vertices:
-            poss_edges_heap.insert(Vert_Path(vert))
-        poss_edges_heap.delete(source)
-        poss_edges_heap.insert(Vert_Path(vert=source, path_len=0))
+           to all other vertices in the graph. If no path exists, set shortest path = +inf.
+           This function uses an indexed min-heap (with arity children per node, see heap.py) to
+           keep track of next edge to look at (or with backend='lazy', python's heapq with lazy
+           deletion, see __shortest_paths_Dijkstra_lazy__), runs O(m*log(n)) time, and is slightly
+           modified to use edge lengths passed into the method rather than the edge lengths defined
+           in the actual graph variables (for application to Johnson's all pair shortest paths algo
+           (see below)). Returns the dict of shortest path lens along with a dict of predecessor
+           verts to reconstruct the actual shortest paths.
+        '''
+        if backend == 'lazy':
+            return self.__shortest_paths_Dijkstra_lazy__(source, edge_lens)
+        if backend != 'heap':
+            raise ValueError('Warning: dijkstra backend needs to be either heap or lazy')
+
+        # initialize shortest path dict of {dest vertex: path len} and predecessor verts
+        shortest_paths = {v: None for v in self.vertices}
+        pred_verts = {v: None for v in self.vertices}
+
+        # initialize an indexed min heap to store all vertices keyed by their shortest path lengths
+        # add all vertices to heap at once with +inf as initial path len, and source vertex path
+        # len of 0 (heapify builds the heap in O(n), rather than O(n*log(n)) for n inserts)
+        poss_edges_heap = IndexedMinHeap(arity)
+        poss_edges_heap.heapify(self.vertices, (0 if vert == source else float('inf')
+                                                for vert in self.vertices))
 
         while poss_edges_heap.size != 0:  # O(1)
             # extract min from heap - this vertex gets added to our "conquered" vertices
             # and its shortest path gets set
-            next_vp = poss_edges_heap.extract_min()  # this vertex is no longer in our heap, O(log(n))
-            vert = next_vp.vert
-            path = next_vp.path_len
-            shortest_paths['s{0}d{1}'.format(source, vert)] = path
+            vert, path = poss_edges_heap.extract_min()  # this vertex is no longer in our heap, O(log(n))
+            shortest_paths[vert] = path
 
             # go through all edges vert points to in this graph, if connecting vert
-            # is not in heap we don't care. otherwise, find it in the heap, and check
-            # if we need to update the path len to a shorter one
+            # is not in heap we don't care. otherwise, check if we need to update
+            # the path len to a shorter one
             for edge in self.vertices[vert][0]:
                 # extract the vertex and edge length that this edge contains
                 dest_vert = self.edges[edge][1]
 
-                # check if this vertex is in the heap, and if so find it's index
-                heap_ind = poss_edges_heap.find(dest_vert)
-                if heap_ind == None:  # this vertex has already been explored, we can skip this
-                    continue
+                # decrease key only changes the path len if it is smaller than the current one
+                # (and the vert is still in the heap), and sifts it up accordingly, O(log(n))
+                if poss_edges_heap.decrease_key(dest_vert, path + edge_lens[edge]) != None:
+                    pred_verts[dest_vert] = vert
 
-                # otherwise we need to update the path len of this vertex in the heap
-                # the heap data structure will automatically compare the values and only
-                # change it if it is smaller than the current path len, and sift accordingly
-                poss_edges_heap.update_len(vert=dest_vert, new_len=path+edge_lens[edge])
+        return shortest_paths, pred_verts
 
-        return shortest_paths
+
+    def __shortest_paths_Dijkstra_lazy__(self, source, edge_lens):
+        '''
+           Dijkstra's algorithm with lazy deletion, on python's heapq (a binary heap implemented in
+           C) of plain (path len, vert) tuples. Rather than decreasing the key of a vert already in
+           the heap, a new entry is pushed whenever a shorter path to it is found, and the stale
+           entries left behind are skipped when they are popped (the vert has been explored by then).
+           Only verts that have been reached are ever pushed. Same return values as
+           compute_shortest_paths_Dijkstra.
+        '''
+        shortest_paths = {v: float('inf') for v in self.vertices}
+        pred_verts = {v: None for v in self.vertices}
+        path_lens = {source: 0}  # shortest path len found so far to every vert reached
+        explored = set()
+        poss_edges_heap = [(0, source)]
+
+        while poss_edges_heap:
+            path, vert = heappop(poss_edges_heap)
+            if vert in explored:  # stale entry
+                continue
+            explored.add(vert)
+            shortest_paths[vert] = path
+
+            for edge in self.vertices[vert][0]:
+                dest_vert = self.edges[edge][1]
+                if path + edge_lens[edge] < path_lens.get(dest_vert, float('inf')):
+                    path_lens[dest_vert] = path + edge_lens[edge]
+                    pred_verts[dest_vert] = vert
+                    heappush(poss_edges_heap, (path + edge_lens[edge], dest_vert))
+
+        return shortest_paths, pred_verts
 
 
     def compute_APSP_FW(self):
@@ -278,7 +628,8 @@ class Graph:
            vertices are directly connected by their edge. Because of three nested loops over all
            vertices, this is an O(n^3) run-time algorithm. We only keep track of the previous
            iterations answers, the current iterations answers, and the max internal node for each
-           pair, so this only uses O(n^2) memory.
+           pair, so this only uses O(n^2) memory. The answers are returned as an APSPResult (or None
+           if there is a negative cycle).
         '''
         # if vertices not already labelled from 1..n, use this vertex mapping (and in loops also)
         #vert_map = {i: v for i,v in enumerate(self.vertices, start=1)}
@@ -320,14 +671,235 @@ class Graph:
 
                     if diff_path < shortest_prev[key]:
                         if v == w:  # there is a negative cycle in this graph!!
-                            return (None, None)
+                            return None
                         shortest_paths[key] = diff_path
                         max_internal[key] = k
 
-        return (max_internal, shortest_paths)
+        # copy the answers over into arrays, with verts 1..n at rows/cols 0..n-1
+        verts = list(range(1, self.num_verts + 1))
+        dists = np.array([[shortest_paths['s{0}d{1}'.format(v, w)] for w in verts] for v in verts],
+                         dtype=np.float64)
+        mids = np.array([[max_internal['s{0}d{1}'.format(v, w)] or 0 for w in verts] for v in verts],
+                        dtype=np.int32) - 1
+        return APSPResult(verts, dists, max_internal=mids)
 
 
-    def compute_APSP_Johnson(self):
+    def __edges_hash__(self):
+        '''
+           Return a hash of the endpoints and costs of every edge of the graph, which files saved
+           for this graph are keyed on, so they are never picked up again by a graph that has the
+           same number of verts but different edges or costs. O(m) time.
+        '''
+        edges = list(self.edges.values())
+        edge_hash = hashlib.sha1()
+        for arr in [np.array([edge[0] for edge in edges], dtype=np.int64),
+                    np.array([edge[1] for edge in edges], dtype=np.int64),
+                    np.array([edge[2] for edge in edges])]:
+            edge_hash.update(arr.dtype.str.encode())
+            edge_hash.update(arr.tobytes())
+        return edge_hash.hexdigest()
+
+
+    def get_vert_index(self):
+        '''
+           Helper function for the matrix based algorithms below, returns the list of vertices
+           in sorted order along with a dict of {vertex: row/col index} into that list, so that
+           a vertex labelled v is found at row vert_ind[v] of an n x n matrix (for our data files
+           which are labelled 1..n, this is simply v - 1).
+        '''
+        verts = sorted(self.vertices)
+        vert_ind = {v: i for i, v in enumerate(verts)}
+        return verts, vert_ind
+
+
+    def compute_APSP_FW_matrix(self):
+        '''
+           This method implements the same Floyd-Warshall algo as compute_APSP_FW above, but instead
+           of a dict keyed by 's{0}d{1}' strings, the shortest path lengths are kept in an n x n
+           numpy array of floats (+inf where no path exists), and the max internal vertices in an
+           n x n int32 array. Row/col i of both matrices corresponds to the i-th vertex in sorted
+           order (see get_vert_index), and max_internal holds the row index of the max internal
+           vertex used, or -1 if there is no internal vertex (either the pair is directly connected
+           by an edge, or there is no path at all, or source == dest). Each iteration over the
+           allowed internal vertex k is a single broadcast min-plus update over ALL PAIRS at once:
+           the path len through k from v to w is the column k entry of row v plus the row k entry
+           of column w, so adding the k-th column to the k-th row gives every candidate path len,
+           and we keep the elementwise minimum. We don't need a copy of the previous iteration's
+           answers as the k-th row and column can't change in iteration k (without a negative
+           cycle, which we catch right after), and the negative cycle check is then just reading
+           the diagonal for any negative path len from a vertex to itself. This is still O(n^3)
+           work and O(n^2) memory, but all of the inner loops now run inside numpy. The answers are
+           returned as an APSPResult (or None if there is a negative cycle).
+        '''
+        verts, vert_ind = self.get_vert_index()
+        n = len(verts)
+
+        # initialize shortest paths matrix with direct edge costs (keeping the cheapest edge if
+        # there are parallel edges), 0 on the diagonal and +inf everywhere else
+        shortest_paths = np.full((n, n), np.inf)
+        for v, w, c in self.edges.values():
+            i, j = vert_ind[v], vert_ind[w]
+            if c < shortest_paths[i, j]:
+                shortest_paths[i, j] = c
+        np.fill_diagonal(shortest_paths, np.minimum(np.diagonal(shortest_paths), 0))
+        if (np.diagonal(shortest_paths) < 0).any():  # a negative cost self loop
+            return None
+        max_internal = np.full((n, n), -1, dtype=np.int32)
+
+        for k in range(n):
+            # every path from v to w through k, as one (n x n) matrix of candidate path lens
+            diff_path = shortest_paths[:, k, None] + shortest_paths[None, k, :]
+            shorter = diff_path < shortest_paths
+            np.copyto(shortest_paths, diff_path, where=shorter)
+            max_internal[shorter] = k
+
+            if (np.diagonal(shortest_paths) < 0).any():  # there is a negative cycle in this graph!!
+                return None
+
+        return APSPResult(verts, shortest_paths, max_internal=max_internal)
+
+
+    def compute_APSP_FW_tiled(self, fname=None, tile_size=512):
+        '''
+           This method implements a blocked (tiled) version of the Floyd-Warshall algo above, for
+           graphs where the n x n matrices don't fit in memory. The matrices are split into square
+           tiles of tile_size x tile_size, and instead of iterating over the allowed internal verts
+           one at a time over the whole matrix, we iterate over blocks of tile_size internal verts,
+           and for each block K go through the tiles in three phases: first the diagonal tile (K,K)
+           is updated on its own (it only depends on itself), then the rest of the row K tiles and
+           column K tiles (which only depend on themselves and the finished diagonal tile), and then
+           every other tile (I,J), which only depends on the finished tiles (I,K) and (K,J). So each
+           update only ever needs at most three tiles in memory at once, and goes through the tiles
+           in row order. If fname is given, the path lens and max internal verts are kept on disk in
+           numpy memmap files fname and fname.mid, and after every finished block K the number of
+           the next block is saved to fname.kblock (along with n, tile_size and a hash of the edges
+           of the graph), so if the run is interrupted, calling this again with the same graph,
+           fname and tile_size picks up from the last finished block (a tile of the interrupted
+           block may have been partly updated already, but the updates only ever lower path lens
+           to the lens of actual paths, so redoing the block gives the same answer). Once the run
+           is done fname.kblock is removed, so the next call always starts over.
+           Without fname everything is kept in memory, which still helps with cache locality. The
+           answers are returned as an APSPResult (backed by the memmaps if fname is given), or None
+           if there is a negative cycle.
+        '''
+        verts, vert_ind = self.get_vert_index()
+        n = len(verts)
+        tiles = [slice(t, min(t + tile_size, n)) for t in range(0, n, tile_size)]
+        diag = np.arange(n)
+
+        def update_tile(dist_tile, mid_tile, col_tile, row_tile, k_start):
+            ''' Min-plus update of dist_tile with paths through the k verts of col_tile/row_tile '''
+            for k in range(col_tile.shape[1]):
+                diff_path = col_tile[:, k, None] + row_tile[None, k, :]
+                shorter = diff_path < dist_tile
+                np.copyto(dist_tile, diff_path, where=shorter)
+                mid_tile[shorter] = k_start + k
+
+        def finish(answer):
+            ''' The run is done (either way), so there's nothing left to pick up from. '''
+            if fname != None and os.path.exists(fname + '.kblock'):
+                os.remove(fname + '.kblock')
+            return answer
+
+        # check if there is an interrupted run of this graph we can pick up from
+        first_block = 0
+        edges_hash = self.__edges_hash__() if fname != None else None
+        if fname != None and os.path.exists(fname + '.kblock'):
+            with open(fname + '.kblock') as progress:
+                saved_n, saved_tile_size, saved_hash, saved_block = progress.read().split()
+            if [int(saved_n), int(saved_tile_size), saved_hash] == [n, tile_size, edges_hash]:
+                first_block = int(saved_block)
+
+        if first_block > 0:
+            shortest_paths = np.memmap(fname, dtype=np.float64, mode='r+', shape=(n, n))
+            max_internal = np.memmap(fname + '.mid', dtype=np.int32, mode='r+', shape=(n, n))
+        else:
+            if fname != None:
+                shortest_paths = np.memmap(fname, dtype=np.float64, mode='w+', shape=(n, n))
+                max_internal = np.memmap(fname + '.mid', dtype=np.int32, mode='w+', shape=(n, n))
+            else:
+                shortest_paths = np.empty((n, n))
+                max_internal = np.empty((n, n), dtype=np.int32)
+            for I in tiles:  # initialize one strip of rows at a time
+                shortest_paths[I] = np.inf
+                max_internal[I] = -1
+
+            # direct edge costs (keeping the cheapest edge if there are parallel edges), 0 on diagonal
+            edge_verts = np.array([[vert_ind[v], vert_ind[w]] for v, w, _ in self.edges.values()],
+                                  dtype=np.int64).reshape(-1, 2)
+            edge_costs = np.array([c for _, _, c in self.edges.values()], dtype=np.float64)
+            np.minimum.at(shortest_paths, (edge_verts[:, 0], edge_verts[:, 1]), edge_costs)
+            shortest_paths[diag, diag] = np.minimum(shortest_paths[diag, diag], 0)
+
+        for b in range(first_block, len(tiles)):
+            K = tiles[b]
+
+            # phase 1: the diagonal tile
+            dist_KK, mid_KK = np.array(shortest_paths[K, K]), np.array(max_internal[K, K])
+            update_tile(dist_KK, mid_KK, dist_KK, dist_KK, K.start)
+            if (np.diagonal(dist_KK) < 0).any():  # there is a negative cycle in this graph!!
+                return finish(None)
+            shortest_paths[K, K], max_internal[K, K] = dist_KK, mid_KK
+
+            # phase 2: the rest of the row K and column K tiles
+            for J in tiles:
+                if J == K:
+                    continue
+                dist_KJ, mid_KJ = np.array(shortest_paths[K, J]), np.array(max_internal[K, J])
+                update_tile(dist_KJ, mid_KJ, dist_KK, dist_KJ, K.start)
+                shortest_paths[K, J], max_internal[K, J] = dist_KJ, mid_KJ
+
+                dist_JK, mid_JK = np.array(shortest_paths[J, K]), np.array(max_internal[J, K])
+                update_tile(dist_JK, mid_JK, dist_JK, dist_KK, K.start)
+                shortest_paths[J, K], max_internal[J, K] = dist_JK, mid_JK
+
+            # phase 3: every other tile, going through them in row order
+            for I in tiles:
+                if I == K:
+                    continue
+                dist_IK = np.array(shortest_paths[I, K])
+                for J in tiles:
+                    if J == K:
+                        continue
+                    dist_IJ, mid_IJ = np.array(shortest_paths[I, J]), np.array(max_internal[I, J])
+                    update_tile(dist_IJ, mid_IJ, dist_IK, np.array(shortest_paths[K, J]), K.start)
+                    shortest_paths[I, J], max_internal[I, J] = dist_IJ, mid_IJ
+
+            if (shortest_paths[diag, diag] < 0).any():  # there is a negative cycle in this graph!!
+                return finish(None)
+
+            # save our progress, so an interrupted run can pick up from the next block
+            if fname != None:
+                shortest_paths.flush()
+                max_internal.flush()
+                with open(fname + '.kblock.tmp', 'w') as progress:
+                    progress.write('{0} {1} {2} {3}'.format(n, tile_size, edges_hash, b + 1))
+                os.replace(fname + '.kblock.tmp', fname + '.kblock')
+
+        return finish(APSPResult(verts, shortest_paths, max_internal=max_internal))
+
+
+    def __reweight__(self, use_queue=True):
+        '''
+           Helper function for Johnson's algo, add a dummy vertex labelled 0 pointing to all other
+           verts with edge cost 0, run bellman-ford from it to get the reweighting factors for each
+           vertex, and then remove the dummy vertex again. Return the dict of {vert: reweighting
+           factor}, or None if there is a negative cost cycle present in the graph. By default the
+           work queue version of bellman-ford is used, use_queue=False uses the iterative version.
+        '''
+        for v in list(self.vertices):
+            self.add_edge(0, v, 0)
+        if use_queue:
+            reweights, _ = self.compute_shortest_paths_BF_queue(0)
+        else:
+            reweights = self.compute_shortest_paths_BF_iter(0)
+        self.delete_vertex(0)
+        if reweights != None:
+            del reweights[0]
+        return reweights
+
+
+    def compute_APSP_Johnson(self, backend='heap'):
         '''
            This method implements Johnson's algorithm to solve the all pairs shortest paths problem.
            This algorithm first adds a "dummy invisible" vertex to the graph (we have less strictness
@@ -350,22 +922,21 @@ class Graph:
            O(n*m*log(n)), as we call n instances of the O(m*log(n)) dijkstra's algo. After this step,
            we are basically done, but we just need to reconstruct the *actual* shortest path lengths,
            which just amounts to an addition and subtraction using the reweighting factors we computed
-           earlier for each source-dest pair.
+           earlier for each source-dest pair. backend picks the priority queue for the dijkstra runs
+           (see compute_shortest_paths_Dijkstra).
         '''
         # verts labelled from 1 to n, so create dummy vert labelled 0 pointing to all other verts
-        # with edge cost 0. NOTE: if a vert is labelled 0, it needs to be changed first! O(n)
-        n = self.num_verts
-        for v in range(1, n + 1):
-            self.add_edge(0, v, 0)
-
-        # run bellman-ford with source vertex 0 (the dummy vert we created) to get the
-        # reweighting factors to use with dijkstra's algo later. O(nm)
-        reweights = self.compute_shortest_paths_BF_iter(0)
+        # with edge cost 0 and run bellman-ford with source vertex 0 (the dummy vert we created)
+        # to get the reweighting factors to use with dijkstra's algo later, then remove the dummy
+        # vert. NOTE: if a vert is labelled 0, it needs to be changed first! O(nm)
+        reweights = self.__reweight__()
         if reweights == None:  # there is a negative cost cycle present in the graph somewhere
             return None
 
-        self.delete_vertex(0)  # now we can remove the dummy vertex we added to the graph. O(n)
-        shortest_paths = {}  # initialize shortest paths dict to contain final answers
+        # initialize shortest paths and predecessor matrices to contain final answers
+        verts, vert_ind = self.get_vert_index()
+        shortest_paths = np.full((len(verts), len(verts)), np.inf)
+        preds = np.full((len(verts), len(verts)), -1, dtype=np.int32)
 
         # calculate/set the reweighted edge costs to use with dijkstra's algo. O(m)
         new_edge_costs = {}
@@ -374,14 +945,240 @@ class Graph:
             new_edge_costs[edge] = c + reweights[v] - reweights[w]
 
         # run dijsktra's algo using every vertex as source. O(nmlog(n)) - this is domainating runtime
-        for source in range(1, self.num_verts + 1):
-            shortest_paths.update(self.compute_shortest_paths_Dijkstra(source, new_edge_costs))
+        for i, source in enumerate(verts):
+            source_paths, source_preds = self.compute_shortest_paths_Dijkstra(source, new_edge_costs,
+                                                                               backend=backend)
+            for v, path in source_paths.items():
+                shortest_paths[i, vert_ind[v]] = path
+                if source_preds[v] != None:
+                    preds[i, vert_ind[v]] = vert_ind[source_preds[v]]
 
         # finally, re-adjust the shortest path lens to actual path length values. O(n^2)
-        for v in range(1, self.num_verts + 1):
-            for w in range(1, self.num_verts + 1):
-                key = 's{0}d{1}'.format(v, w)
-                shortest_paths[key] = shortest_paths[key] - reweights[v] + reweights[w]
+        vert_reweights = np.array([reweights[v] for v in verts], dtype=np.float64)
+        shortest_paths += vert_reweights[None, :] - vert_reweights[:, None]
+
+        return APSPResult(verts, shortest_paths, preds=preds)
+
+
+    def get_reweighted_csr(self, reweights):
+        '''
+           Lay out the graph in compressed sparse row form, with the edge costs reweighted by the
+           {vert: reweighting factor} dict from __reweight__. Vertices are numbered by their index
+           from get_vert_index, and the edges pointing out of vertex index i are at positions
+           csr_start[i]:csr_start[i+1] of csr_verts (their dest vertex index) and csr_costs.
+           Returns the list [csr_start, csr_verts, csr_costs] of numpy arrays.
+        '''
+        verts, vert_ind = self.get_vert_index()
+        tails = np.array([vert_ind[v] for v, _, _ in self.edges.values()], dtype=np.int64)
+        heads = np.array([vert_ind[w] for _, w, _ in self.edges.values()], dtype=np.int32)
+        costs = np.array([c + reweights[v] - reweights[w] for v, w, c in self.edges.values()],
+                         dtype=np.float64)
+        order = np.argsort(tails, kind='stable')
+        return [np.concatenate(([0], np.cumsum(np.bincount(tails, minlength=len(verts))))),
+                heads[order], costs[order]]
+
+
+    def compute_APSP_Johnson_stream(self, fname, backend='heap'):
+        '''
+           This method implements the same Johnson's algorithm as compute_APSP_Johnson above, but
+           instead of holding all n^2 answers in memory, it writes each source vertex's row of path
+           lens (already re-adjusted to actual path length values) and predecessor verts to the
+           binary row file fname as soon as it is computed (see ROWS_MAGIC for the layout, and
+           load_apsp_rows to read it back). The shortest shortest path and the shortest path out of
+           each source vertex are kept track of on the fly as each row is written, so this only
+           ever uses O(n + m) memory. Returns the tuple ((source, dest, path len) of the shortest
+           shortest path, array of the min path len from each vertex to any other vertex, +inf if
+           it can't reach any, in get_vert_index order), or
+           None if there is a negative cost cycle present in the graph. backend picks the priority
+           queue for the dijkstra runs (see dijkstra_csr).
+        '''
+        reweights = self.__reweight__()  # O(nm)
+        if reweights == None:  # there is a negative cost cycle present in the graph somewhere
+            return None
+
+        verts, _ = self.get_vert_index()
+        n = len(verts)
+        csr_arrays = self.get_reweighted_csr(reweights)
+        vert_reweights = np.array([reweights[v] for v in verts], dtype=np.float64)
+
+        shortest_short = (None, None, float('inf'))
+        source_mins = np.full(n, np.inf)
+        row = np.empty(1, dtype=rows_dtype(n))
+        with open(fname, 'wb') as rows_file:
+            rows_file.write(ROWS_MAGIC)
+            np.array([n] + verts, dtype=np.int64).tofile(rows_file)
+
+            for i in range(n):  # O(nmlog(n)), one row at a time
+                dists, preds = dijkstra_csr(*csr_arrays, i, backend=backend)
+                dists += vert_reweights - vert_reweights[i]
+                row['dists'][0], row['preds'][0] = dists, preds
+                row.tofile(rows_file)
+
+                j = np.argmin(dists)
+                if dists[j] < shortest_short[2]:
+                    shortest_short = (verts[i], verts[j], dists[j])
+                # the path from i to itself (len 0) doesn't count as a path out of i
+                dists[i] = np.inf
+                source_mins[i] = dists.min()
+
+        return shortest_short, source_mins
+
+
+    def compute_APSP_Johnson_parallel(self, num_workers=4, backend='heap'):
+        '''
+           This method implements the same Johnson's algorithm as compute_APSP_Johnson above, but
+           spreads the dijkstra runs over a pool of num_workers processes. After the single
+           bellman-ford run to get the reweighting factors, the n runs of dijkstra's algo are all
+           independent of each other, so we lay out the reweighted graph in compressed sparse row
+           form (three flat numpy arrays) in shared memory, which every worker attaches to once
+           when the pool starts (rather than pickling the graph over with every task), and then
+           hand the workers chunks of source vertices. Each worker sends back its chunk of rows of
+           the final answer (and of the predecessor verts) as numpy arrays. Returns the answers as
+           an APSPResult, or None if there is a negative cost cycle present in the graph. backend
+           picks the priority queue for the dijkstra runs (see dijkstra_csr).
+        '''
+        reweights = self.__reweight__()  # O(nm)
+        if reweights == None:  # there is a negative cost cycle present in the graph somewhere
+            return None
+
+        verts, _ = self.get_vert_index()
+        n = len(verts)
+        csr_arrays = self.get_reweighted_csr(reweights)
+        vert_reweights = np.array([reweights[v] for v in verts], dtype=np.float64)
+
+        # copy the graph arrays into shared memory blocks, which the workers look up by name
+        blocks = []
+        shared_arrays = []
+        try:
+            for arr in csr_arrays:
+                block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[:] = arr
+                shared_arrays.append((block.name, arr.shape, arr.dtype.str))
+
+            # a few chunks of sources per worker, so a slow chunk doesn't hold up the whole pool
+            chunks = np.array_split(np.arange(n), min(n, 4*num_workers) or 1)
+            shortest_paths = np.empty((n, n))
+            preds = np.empty((n, n), dtype=np.int32)
+            with Pool(num_workers, initializer=init_johnson_worker,
+                      initargs=(shared_arrays, vert_reweights, backend)) as pool:
+                for sources, rows, pred_rows in pool.imap_unordered(johnson_worker_rows, chunks):
+                    shortest_paths[sources] = rows
+                    preds[sources] = pred_rows
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        return APSPResult(verts, shortest_paths, preds=preds)
+
+
+class APSPQuery:
+    '''
+       This class answers shortest path queries between pairs of vertices of a graph on demand,
+       for when we only need the lengths of a few (source, dest) pairs instead of all n^2 of them.
+       The graph is reweighted once (Johnson's algo, see Graph.compute_APSP_Johnson), and then
+       dijkstra's algo is only run from a source vertex the first time it is asked about. The
+       resulting rows of path lens and predecessor verts are kept in an LRU cache bounded by
+       max_bytes; when adding a row would go over the bound, the least recently used rows are
+       evicted first. The hits, misses and evictions counters can be used to size the cache.
+       backend picks the priority queue for the dijkstra runs (see dijkstra_csr).
+       Raises a ValueError if there is a negative cost cycle present in the graph.
+    '''
+    def __init__(self, graph, max_bytes=64*2**20, backend='heap'):
+        reweights = graph.__reweight__()
+        if reweights == None:
+            raise ValueError('There are negative cycles present in this graph!')
+
+        self.verts, self.vert_ind = graph.get_vert_index()
+        self.csr_arrays = graph.get_reweighted_csr(reweights)
+        self.reweights = np.array([reweights[v] for v in self.verts], dtype=np.float64)
+
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.cache = OrderedDict()  # {source index: (row, pred_row)}, least recently used first
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def __get_row__(self, i):
+        '''
+           Return (row, pred_row) of source vertex index i, from the cache if it's there. Both are
+           read only, as the cached arrays themselves are handed out, and changing them would
+           change every later answer from this source.
+        '''
+        if i in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(i)
+            return self.cache[i]
+
+        self.misses += 1
+        row, pred_row = dijkstra_csr(*self.csr_arrays, i, backend=self.backend)
+        row += self.reweights - self.reweights[i]  # re-adjust to actual path length values
+        row.setflags(write=False)
+        pred_row.setflags(write=False)
+        row_bytes = row.nbytes + pred_row.nbytes
+        if row_bytes > self.max_bytes:  # would never fit, so don't evict anything for it
+            return row, pred_row
+
+        # make room for the new row, evicting least recently used rows first
+        while self.cache and self.cache_bytes + row_bytes > self.max_bytes:
+            old_row, old_pred_row = self.cache.popitem(last=False)[1]
+            self.cache_bytes -= old_row.nbytes + old_pred_row.nbytes
+            self.evictions += 1
+        self.cache[i] = (row, pred_row)
+        self.cache_bytes += row_bytes
+        return row, pred_row
+
+
+    def dist(self, source, dest):
+        ''' Return the shortest path length from source vert to dest vert. '''
+        row, _ = self.__get_row__(self.vert_ind[source])
+        return row[self.vert_ind[dest]]
+
+
+    def row(self, source):
+        '''
+           Return the shortest path lens from source vert to every vert (as in APSPResult), as a
+           read only array (copy it to change it).
+        '''
+        return self.__get_row__(self.vert_ind[source])[0]
+
+
+    def path(self, source, dest):
+        ''' Return the shortest path from source vert to dest vert as a list, None if no path. '''
+        i, j = self.vert_ind[source], self.vert_ind[dest]
+        row, pred_row = self.__get_row__(i)
+        if row[j] == float('inf'):
+            return None
+        path = [dest]
+        while j != i:
+            j = pred_row[j]
+            path.append(self.verts[j])
+        return path[::-1]
+
+
+    def query(self, pairs):
+        '''
+           Return the list of shortest path lens for a batch of (source, dest) pairs, in the same
+           order as pairs. Pairs are grouped by source first, so every source is only looked up
+           (and at most computed) once per batch, no matter how the pairs are ordered.
+        '''
+        by_source = {}
+        for p, (source, dest) in enumerate(pairs):
+            by_source.setdefault(self.vert_ind[source], []).append((p, self.vert_ind[dest]))
+
+        path_lens = [None] * len(pairs)
+        for i, dests in by_source.items():
+            row, _ = self.__get_row__(i)
+            for p, j in dests:
+                path_lens[p] = row[j]
+        return path_lens
 
-        return shortest_paths
 
+    def stats(self):
+        ''' Return a dict of the cache counters, to help with choosing max_bytes. '''
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'cached_rows': len(self.cache), 'cache_bytes': self.cache_bytes}
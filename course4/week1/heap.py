@@ -1,211 +1,261 @@
 
 '''
-    my implementation of a min and max heap copied from a previous week for use in applying
-    dijkstra's algorithm to solve the all-pairs shortest path problem.
+    my implementation of an indexed d-ary min and max heap copied from a previous week (the same
+    one as in the heap.py of the other weeks) for use in applying dijkstra's algorithm to solve
+    the all-pairs shortest path problem. every item is an id (i.e. a vertex number) with a key,
+    and a dict from id to position in the heap gives O(1) lookups and O(log(n)) decrease-key.
 '''
 
-class Heap:
-    def __init__(self):
-        self.arr = []
-        self.size = 0  # equivalent to len(self.arr) which is O(1); including here for completeness
-        self.pos = {}  # dict of {element in heap: index in heap}, added for O(1) find
-                       # (which allows for O(log(n)) delete) NOTE: in this specific implementation
-                       # I am altering the pos key to be the vertex number instead of the Vert_Path object
-
-    def __parent__(self, i):
-        ''' Return (0-based) index of parent of value at index i, if i=0 return None. '''
-        return (i-1) // 2 if i > 0 else None  # only root (at index 0) has no parent
-
+class IndexedMinHeap:
+    '''
+       Indexed d-ary min heap. Rather than storing the values themselves (and needing every value
+       to carry its own id, like .vert or .char_val, to be found again), every item is an id (any
+       hashable, i.e. a vertex) with a key (i.e. its path len), kept in two parallel lists in heap
+       order, along with a dict of {id: index in heap} for O(1) find and O(log(n)) decrease key.
+       Each node has arity children (2, 4 or 8 make sense): a wider heap is shallower, so sifting
+       up (insert, decrease key) passes through fewer levels, while sifting down (extract min) has
+       to compare more children on each level. Dijkstra/Prim do many more decrease keys than
+       extract mins, which favors a wider heap, though in python the arities end up within a few
+       percent of each other (see course2/week2/bench_dijkstra.py). Sifting moves the item being
+       sifted into place once at the end, instead of swapping it at every level.
+    '''
+    def __init__(self, arity=2):
+        if arity < 2:
+            raise ValueError('Warning: heap arity must be at least 2, not {0}'.format(arity))
+        self.arity = arity
+        self.keys = []  # key of the item at each index of the heap
+        self.ids = []   # id of the item at each index of the heap
+        self.pos = {}   # dict of {item id: index in heap}
+        self.size = 0
 
-    def __children__(self, i):
-        '''
-           Return (0-based) indices of children of value at index i as tuple.
-           If not a child value, replace with None. i.e. a node with only 1
-           child returns (left_child_ind, None)
-        '''
-        l = 2*i + 1 if (2*i + 1) < self.size else None
-        r = l + 1 if (l != None and (l + 1) < self.size) else None
-        return (l ,r)
 
+    def __len__(self): return self.size
 
-    def __sift_up__(self, i): pass
+    def __contains__(self, item_id): return item_id in self.pos
 
 
-    def __sift_down__(self, i): pass
+    def __sift_up__(self, i):
+        '''
+           Move the item at index i up the heap tree until its parent's key is no larger.
+           O(log_d(n)) runtime worst case.
+        '''
+        keys, ids, pos, arity = self.keys, self.ids, self.pos, self.arity
+        key, item_id = keys[i], ids[i]
+        while i > 0:
+            parent = (i - 1) // arity
+            if keys[parent] <= key:
+                break
+            # move the parent down into the hole, the item keeps moving up
+            keys[i] = keys[parent]
+            ids[i] = ids[parent]
+            pos[ids[i]] = i
+            i = parent
+        keys[i] = key
+        ids[i] = item_id
+        pos[item_id] = i
+
+
+    def __sift_down__(self, i):
+        '''
+           Move the item at index i down the heap tree until none of its children have a smaller
+           key. O(d*log_d(n)) runtime worst case.
+        '''
+        keys, ids, pos, arity, size = self.keys, self.ids, self.pos, self.arity, self.size
+        key, item_id = keys[i], ids[i]
+        while True:
+            first_child = arity*i + 1
+            if first_child >= size:
+                break
+            # find the child with the smallest key
+            child, child_key = first_child, keys[first_child]
+            if arity == 2:
+                if first_child + 1 < size and keys[first_child + 1] < child_key:
+                    child, child_key = first_child + 1, keys[first_child + 1]
+            else:
+                for c in range(first_child + 1, min(first_child + arity, size)):
+                    if keys[c] < child_key:
+                        child, child_key = c, keys[c]
+            if child_key >= key:
+                break
+            # move the min child up into the hole, the item keeps moving down
+            keys[i] = keys[child]
+            ids[i] = ids[child]
+            pos[ids[i]] = i
+            i = child
+        keys[i] = key
+        ids[i] = item_id
+        pos[item_id] = i
+
+
+    def insert(self, item_id, key):
+        ''' Insert item_id (which must not be in the heap yet) with key. O(log_d(n)) '''
+        self.keys.append(key)
+        self.ids.append(item_id)
+        self.size += 1
+        self.__sift_up__(self.size - 1)
 
 
-    def __get_top__(self):
-        ''' Return top value of heap (min or max), return None if empty heap. '''
-        return self.arr[0] if self.size > 0 else None
+    def __heapify__(self, ids, keys):
+        '''
+           Add the items ids (none of which can be in the heap yet) with keys, rebuilding the heap
+           bottom up: every node from the last parent back to the root is sifted down into place.
+           Most nodes are near the bottom of the tree and only sift down a level or two, so this
+           runs in O(n) time (n = size of the heap after adding them).
+        '''
+        ids, keys = list(ids), list(keys)
+        if len(ids) != len(keys):
+            raise ValueError('Warning: got {0} ids but {1} keys'.format(len(ids), len(keys)))
+        self.pos.update(zip(ids, range(self.size, self.size + len(ids))))
+        self.ids.extend(ids)
+        self.keys.extend(keys)
+        self.size += len(ids)
+        for i in range((self.size - 2) // self.arity, -1, -1):
+            self.__sift_down__(i)
+
+
+    def __insert_many__(self, ids, keys):
+        '''
+           Add the items ids with keys, either one at a time, or (if there are many of them relative
+           to the heap, when k*log(n) inserts would cost more than rebuilding the whole heap) all at
+           once with heapify. O(min(k*log(n), n)) for k items.
+        '''
+        ids, keys = list(ids), list(keys)
+        new_size = self.size + len(ids)
+        if len(ids) * new_size.bit_length() >= new_size:
+            self.__heapify__(ids, keys)
+            return
+        for item_id, key in zip(ids, keys):
+            self.keys.append(key)
+            self.ids.append(item_id)
+            self.size += 1
+            self.__sift_up__(self.size - 1)
 
 
-    def __extract_top__(self):
-        ''' Remove top value and rebalance heap, return value removed, None if empty heap. '''
-        if self.size == 0:  # no values in heap, nothing to remove
-            return None
+    def __extract_k__(self, k):
+        '''
+           Remove the k items with the smallest keys from the heap (all of them if k >= size), and
+           return them as a list of (item id, key) tuples in order. If the whole heap is taken, it
+           is just sorted instead. O(k*log(n))
+        '''
+        if k < self.size:
+            return [self.extract_min() for _ in range(k)]
+        top = sorted(zip(self.keys, range(self.size)))
+        top = [(self.ids[i], key) for key, i in top]
+        self.keys, self.ids, self.pos, self.size = [], [], {}, 0
+        return top
 
-        # record top value, replace it with the last element, remove last element, decrement size
-        top_val = self.arr[0]
-        top_vert = top_val.vert  # this is specific to dijkstra's shortest path on graph algo
-        last_val = self.arr[self.size - 1]
-        last_vert = last_val.vert  # this is specific to dijkstra's shortest path on graph algo
-        self.arr[0] = last_val
-        self.pos[last_vert] = 0  # update index of last_val which was replaced to be at index 0
-        self.arr.pop()  # O(1) with pythons list structure
-        del self.pos[top_vert]  # remove top_val from pos dict since we removed it from heap
-        self.size -= 1
 
-        # finally, sift down the (new) first element, and return top value which has been removed
-        self.__sift_down__(0)  # O(log(n))
-        return top_val
+    def heapify(self, ids, keys): self.__heapify__(ids, keys)
 
+    def insert_many(self, ids, keys): self.__insert_many__(ids, keys)
 
-    def __insert__(self, val):
-        ''' Insert a val into the heap, increment size of heap by 1. O(log(n)) '''
-        self.arr.append(val)  # amortized O(1) with pythons list structure
-        self.pos[val.vert] = self.size  # add val to pos dict pointing to last index of heap
-        self.size += 1
-        self.__sift_up__(self.size - 1)  # sift up element we just added, O(log(n))
+    def extract_k(self, k): return self.__extract_k__(k)
 
 
-    def __delete__(self, vert):
-        ''' Delete and return val from the heap if it exists. If not, return None. O(log(n))'''
-        ind = self.find(vert)  # O(1)
-        if ind == None:
-            return None
+    def find(self, item_id):
+        ''' Find and return index of item_id in heap if it exists. If not, return None. O(1) '''
+        return self.pos.get(item_id)
 
-        # replace this element with last element, remove last element from heap, decrement size
-        self.size -= 1
-        this_val = self.arr[ind]
-        last_val = self.arr[self.size]
-        last_vert = last_val.vert  # this is specific to dijkstra's shortest path on graph algo
-        self.arr[ind] = last_val
-        self.pos[last_vert] = ind  # update last_val index in pos dict to ind we just placed it at
-        self.arr.pop()  # O(1) with pythons list structure
-        del self.pos[vert]  # and remove val from pos dict since we just removed it from the heap
 
-        if ind == self.size:  # we removed the last element, we're done
-            return this_val
+    def get_key(self, item_id):
+        ''' Return the key of item_id, None if it is not in the heap. O(1) '''
+        i = self.pos.get(item_id)
+        return self.keys[i] if i is not None else None
 
-        # try sifting up and down if needed; if it's not, nothing will change, so no harm done
-        self.__sift_up__(ind)    # heap property only violated at most in one direction, only one
-        self.__sift_down__(ind)  # will actually do any work, at worst O(1*log(n)) runtime.
 
-        # return extracted val to indicate success
-        return this_val
+    def get_min(self):
+        ''' Return the tuple (item id, key) with the smallest key, None if empty heap. '''
+        return (self.ids[0], self.keys[0]) if self.size > 0 else None
 
 
-    def find(self, vert):
-        ''' Find and return index of val in heap if it exists. If not, return None. O(1) '''
-        if vert not in self.pos:
+    def extract_min(self):
+        ''' Remove and return the tuple (item id, key) with the smallest key, None if empty heap. '''
+        if self.size == 0:
             return None
-        else:
-            return self.pos[vert]
+        top = (self.ids[0], self.keys[0])
+        del self.pos[top[0]]
+        self.size -= 1
+        last_key, last_id = self.keys.pop(), self.ids.pop()
+        if self.size > 0:
+            self.keys[0], self.ids[0] = last_key, last_id
+            self.__sift_down__(0)
+        return top
 
 
-    def update_len(self, vert, new_len):
+    def decrease_key(self, item_id, key):
         '''
-           This is specific to dijkstra's shortest path on graph algo, given a vertex,
-           change it's path length and then sift up and down to put it in correct position
-           in heap. This is I think a more efficient work-around in this specific instance
-           instead of deleting element from heap and inserting new element with diff path length.
+           Lower the key of item_id to key if that is smaller than its current key, and sift it up
+           into place. Return key if it was changed, None if not (or item_id isn't in the heap).
         '''
-        ind = self.find(vert)
-        if ind == None:  # vert is not in heap, no value to change
+        i = self.pos.get(item_id)
+        if i is None or key >= self.keys[i]:
             return None
+        self.keys[i] = key
+        self.__sift_up__(i)
+        return key
 
-        # vert is in heap, check if we need to change it's path len, sift up/down as needed
-        curr_path_len = self.arr[ind].path_len
-        if new_len >= curr_path_len:
-            return None
 
-        self.arr[ind].path_len = new_len
-        self.__sift_up__(ind)
-        self.__sift_down__(ind)
-        return new_len  # to indicate that we did change the value
+    def update_key(self, item_id, key):
+        ''' Change the key of item_id (which must be in the heap) to key, up or down. O(log_d(n)) '''
+        i = self.pos[item_id]
+        self.keys[i] = key
+        self.__sift_up__(i)
+        self.__sift_down__(self.pos[item_id])
 
 
-class MinHeap(Heap):
-    '''
-       Heap property in min heap is that val of a node <= all of it's children
-       Main methods that need to be implemented here are sift up and sift down,
-       the others are largely inherited from Heap class, with some minor bookkeeping..
-    '''
-    def __sift_up__(self, i):  # override Heap defined sift up method
-        '''
-           Swap elements (upwards in heap tree) repeatedely until heap property
-           is no longer violated for value at index i. O(log(n)) runtime worst case.
-        '''
-        if i >= self.size or i < 0:  # index is out of range, nothing to sift
-            return
-
-        parent = self.__parent__(i)
+    def delete(self, item_id):
+        ''' Delete and return the tuple (item_id, key) if it's in the heap. If not, return None. '''
+        i = self.pos.get(item_id)
+        if i is None:
+            return None
+        deleted = (item_id, self.keys[i])
+        del self.pos[item_id]
+        self.size -= 1
+        last_key, last_id = self.keys.pop(), self.ids.pop()
+        if i < self.size:  # fill the hole with the last item, and sift it whichever way it needs
+            self.keys[i], self.ids[i] = last_key, last_id
+            self.__sift_up__(i)
+            self.__sift_down__(self.pos[last_id])
+        return deleted
 
-        # main loop can run up to log_2(n) times (depth of heap tree, one swap per level at most)
-        while parent != None and self.arr[i] < self.arr[parent]:
-            # heap property is violated, swap elements, update parent/current indices
-            # also need to track the index swap in pos dict
-            self.pos[self.arr[parent].vert] = i  # specific to dijkstra's shortest path on graph algo
-            self.pos[self.arr[i].vert] = parent  # specific to dijkstra's shortest path on graph algo
-            self.arr[parent], self.arr[i] = self.arr[i], self.arr[parent]
-            i, parent = parent, self.__parent__(parent)
 
+class IndexedMaxHeap(IndexedMinHeap):
+    '''
+       Indexed d-ary max heap, implemented with the indexed min heap above with the keys negated
+       as they go in (and again as they come out), so keys need to be able to be negated.
+    '''
+    def insert(self, item_id, key): super().insert(item_id, -key)
 
-    def __sift_down__(self, i):  # override Heap defined sift down method
-        '''
-           Swap elements (downwards in heap tree) repeatedely until heap property
-           is no longer violated for value at index i. O(log(n)) runtime worst case.
-        '''
-        if i >= self.size or i < 0:  # index is out of range, nothing to sift
-            return
+    def heapify(self, ids, keys): self.__heapify__(ids, [-key for key in keys])
 
-        l_child, r_child = self.__children__(i)
-        min_child = l_child
-        if r_child != None and self.arr[r_child] <= self.arr[l_child]:
-            min_child = r_child
+    def insert_many(self, ids, keys): self.__insert_many__(ids, [-key for key in keys])
 
-        # main loop can run up to log_2(n) times (depth of heap tree, one swap per level at most)
-        while min_child != None and self.arr[i] > self.arr[min_child]:
-            # heap property is violated, swap elements, update current/children/min_child indices
-            # also need to track the index swap in pos dict
-            self.pos[self.arr[min_child].vert] = i  # specific to dijkstra's shortest path on graph algo
-            self.pos[self.arr[i].vert] = min_child  # specific to dijkstra's shortest path on graph algo
-            self.arr[i], self.arr[min_child] = self.arr[min_child], self.arr[i]
-            i, (l_child, r_child) = min_child, self.__children__(min_child)
-            min_child = l_child
-            if r_child != None and self.arr[r_child] <= self.arr[l_child]:
-                min_child = r_child
+    def extract_k(self, k): return [(item_id, -key) for item_id, key in self.__extract_k__(k)]
 
 
-    def get_min(self): return self.__get_top__()
+    def get_key(self, item_id):
+        key = super().get_key(item_id)
+        return -key if key is not None else None
 
-    def extract_min(self): return self.__extract_top__()
 
-    def insert(self, val): self.__insert__(val)
+    def get_max(self):
+        top = self.get_min()
+        return (top[0], -top[1]) if top is not None else None
 
-    def delete(self, val): return self.__delete__(val)
 
+    def extract_max(self):
+        top = self.extract_min()
+        return (top[0], -top[1]) if top is not None else None
 
-class MaxHeap(MinHeap, Heap):
-    '''
-       Heap property in max heap is that val of a node >= all of it's children.
-       This implementation of maxheap uses a minheap and inserts the values into
-       the heap negated. Data that you put in max heap needs to be able to be negated.
-    '''
-    def get_max(self):
-        max_val = self.__get_top__()
-        return -max_val if max_val != None else None
 
+    def increase_key(self, item_id, key):
+        ''' Raise the key of item_id to key if larger. Return key if it was changed, else None. '''
+        return key if self.decrease_key(item_id, -key) is not None else None
 
-    def extract_max(self):
-        max_val = self.__extract_top__()
-        return -max_val if max_val != None else None
 
+    def update_key(self, item_id, key): super().update_key(item_id, -key)
 
-    # override MinHeap insert method to insert negative values
-    def insert(self, val): self.__insert__(-val)
 
-    # override MinHeap delete method to actually delete the negated value passed in by user
-    def delete(self, val):
-        deleted_val = self.__delete__(-val)
-        return -deleted_val if deleted_val != None else None
+    def delete(self, item_id):
+        deleted = super().delete(item_id)
+        return (deleted[0], -deleted[1]) if deleted is not None else None
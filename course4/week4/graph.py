@@ -2,14 +2,136 @@
 '''
     this is my implementation of a DIRECTED graph as an adjacency list. vertices are added
     to the graph from input containing the vertex num and a list of vertices connected to it.
-    also implemented is Kosaraju's 2 pass algorithm to compute the strongly connected
-    components (SCC) of a directed graph, using a depth-first-search strategy (iteratively
-    rather than recursively) twice on the reverse of the graph first, and then on the graph
-    itself, keeping track of key variables (namely, finishing time and leader) as we pass through.
+    also implemented is Tarjan's algorithm to compute the strongly connected components (SCC)
+    of a directed graph, using a single depth-first-search pass (iteratively rather than
+    recursively) that tracks the order each vertex is reached and the earliest vertex reachable
+    from it that is still waiting on the stack. this replaced my original implementation of
+    Kosaraju's 2 pass algorithm, which needed two full DFS passes and kept its state in globals.
 '''
 
-from stack import Stack
-from queue import Queue
+from array import array
+from itertools import chain
+import numpy as np
+
+
+def tarjan_scc(out_start, out_verts):
+    '''
+       Compute the strongly connected components of a directed graph with vertices numbered 0..n-1,
+       given in compressed sparse row form (the edges pointing out of vertex v point to the verts at
+       out_verts[out_start[v]:out_start[v+1]]), using Tarjan's algorithm. Unlike Kosaraju's
+       algorithm this only takes one DFS pass, and doesn't need the reverse graph or any sorting
+       of finish times. Each vertex gets an index in the order the DFS first reaches it, and a
+       lowlink, the smallest index reachable from it through the DFS tree below it plus one more
+       edge back to a vertex that is still on the SCC stack. A vertex whose lowlink is its own
+       index is the root of an SCC, which is then everything above it on the SCC stack. The DFS
+       is iterative, keeping each vertex on the call stack along with the position of the next of
+       its edges to look at, and all state is kept in local typed arrays (no globals), so this is
+       safe to run on several graphs at once. Runs in O(n + m) time. Returns the tuple (array of
+       the component id of every vertex, list of the size of every component); components are
+       numbered 0, 1, ... in the order they are found, which is a reverse topological order.
+    '''
+    n = len(out_start) - 1
+    index = array('q', [-1]) * n  # order each vertex is first reached, -1 if not reached yet
+    low = array('q', [0]) * n
+    comp = array('q', [-1]) * n  # component id, -1 while the vertex is still on the SCC stack
+    comp_sizes = []
+    scc_stack = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        scc_stack.append(root)
+        call_stack = [root]
+        next_edge = [out_start[root]]
+
+        while call_stack:
+            vert = call_stack[-1]
+            e, end = next_edge[-1], out_start[vert + 1]
+            while e < end:
+                next_vert = out_verts[e]
+                e += 1
+                if index[next_vert] == -1:  # not reached yet, go explore it first
+                    break
+                if comp[next_vert] == -1 and index[next_vert] < low[vert]:  # still on SCC stack
+                    low[vert] = index[next_vert]
+            else:  # finished exploring all of vert's edges
+                call_stack.pop()
+                next_edge.pop()
+                if call_stack and low[vert] < low[call_stack[-1]]:
+                    low[call_stack[-1]] = low[vert]
+                if low[vert] == index[vert]:  # vert is the root of an SCC, pop it off the SCC stack
+                    scc_vert = None
+                    size = 0
+                    while scc_vert != vert:
+                        scc_vert = scc_stack.pop()
+                        comp[scc_vert] = len(comp_sizes)
+                        size += 1
+                    comp_sizes.append(size)
+                continue
+
+            next_edge[-1] = e
+            index[next_vert] = low[next_vert] = counter
+            counter += 1
+            scc_stack.append(next_vert)
+            call_stack.append(next_vert)
+            next_edge.append(out_start[next_vert])
+
+    return comp, comp_sizes
+
+
+def bfs_csr(out_start, out_verts, sources, targets=None):
+    '''
+       Breadth first search from all of the verts in sources at once (numbered 0..n-1), on a graph
+       in compressed sparse row form (see tarjan_scc). Rather than taking verts off a queue one at a
+       time, this expands a whole level (frontier) of the search at once with numpy: gather every
+       edge out of the frontier, keep the ones pointing to verts not reached yet, and those verts
+       (each with the first frontier vert found pointing to it as its parent) are the next frontier.
+       If targets is given, the search stops after the level where the last of them is reached.
+       Returns the tuple of arrays (hop count from the nearest source to every vert, -1 if it was not
+       reached, parent of every vert on a shortest path back to a source, -1 for sources/unreached).
+    '''
+    n = len(out_start) - 1
+    dist = np.full(n, -1, dtype=np.int64)
+    parent = np.full(n, -1, dtype=np.int64)
+    frontier = np.unique(np.asarray(sources, dtype=np.int64))
+    dist[frontier] = 0
+    if targets is not None:
+        targets = np.asarray(targets, dtype=np.int64)
+
+    level = 0
+    while len(frontier) and (targets is None or (dist[targets] == -1).any()):
+        begins = np.asarray(out_start[frontier], dtype=np.int64)
+        counts = out_start[frontier + 1] - begins
+        offsets = np.repeat(begins - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        heads = out_verts[offsets]
+        new = dist[heads] == -1
+        heads, first = np.unique(heads[new], return_index=True)
+        level += 1
+        dist[heads] = level
+        parent[heads] = np.repeat(frontier, counts)[new][first]
+        frontier = heads
+    return dist, parent
+
+
+def scc_groups(comp_ids, comp_sizes, labels=None):
+    '''
+       Turn the component ids of the verts (-1 for labels that aren't verts) and the component sizes
+       returned by compute_scc_ids into the dict of each components vertices, with the first vert of
+       each component as its leader. The verts are given by their index in comp_ids, or by labels.
+    '''
+    if len(comp_sizes) == 0:
+        return {}
+    verts = np.flatnonzero(comp_ids >= 0)
+    verts = verts[np.argsort(comp_ids[verts], kind='stable')]
+    if labels is not None:
+        verts = np.asarray(labels)[verts]
+    leaders = {}
+    for scc in np.split(verts, np.cumsum(comp_sizes)[:-1]):
+        leaders[int(scc[0])] = set(scc.tolist())
+    return leaders
 
 
 class Graph:
@@ -44,6 +166,31 @@ class Graph:
         self.__update_vert__(vert2, 1)
 
 
+    def add_edges(self, tails, heads):
+        '''
+           Add many edges to the graph at once, pointing from tails[i] to heads[i], given as numpy
+           arrays (i.e. from graph_loader). Same result as calling add_edge on each pair, but
+           without the overhead of two method calls per edge.
+        '''
+        if len(tails) == 0:
+            return
+        vertices, edges = self.vertices, self.edges
+        edge = self.num_edges
+        for vert1, vert2 in zip(tails.tolist(), heads.tolist()):
+            edge += 1
+            edges[edge] = [vert1, vert2]
+            if vert1 not in vertices:
+                vertices[vert1] = [set(), set()]
+            vertices[vert1][0].add(edge)
+            if vert2 not in vertices:
+                vertices[vert2] = [set(), set()]
+            vertices[vert2][1].add(edge)
+
+        self.num_edges = edge
+        self.num_verts = len(vertices)
+        self.max_vert = max(self.max_vert, int(tails.max()), int(heads.max()))
+
+
     def add_vert(self, vert):
         ''' Add a vertex to the graph not connected to any edges '''
         if vert not in self.vertices:
@@ -53,104 +200,119 @@ class Graph:
             self.vertices[vert] = [set(), set()]
 
 
-    def BFS(self, start: int, forwards=True):
-        ''' Breadth first search from start vertex. Can search reverse graph with forwards=False '''
-        # initialize all vertices as unexplored except for start vertex
-        explored = set()
+    def BFS(self, start, forwards=True, targets=None):
+        '''
+           Breadth first search from start vertex, or from every vertex in start at once if it is a list
+           (or array) of verts. Can search reverse graph with forwards=False, and stop as soon as all of
+           the verts in targets are reached. The edges are laid out in CSR arrays first, and then the
+           search is done a whole level at a time (see bfs_csr). Return the tuple of arrays (hop count
+           to every vert, parent vert of every vert on a shortest path), indexed by vert label, with -1
+           for unreached verts (and labels that aren't verts) and for the parents of the start verts.
+           Raises a KeyError if start or targets has a label that isn't a vert of the graph.
+        '''
+        labels, vert_index, out_start, out_verts = self.__csr_arrays__(forwards)
+        def vert_indices(verts):
+            ''' Return the numbers of the verts labelled verts, KeyError if one isn't a vert. '''
+            verts = np.atleast_1d(np.asarray(verts, dtype=np.int64))
+            for vert in verts.tolist():
+                if vert not in self.vertices:
+                    raise KeyError(vert)
+            return vert_index[verts]
+
+        sources = vert_indices(start)
+        if targets is not None:
+            targets = vert_indices(targets)
+        dist, parent = bfs_csr(out_start, out_verts, sources, targets)
+
+        label_dist = np.full(len(vert_index), -1, dtype=np.int64)
+        label_dist[labels] = dist
+        label_parent = np.full(len(vert_index), -1, dtype=np.int64)
+        label_parent[labels] = np.where(parent >= 0, labels[parent], -1)
+        return label_dist, label_parent
+
+
+    def DFS(self, start, forwards=True, explored=None):
+        '''
+           Depth first search from start vertex. Can search reverse graph with forwards=False. This DFS
+           method uses an iterative search rather than a recursive search as this is more memory efficient
+           for large graphs. To still get the right finishing order, each vertex is kept on the stack
+           along with an iterator over its remaining edges, and it only comes off the stack (finishes)
+           once all of those edges have been looked at. The set of explored verts can be passed in to
+           continue a search over several start verts. Return the list of verts in order of finish time.
+        '''
+        if explored is None:
+            explored = set()
         explored.add(start)
+        finished = []
+        side = (int(forwards)+1)%2  # which set of edges to follow, outgoing (0) or incoming (1)
+        verts = [(start, iter(self.vertices[start][side]))]
 
-        # initialize queue to track next vertices to explore, enqueue start vertex
-        verts = Queue()
-        verts.enqueue(start)
+        while verts:
+            vert, edges = verts[-1]
+            for edge in edges:
+                next_vert = self.edges[edge][int(forwards)]
+                if next_vert not in explored:  # found an unexplored neighbor, explore it next
+                    explored.add(next_vert)
+                    verts.append((next_vert, iter(self.vertices[next_vert][side])))
+                    break
+            else:  # completely finished exploring this vertex
+                verts.pop()
+                finished.append(vert)
+        return finished
 
-        # while queue is not empty, keep exploring vertices
-        while not verts.is_empty():
-            # dequeue next vertex and try to explore any incident edges it has
-            vert = verts.dequeue()
 
-            # go through all edges outgoing from this vertex
-            for edge in self.vertices[vert][0]:
-                # get vertex corresponding to this edge
-                # if going through G, current vert will be 1st; next_vert is in pos 1 (True)
-                # if going through G_rev, current vert will be 2nd; next_vert is in pos 0 (False)
-                next_vert = self.edges[edge][forwards]
+    def __csr_arrays__(self, forwards=True):
+        '''
+           Helper function to number the verts 0..n-1 (in the order they were added to the graph)
+           and lay out their outgoing (or incoming with forwards=False) edges in compressed sparse
+           row form, so the edges of vert i point to the verts at out_verts[out_start[i]:out_start[i+1]].
+           The edge ids are gathered with numpy, rather than looking each edge up one at a time.
+           Return the tuple of arrays (labels, vert_index, out_start, out_verts), where labels[i]
+           is the label of vert i, and vert_index[label] is the number of that vert (or -1).
+        '''
+        side = (int(forwards)+1)%2
+        labels = np.fromiter(self.vertices, dtype=np.int64, count=len(self.vertices))
+        vert_index = np.full(int(labels.max()) + 1, -1, dtype=np.int64)
+        vert_index[labels] = np.arange(len(labels))
 
-                # only interested in unexplored vertices
-                if next_vert in explored:
-                    continue
+        out_sizes = np.fromiter((len(edges[side]) for edges in self.vertices.values()),
+                                dtype=np.int64, count=len(labels))
+        out_start = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(out_sizes, out=out_start[1:])
+        out_edges = np.fromiter(chain.from_iterable(edges[side] for edges in self.vertices.values()),
+                                dtype=np.int64, count=int(out_start[-1]))
 
-                # this is a vertex of interest, mark as explored and add to queue
-                explored.add(next_vert)
-                verts.enqeue(next_vert)
+        # look up the vert at the other end of every edge, by edge id
+        edge_ids = np.fromiter(self.edges, dtype=np.int64, count=len(self.edges))
+        edge_verts = np.zeros(int(edge_ids.max(initial=0)) + 1, dtype=np.int64)
+        edge_verts[edge_ids] = np.fromiter((edge[int(forwards)] for edge in self.edges.values()),
+                                           dtype=np.int64, count=len(edge_ids))
+        return labels, vert_index, out_start, vert_index[edge_verts[out_edges]]
 
 
-    def DFS(self, start, forwards=True):
+    def compute_scc_ids(self):
         '''
-           Depth first search from start vertex, helper method for compute_scc. Can search reverse graph
-           with forwards=False. This DFS method uses an iterative search rather than a recursive search
-           as this is more memory efficient for large graphs, though tracking the finishing time bcomes
-           slightly more tricky. Instead of tracking just if a node is explored or not, we also need to
-           track a third status, "explored but not finished". This is particularly important in cases
-           where we take a vertex from the top of the stack, and see that all of it's neighbors have
-           already been explored - are all of it's neighbors actually finished being explored or are
-           they possibly still in the stack waiting to be assigned a finish time?
+           This function computes the strongly connected components of this graph using Tarjan's
+           single pass algorithm (see tarjan_scc), after numbering the verts 0..n-1 and laying out
+           their outgoing edges in CSR arrays. Return the tuple (array of the component id of every
+           vert, indexed by vert label, with -1 for labels that aren't verts of the graph, array of
+           the size of every component), so we can i.e. read off the largest component sizes without
+           building a set of verts for every component.
         '''
-        global leaders, leader, finish_times, finish_time, explored
-
-        verts = Stack()
-        verts.push(start)
-        if forwards:  # we only care about tracking leaders in forwards pass through graph
-            leaders[leader] = {start}
-
-        while not verts.is_empty():
-            vert = verts.top()  # which vertex is currently first in the stack
-            if vert not in explored:
-                # haven't "explored" yet - add all neighbors to stack if they haven't been explored yet
-                # note here we may be double adding vertices to the stack, but when we get to it again
-                # we will check if it's already been explored and if so we mark it's finish time if needed
-                explored.add(vert)
-                for edge in self.vertices[vert][(int(forwards)+1)%2]:
-                    next_vert = self.edges[edge][int(forwards)]
-                    if next_vert not in explored:
-                        if forwards:  # we only care about tracking leaders in forwards pass
-                            leaders[leader].add(next_vert)
-                        verts.push(next_vert)
-            else:
-                # completely finished exploring this node, remove from stack, set finishing time if needed
-                # on first pass through, we set every nodes finish time, so on forward pass through graph
-                # we will never set any finishing times
-                verts.pop()
-                if vert not in finish_times:
-                    finish_time += 1
-                    finish_times[vert] = finish_time
+        if not self.vertices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        labels, vert_index, out_start, out_verts = self.__csr_arrays__()
+
+        comp, comp_sizes = tarjan_scc(out_start.tolist(), out_verts.tolist())
+        comp_ids = np.full(len(vert_index), -1, dtype=np.int64)
+        comp_ids[labels] = np.frombuffer(comp, dtype=np.int64)
+        return comp_ids, np.array(comp_sizes, dtype=np.int64)
 
 
     def compute_scc(self):
         '''
-           This function computes the strongly connected components of this graph using Kosarju's 2-pass
-           algorithm. Return the dict of each components vertices (each with an arbitrary leader as key).
+           This function computes the strongly connected components of this graph (see compute_scc_ids).
+           Return the dict of each components vertices (each with an arbitrary leader as key).
         '''
-        global leaders, leader, finish_times, finish_time, explored
-
-        leaders = {}
-        leader = 0
-        finish_times = {}
-        finish_time = 0
-        explored = set()
-
-        # DFS on reverse of graph first from all nodes until all have been explored
-        for vert in self.vertices:
-            if vert not in explored:
-                fin = self.DFS(start=vert, forwards=False)
-
-        # reset explored verts to all being unexplored initially
-        explored = set()
-
-        # DFS on original graph checking all verts from largest finish time to smallest
-        for vert in sorted([[t,v] for v,t in finish_times.items()], reverse=True):
-            if vert[1] not in explored:
-                leader = vert[1]
-                self.DFS(start=vert[1])  # passing through graph forwards, we will track leaders
-
-        # the SCC's are now contained in the leaders dict
-        return leaders
+        comp_ids, comp_sizes = self.compute_scc_ids()
+        return scc_groups(comp_ids, comp_sizes)
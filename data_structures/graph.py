@@ -7,9 +7,242 @@
     functionalities, see the specific graph.py files in some course*/week*/ folders.
 '''
 
+from array import array
+from collections import deque
 from copy import deepcopy as dcopy
-from stack import Stack
-from queue import Queue
+from itertools import chain
+from multiprocessing import Pool, shared_memory
+from graph_loader import write_arrays, read_arrays
+import numpy as np
+
+
+def tarjan_scc(out_start, out_verts):
+    '''
+       Compute the strongly connected components of a directed graph with vertices numbered 0..n-1,
+       given in compressed sparse row form (the edges pointing out of vertex v point to the verts at
+       out_verts[out_start[v]:out_start[v+1]]), using Tarjan's algorithm. Unlike Kosaraju's
+       algorithm this only takes one DFS pass, and doesn't need the reverse graph or any sorting
+       of finish times. Each vertex gets an index in the order the DFS first reaches it, and a
+       lowlink, the smallest index reachable from it through the DFS tree below it plus one more
+       edge back to a vertex that is still on the SCC stack. A vertex whose lowlink is its own
+       index is the root of an SCC, which is then everything above it on the SCC stack. The DFS
+       is iterative, keeping each vertex on the call stack along with the position of the next of
+       its edges to look at, and all state is kept in local typed arrays (no globals), so this is
+       safe to run on several graphs at once. Runs in O(n + m) time. Returns the tuple (array of
+       the component id of every vertex, list of the size of every component); components are
+       numbered 0, 1, ... in the order they are found, which is a reverse topological order.
+    '''
+    n = len(out_start) - 1
+    index = array('q', [-1]) * n  # order each vertex is first reached, -1 if not reached yet
+    low = array('q', [0]) * n
+    comp = array('q', [-1]) * n  # component id, -1 while the vertex is still on the SCC stack
+    comp_sizes = []
+    scc_stack = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        scc_stack.append(root)
+        call_stack = [root]
+        next_edge = [out_start[root]]
+
+        while call_stack:
+            vert = call_stack[-1]
+            e, end = next_edge[-1], out_start[vert + 1]
+            while e < end:
+                next_vert = out_verts[e]
+                e += 1
+                if index[next_vert] == -1:  # not reached yet, go explore it first
+                    break
+                if comp[next_vert] == -1 and index[next_vert] < low[vert]:  # still on SCC stack
+                    low[vert] = index[next_vert]
+            else:  # finished exploring all of vert's edges
+                call_stack.pop()
+                next_edge.pop()
+                if call_stack and low[vert] < low[call_stack[-1]]:
+                    low[call_stack[-1]] = low[vert]
+                if low[vert] == index[vert]:  # vert is the root of an SCC, pop it off the SCC stack
+                    scc_vert = None
+                    size = 0
+                    while scc_vert != vert:
+                        scc_vert = scc_stack.pop()
+                        comp[scc_vert] = len(comp_sizes)
+                        size += 1
+                    comp_sizes.append(size)
+                continue
+
+            next_edge[-1] = e
+            index[next_vert] = low[next_vert] = counter
+            counter += 1
+            scc_stack.append(next_vert)
+            call_stack.append(next_vert)
+            next_edge.append(out_start[next_vert])
+
+    return comp, comp_sizes
+
+
+def bfs_csr(out_start, out_verts, sources, targets=None):
+    '''
+       Breadth first search from all of the verts in sources at once (numbered 0..n-1), on a graph
+       in compressed sparse row form (see tarjan_scc). Rather than taking verts off a queue one at a
+       time, this expands a whole level (frontier) of the search at once with numpy: gather every
+       edge out of the frontier, keep the ones pointing to verts not reached yet, and those verts
+       (each with the first frontier vert found pointing to it as its parent) are the next frontier.
+       If targets is given, the search stops after the level where the last of them is reached.
+       Returns the tuple of arrays (hop count from the nearest source to every vert, -1 if it was not
+       reached, parent of every vert on a shortest path back to a source, -1 for sources/unreached).
+    '''
+    n = len(out_start) - 1
+    dist = np.full(n, -1, dtype=np.int64)
+    parent = np.full(n, -1, dtype=np.int64)
+    frontier = np.unique(np.asarray(sources, dtype=np.int64))
+    dist[frontier] = 0
+    if targets is not None:
+        targets = np.asarray(targets, dtype=np.int64)
+
+    level = 0
+    while len(frontier) and (targets is None or (dist[targets] == -1).any()):
+        begins = np.asarray(out_start[frontier], dtype=np.int64)
+        counts = out_start[frontier + 1] - begins
+        offsets = np.repeat(begins - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        heads = out_verts[offsets]
+        new = dist[heads] == -1
+        heads, first = np.unique(heads[new], return_index=True)
+        level += 1
+        dist[heads] = level
+        parent[heads] = np.repeat(frontier, counts)[new][first]
+        frontier = heads
+    return dist, parent
+
+
+def scc_groups(comp_ids, comp_sizes, labels=None):
+    '''
+       Turn the component ids of the verts (-1 for labels that aren't verts) and the component sizes
+       returned by compute_scc_ids into the dict of each components vertices, with the first vert of
+       each component as its leader. The verts are given by their index in comp_ids, or by labels.
+    '''
+    if len(comp_sizes) == 0:
+        return {}
+    verts = np.flatnonzero(comp_ids >= 0)
+    verts = verts[np.argsort(comp_ids[verts], kind='stable')]
+    if labels is not None:
+        verts = np.asarray(labels)[verts]
+    leaders = {}
+    for scc in np.split(verts, np.cumsum(comp_sizes)[:-1]):
+        leaders[int(scc[0])] = set(scc.tolist())
+    return leaders
+
+
+# globals for the worker processes of CSRGraph.compute_scc_ids_parallel, set by init_scc_worker
+shared_blocks = []
+scc_cutoff = 0
+
+
+def init_scc_worker(shared_arrays, serial_cutoff):
+    ''' Pool initializer, attach to the shared memory graph arrays by their block names. '''
+    global out_start, out_verts, in_start, in_verts, part, comp, scc_cutoff
+
+    views = []
+    for name, shape, dtype in shared_arrays:
+        block = shared_memory.SharedMemory(name=name)
+        shared_blocks.append(block)  # keep a reference to the block so our view stays valid
+        views.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+    out_start, out_verts, in_start, in_verts, part, comp = views
+    scc_cutoff = serial_cutoff
+
+
+def edges_within(start, verts_arr, tails, part_id):
+    '''
+       Gather all edges out of the array of verts tails from the graph in CSR form (start, verts_arr),
+       keeping only those pointing to a vert of subproblem part_id. Returns the tuple of arrays
+       (position in tails of the tail of each edge, head vert of each edge).
+    '''
+    begins = start[tails].astype(np.int64)
+    counts = start[tails + 1] - begins
+    offsets = np.repeat(begins - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    heads = verts_arr[offsets]
+    keep = part[heads] == part_id
+    return np.repeat(np.arange(len(tails)), counts)[keep], heads[keep]
+
+
+def reach_within(start, verts_arr, verts, part_id, pivot):
+    '''
+       Breadth first search from position pivot of the sorted array verts (all verts of subproblem
+       part_id), one whole frontier at a time, only following edges between verts of the subproblem.
+       Returns the boolean mask of the verts reached.
+    '''
+    reached = np.zeros(len(verts), dtype=bool)
+    reached[pivot] = True
+    frontier = verts[pivot:pivot+1]
+    while len(frontier):
+        _, heads = edges_within(start, verts_arr, frontier, part_id)
+        heads = np.searchsorted(verts, heads)
+        heads = np.unique(heads[~reached[heads]])
+        reached[heads] = True
+        frontier = verts[heads]
+    return reached
+
+
+def scc_worker(task):
+    '''
+       Find the SCCs of one subproblem of CSRGraph.compute_scc_ids_parallel, given as the sorted
+       array of its verts and its id in the shared part array (edges only count between verts with
+       the same part id). Every vert is labelled in the shared comp array with the smallest vert of
+       its SCC once its SCC is found, and taken out of the subproblems (part id -1). Returns the list
+       of new subproblems still left to solve, as (verts, part id) tasks.
+    '''
+    verts, part_id = task
+
+    # trim the trivial SCCs first: a vert with no edges in or out within the subproblem can't be
+    # on any cycle, so it is an SCC on its own. trimming one can make its neighbors trivial too,
+    # so keep going until a round doesn't trim much, and leave the rest for the pivot splits
+    while len(verts) > scc_cutoff:
+        tails, _ = edges_within(out_start, out_verts, verts, part_id)
+        heads, _ = edges_within(in_start, in_verts, verts, part_id)
+        trivial = (np.bincount(tails, minlength=len(verts)) == 0) | \
+                  (np.bincount(heads, minlength=len(verts)) == 0)
+        comp[verts[trivial]] = verts[trivial]
+        part[verts[trivial]] = -1
+        verts = verts[~trivial]
+        if np.count_nonzero(trivial) <= len(verts) // 100:
+            break
+
+    if len(verts) == 0:
+        return []
+
+    if len(verts) <= scc_cutoff:
+        # small enough to just run tarjan's algo on the subgraph of these verts
+        tails, heads = edges_within(out_start, out_verts, verts, part_id)
+        sub_start = np.zeros(len(verts) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=len(verts)), out=sub_start[1:])
+        sub_comp, sub_sizes = tarjan_scc(sub_start.tolist(), np.searchsorted(verts, heads).tolist())
+        sub_comp = np.frombuffer(sub_comp, dtype=np.int64)
+        leaders = np.full(len(sub_sizes), len(part), dtype=np.int64)
+        np.minimum.at(leaders, sub_comp, verts)
+        comp[verts] = leaders[sub_comp]
+        part[verts] = -1
+        return []
+
+    # the SCC of the pivot is every vert it can reach that can also reach it. every other SCC is
+    # entirely within the verts only it can reach, only reaching it, or neither, so those three
+    # sets of verts are independent subproblems
+    pivot = 0
+    forwards = reach_within(out_start, out_verts, verts, part_id, pivot)
+    backwards = reach_within(in_start, in_verts, verts, part_id, pivot)
+    scc = forwards & backwards
+    comp[verts[scc]] = verts[pivot]
+    part[verts[scc]] = -1
+
+    # the pivot is never reused, so the new part ids can't clash with any other subproblem
+    tasks = []
+    for i, sub in enumerate([forwards & ~scc, backwards & ~scc, ~(forwards | backwards)], 1):
+        if sub.any():
+            part[verts[sub]] = 3*int(verts[pivot]) + i
+            tasks.append((verts[sub], 3*int(verts[pivot]) + i))
+    return tasks
 
 
 class Graph:
@@ -53,6 +286,31 @@ class Graph:
         self.__update_vert__(vert2, 1)
 
 
+    def add_edges(self, tails, heads):
+        '''
+           Add many edges to the graph at once, pointing from tails[i] to heads[i], given as numpy
+           arrays (i.e. from graph_loader). Same result as calling add_edge on each pair, but
+           without the overhead of two method calls per edge.
+        '''
+        if len(tails) == 0:
+            return
+        vertices, edges = self.vertices, self.edges
+        edge = self.num_edges
+        for vert1, vert2 in zip(tails.tolist(), heads.tolist()):
+            edge += 1
+            edges[edge] = [vert1, vert2]
+            if vert1 not in vertices:
+                vertices[vert1] = [set(), set()]
+            vertices[vert1][0].add(edge)
+            if vert2 not in vertices:
+                vertices[vert2] = [set(), set()]
+            vertices[vert2][1].add(edge)
+
+        self.num_edges = edge
+        self.num_verts = len(vertices)
+        self.max_vert = max(self.max_vert, int(tails.max()), int(heads.max()))
+
+
     def add_vert(self, vert):
         ''' Add a vertex to the graph not connected to any edges '''
         if vert not in self.vertices:
@@ -62,104 +320,400 @@ class Graph:
             self.vertices[vert] = [set(), set()]
 
 
-    def BFS(self, start: int, forwards=True):
-        ''' Breadth first search from start vertex. Can search reverse graph with forwards=False '''
-        # initialize all vertices as unexplored except for start vertex
-        explored = set()
+    def BFS(self, start, forwards=True, targets=None):
+        '''
+           Breadth first search from start vertex, or from every vertex in start at once if it is a list
+           (or array) of verts. Can search reverse graph with forwards=False, and stop as soon as all of
+           the verts in targets are reached. The edges are laid out in CSR arrays first, and then the
+           search is done a whole level at a time (see bfs_csr). Return the tuple of arrays (hop count
+           to every vert, parent vert of every vert on a shortest path), indexed by vert label, with -1
+           for unreached verts (and labels that aren't verts) and for the parents of the start verts.
+           Raises a KeyError if start or targets has a label that isn't a vert of the graph.
+        '''
+        labels, vert_index, out_start, out_verts = self.__csr_arrays__(forwards)
+        def vert_indices(verts):
+            ''' Return the numbers of the verts labelled verts, KeyError if one isn't a vert. '''
+            verts = np.atleast_1d(np.asarray(verts, dtype=np.int64))
+            for vert in verts.tolist():
+                if vert not in self.vertices:
+                    raise KeyError(vert)
+            return vert_index[verts]
+
+        sources = vert_indices(start)
+        if targets is not None:
+            targets = vert_indices(targets)
+        dist, parent = bfs_csr(out_start, out_verts, sources, targets)
+
+        label_dist = np.full(len(vert_index), -1, dtype=np.int64)
+        label_dist[labels] = dist
+        label_parent = np.full(len(vert_index), -1, dtype=np.int64)
+        label_parent[labels] = np.where(parent >= 0, labels[parent], -1)
+        return label_dist, label_parent
+
+
+    def DFS(self, start, forwards=True, explored=None):
+        '''
+           Depth first search from start vertex. Can search reverse graph with forwards=False. This DFS
+           method uses an iterative search rather than a recursive search as this is more memory efficient
+           for large graphs. To still get the right finishing order, each vertex is kept on the stack
+           along with an iterator over its remaining edges, and it only comes off the stack (finishes)
+           once all of those edges have been looked at. The set of explored verts can be passed in to
+           continue a search over several start verts. Return the list of verts in order of finish time.
+        '''
+        if explored is None:
+            explored = set()
         explored.add(start)
+        finished = []
+        side = (int(forwards)+1)%2  # which set of edges to follow, outgoing (0) or incoming (1)
+        verts = [(start, iter(self.vertices[start][side]))]
 
-        # initialize queue to track next vertices to explore, enqueue start vertex
-        verts = Queue()
-        verts.enqueue(start)
-
-        # while queue is not empty, keep exploring vertices
-        while not verts.is_empty():
-            # dequeue next vertex and try to explore any incident edges it has
-            vert = verts.dequeue()
-
-            # go through all edges outgoing from this vertex
-            for edge in self.vertices[vert][0]:
-                # get vertex corresponding to this edge
-                # if going through G, current vert will be 1st; next_vert is in pos 1 (True)
-                # if going through G_rev, current vert will be 2nd; next_vert is in pos 0 (False)
-                next_vert = self.edges[edge][forwards]
-
-                # only interested in unexplored vertices
-                if next_vert in explored:
-                    continue
-
-                # this is a vertex of interest, mark as explored and add to queue
-                explored.add(next_vert)
-                verts.enqeue(next_vert)
-
-
-    def DFS(self, start, forwards=True):
-        '''
-           Depth first search from start vertex, helper method for compute_scc. Can search reverse graph
-           with forwards=False. This DFS method uses an iterative search rather than a recursive search
-           as this is more memory efficient for large graphs, though tracking the finishing time bcomes
-           slightly more tricky. Instead of tracking just if a node is explored or not, we also need to
-           track a third status, "explored but not finished". This is particularly important in cases
-           where we take a vertex from the top of the stack, and see that all of it's neighbors have
-           already been explored - are all of it's neighbors actually finished being explored or are
-           they possibly still in the stack waiting to be assigned a finish time?
-        '''
-        global leaders, leader, finish_times, finish_time, explored
-
-        verts = Stack()
-        verts.push(start)
-        if forwards:  # we only care about tracking leaders in forwards pass through graph
-            leaders[leader] = {start}
-
-        while not verts.is_empty():
-            vert = verts.top()  # which vertex is currently first in the stack
-            if vert not in explored:
-                # haven't "explored" yet - add all neighbors to stack if they haven't been explored yet
-                # note here we may be double adding vertices to the stack, but when we get to it again
-                # we will check if it's already been explored and if so we mark it's finish time if needed
-                explored.add(vert)
-                for edge in self.vertices[vert][(int(forwards)+1)%2]:
-                    next_vert = self.edges[edge][int(forwards)]
-                    if next_vert not in explored:
-                        if forwards:  # we only care about tracking leaders in forwards pass
-                            leaders[leader].add(next_vert)
-                        verts.push(next_vert)
-            else:
-                # completely finished exploring this node, remove from stack, set finishing time if needed
-                # on first pass through, we set every nodes finish time, so on forward pass through graph
-                # we will never set any finishing times
+        while verts:
+            vert, edges = verts[-1]
+            for edge in edges:
+                next_vert = self.edges[edge][int(forwards)]
+                if next_vert not in explored:  # found an unexplored neighbor, explore it next
+                    explored.add(next_vert)
+                    verts.append((next_vert, iter(self.vertices[next_vert][side])))
+                    break
+            else:  # completely finished exploring this vertex
                 verts.pop()
-                if vert not in finish_times:
-                    finish_time += 1
-                    finish_times[vert] = finish_time
+                finished.append(vert)
+        return finished
+
+
+    def __csr_arrays__(self, forwards=True):
+        '''
+           Helper function to number the verts 0..n-1 (in the order they were added to the graph)
+           and lay out their outgoing (or incoming with forwards=False) edges in compressed sparse
+           row form, so the edges of vert i point to the verts at out_verts[out_start[i]:out_start[i+1]].
+           The edge ids are gathered with numpy, rather than looking each edge up one at a time.
+           Return the tuple of arrays (labels, vert_index, out_start, out_verts), where labels[i]
+           is the label of vert i, and vert_index[label] is the number of that vert (or -1).
+        '''
+        side = (int(forwards)+1)%2
+        labels = np.fromiter(self.vertices, dtype=np.int64, count=len(self.vertices))
+        vert_index = np.full(int(labels.max()) + 1, -1, dtype=np.int64)
+        vert_index[labels] = np.arange(len(labels))
+
+        out_sizes = np.fromiter((len(edges[side]) for edges in self.vertices.values()),
+                                dtype=np.int64, count=len(labels))
+        out_start = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(out_sizes, out=out_start[1:])
+        out_edges = np.fromiter(chain.from_iterable(edges[side] for edges in self.vertices.values()),
+                                dtype=np.int64, count=int(out_start[-1]))
+
+        # look up the vert at the other end of every edge, by edge id
+        edge_ids = np.fromiter(self.edges, dtype=np.int64, count=len(self.edges))
+        edge_verts = np.zeros(int(edge_ids.max(initial=0)) + 1, dtype=np.int64)
+        edge_verts[edge_ids] = np.fromiter((edge[int(forwards)] for edge in self.edges.values()),
+                                           dtype=np.int64, count=len(edge_ids))
+        return labels, vert_index, out_start, vert_index[edge_verts[out_edges]]
+
+
+    def compute_scc_ids(self):
+        '''
+           This function computes the strongly connected components of this graph using Tarjan's
+           single pass algorithm (see tarjan_scc), after numbering the verts 0..n-1 and laying out
+           their outgoing edges in CSR arrays. Return the tuple (array of the component id of every
+           vert, indexed by vert label, with -1 for labels that aren't verts of the graph, array of
+           the size of every component), so we can i.e. read off the largest component sizes without
+           building a set of verts for every component.
+        '''
+        if not self.vertices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        labels, vert_index, out_start, out_verts = self.__csr_arrays__()
+
+        comp, comp_sizes = tarjan_scc(out_start.tolist(), out_verts.tolist())
+        comp_ids = np.full(len(vert_index), -1, dtype=np.int64)
+        comp_ids[labels] = np.frombuffer(comp, dtype=np.int64)
+        return comp_ids, np.array(comp_sizes, dtype=np.int64)
 
 
     def compute_scc(self):
         '''
-           This function computes the strongly connected components of this graph using Kosarju's 2-pass
-           algorithm. Return the dict of each components vertices (each with an arbitrary leader as key).
+           This function computes the strongly connected components of this graph (see compute_scc_ids).
+           Return the dict of each components vertices (each with an arbitrary leader as key).
         '''
-        global leaders, leader, finish_times, finish_time, explored
+        comp_ids, comp_sizes = self.compute_scc_ids()
+        return scc_groups(comp_ids, comp_sizes)
+
+
+class CSRGraph:
+    '''
+       This is an immutable DIRECTED graph (optionally weighted) stored in compressed sparse row
+       (CSR) form, for graphs too big for the dict of sets representation of Graph above (which
+       needs several python objects per edge). The vertices are numbered 0..n-1 internally, with
+       labels[i] the original label of vertex i (in sorted order, so vert_id can look labels up
+       by binary search). The edges pointing out of vertex i are at positions
+       out_start[i]:out_start[i+1] of out_verts (their dest vertex) and out_weights (their weight,
+       if the graph is weighted). All of these are flat numpy arrays (int32 for the offsets and
+       verts), so the whole graph is only a handful of python objects. The reverse graph (edges
+       pointing INTO each vertex) is built the first time it is needed, and is itself a CSRGraph.
+       Build one with CSRGraphBuilder below.
+    '''
+    def __init__(self, labels, out_start, out_verts, out_weights=None):
+        self.labels = labels
+        self.out_start = out_start
+        self.out_verts = out_verts
+        self.out_weights = out_weights
+        for arr in [labels, out_start, out_verts, out_weights]:
+            if arr is not None:
+                arr.flags.writeable = False
+        self.num_verts = len(labels)
+        self.num_edges = len(out_verts)
+        self.rev = None  # reverse graph, built on demand
+
+
+    def save(self, fname):
+        ''' Save this graph to the binary file fname, to be memory mapped back with load_csr_graph. '''
+        write_arrays(fname, [self.labels, self.out_start, self.out_verts, self.out_weights],
+                     key='CSRGraph')
+
+
+    def vert_id(self, vert):
+        ''' Return the internal vertex number of the vertex labelled vert, None if not in graph. '''
+        i = int(np.searchsorted(self.labels, vert))
+        if i < self.num_verts and self.labels[i] == vert:
+            return i
+        return None
+
+
+    def out_edges(self, i):
+        ''' Return views of the dest verts (and weights) of edges pointing out of vertex i. '''
+        start, end = self.out_start[i], self.out_start[i + 1]
+        if self.out_weights is None:
+            return self.out_verts[start:end], None
+        return self.out_verts[start:end], self.out_weights[start:end]
+
+
+    def reverse(self):
+        ''' Return the reverse of this graph (every edge pointing the other way), built once. O(m) '''
+        if self.rev is None:
+            tails = np.repeat(np.arange(self.num_verts, dtype=np.int32), np.diff(self.out_start))
+            order = np.argsort(self.out_verts, kind='stable')
+            in_start = np.zeros(self.num_verts + 1, dtype=np.int32)
+            np.cumsum(np.bincount(self.out_verts, minlength=self.num_verts), out=in_start[1:])
+            in_weights = None if self.out_weights is None else self.out_weights[order]
+            self.rev = CSRGraph(self.labels, in_start, tails[order], in_weights)
+            self.rev.rev = self
+        return self.rev
+
+
+    def BFS(self, start, forwards=True, targets=None):
+        '''
+           Breadth first search from start vertex (a label), or from every vertex in start at once if it
+           is a list (or array) of labels. Can search reverse graph with forwards=False, and stop as soon
+           as all of the labels in targets are reached. The search is done a whole level at a time (see
+           bfs_csr). Return the tuple of arrays (hop count to every vert, parent of every vert on a
+           shortest path), by internal number, with -1 for unreached verts and the start verts' parents.
+           Raises a ValueError if start or targets has a label that isn't a vertex of the graph.
+        '''
+        def vert_ids(verts):
+            ''' Return the internal numbers of the labels verts, ValueError if one isn't a vert. '''
+            verts = np.atleast_1d(verts)
+            ids = np.searchsorted(self.labels, verts)
+            found = ids < self.num_verts
+            found[found] = self.labels[ids[found]] == verts[found]
+            if not found.all():
+                raise ValueError('Warning: vertex {0} is not in the graph'.format(verts[~found][0]))
+            return ids
+
+        graph = self if forwards else self.reverse()
+        sources = vert_ids(start)
+        if targets is not None:
+            targets = vert_ids(targets)
+        return bfs_csr(graph.out_start, graph.out_verts, sources, targets)
+
+
+    def DFS(self, start, forwards=True, explored=None):
+        '''
+           Iterative depth first search from start vertex (internal number), helper method for
+           compute_scc. Can search reverse graph with forwards=False. Vertices already marked in the
+           boolean array explored (if given) are not searched again, and it is updated in place.
+           Instead of pushing every neighbor onto the stack, we keep each vertex on the stack along
+           with the position of the next of its edges to look at, so a vertex is only ever on the
+           stack once, and is finished exactly when it's popped. Returns the list of vertices
+           reached, in the order they were finished.
+        '''
+        graph = self if forwards else self.reverse()
+        out_start, out_verts = memoryview(graph.out_start), memoryview(graph.out_verts)
+        if explored is None:
+            explored = np.zeros(self.num_verts, dtype=bool)
+
+        finished = []
+        explored[start] = True
+        verts = [start]
+        next_edge = [out_start[start]]
+        while verts:
+            vert = verts[-1]
+            e, end = next_edge[-1], out_start[vert + 1]
+            while e < end and explored[out_verts[e]]:
+                e += 1
+            if e < end:  # found an unexplored neighbor, explore it next
+                next_edge[-1] = e + 1
+                next_vert = out_verts[e]
+                explored[next_vert] = True
+                verts.append(next_vert)
+                next_edge.append(out_start[next_vert])
+            else:  # completely finished exploring this vertex
+                verts.pop()
+                next_edge.pop()
+                finished.append(vert)
+        return finished
+
+
+    def compute_scc_ids(self):
+        '''
+           This function computes the strongly connected components of this graph using Tarjan's
+           single pass algorithm (see tarjan_scc), directly on the CSR arrays. Return the tuple
+           (array of the component id of every vert, by internal index, array of component sizes).
+        '''
+        comp, comp_sizes = tarjan_scc(memoryview(self.out_start), memoryview(self.out_verts))
+        return np.frombuffer(comp, dtype=np.int64), np.array(comp_sizes, dtype=np.int64)
+
+
+    def compute_scc(self):
+        '''
+           This function computes the strongly connected components of this graph (see compute_scc_ids).
+           Return the dict of each components vertices (by label, each with an arbitrary leader as key).
+        '''
+        comp_ids, comp_sizes = self.compute_scc_ids()
+        return scc_groups(comp_ids, comp_sizes, self.labels)
+
+
+    def compute_scc_ids_parallel(self, num_workers=4, serial_cutoff=2**14):
+        '''
+           This method finds the same SCCs as compute_scc_ids above, but spreads the work over a pool
+           of num_workers processes, for graphs so big that a single DFS pass is the bottleneck. It
+           uses the forward-backward decomposition: first trim the trivial SCCs (verts with no edges
+           in or no edges out), then pick a pivot vert; its SCC is every vert it reaches that also
+           reaches it (two breadth first searches, which unlike DFS can be done a whole frontier at a
+           time with numpy). The verts reached only forwards, only backwards, or not at all can't share
+           an SCC with each other, so they are three independent subproblems, which are handed back
+           to the pool. Subproblems of at most serial_cutoff verts are just solved with tarjan_scc.
+           The graph and reverse graph CSR arrays, along with the array of subproblem ids ("colors")
+           and the component array, are in shared memory, which every worker attaches to once when
+           the pool starts. Workers only ever write to the verts of their own subproblem. Components
+           are numbered by their smallest vert, so compute_scc_parallel gives the exact same dict as
+           compute_scc. Return the tuple (array of the component id of every vert, by internal index,
+           array of component sizes). NOTE: multiprocessing needs the standard library queue module,
+           so this can't run from a folder that has its own queue.py first in the path (which is why
+           the queue class of this folder lives in linked_queue.py).
+        '''
+        rev = self.reverse()
+        csr_arrays = [self.out_start, self.out_verts, rev.out_start, rev.out_verts,
+                      np.zeros(self.num_verts, dtype=np.int64),  # part id of every vert
+                      np.full(self.num_verts, -1, dtype=np.int64)]  # smallest vert of its SCC
+
+        # copy the graph arrays into shared memory blocks, which the workers look up by name
+        blocks = []
+        shared_arrays = []
+        try:
+            for arr in csr_arrays:
+                block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[:] = arr
+                shared_arrays.append((block.name, arr.shape, arr.dtype.str))
+
+            # hand out new subproblems as soon as they are found, so no worker waits on the others
+            with Pool(num_workers, initializer=init_scc_worker,
+                      initargs=(shared_arrays, serial_cutoff)) as pool:
+                pending = deque([pool.apply_async(scc_worker, ((np.arange(self.num_verts), 0),))])
+                while pending:
+                    for task in pending.popleft().get():
+                        pending.append(pool.apply_async(scc_worker, (task,)))
+            leaders = np.ndarray(self.num_verts, dtype=np.int64, buffer=blocks[-1].buf).copy()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        _, comp_ids, comp_sizes = np.unique(leaders, return_inverse=True, return_counts=True)
+        return comp_ids, comp_sizes
+
+
+    def compute_scc_parallel(self, num_workers=4):
+        '''
+           This function computes the strongly connected components of this graph in parallel (see
+           compute_scc_ids_parallel). Return the same dict as compute_scc.
+        '''
+        comp_ids, comp_sizes = self.compute_scc_ids_parallel(num_workers)
+        return scc_groups(comp_ids, comp_sizes, self.labels)
+
+
+def load_csr_graph(fname):
+    '''
+       Memory map a CSRGraph back from the binary file fname written by CSRGraph.save, which is
+       near instant no matter how big the graph is. Returns None if fname is not a saved CSRGraph.
+    '''
+    arrays = read_arrays(fname, key='CSRGraph')
+    if arrays is None:
+        return None
+    return CSRGraph(*arrays)
+
+
+class CSRGraphBuilder:
+    '''
+       Collects the edges of a graph, either one at a time with the same add_edge/add_vert calls
+       as Graph above, or in bulk as numpy arrays with add_edges, and then builds them into a
+       CSRGraph in one go. Single edges are kept in compact typed arrays, not python lists.
+    '''
+    def __init__(self, weighted=False):
+        self.weighted = weighted
+        self.tails = array('q')
+        self.heads = array('q')
+        self.weights = array('d')
+        self.verts = array('q')  # verts added on their own, which may not have any edges
+        self.chunks = []  # (tails, heads, weights) arrays added in bulk
+
+
+    def add_edge(self, vert1: int, vert2: int, weight=None):
+        ''' Add a new edge to the graph pointing from vert1 to vert2 (weighing weight). '''
+        self.tails.append(vert1)
+        self.heads.append(vert2)
+        if self.weighted:
+            self.weights.append(weight)
+
+
+    def add_vert(self, vert: int):
+        ''' Add a vertex to the graph not connected to any edges. '''
+        self.verts.append(vert)
+
 
-        leaders = {}
-        leader = 0
-        finish_times = {}
-        finish_time = 0
-        explored = set()
+    def add_edges(self, tails, heads, weights=None):
+        ''' Add many edges at once, pointing from tails[i] to heads[i] (weighing weights[i]). '''
+        tails, heads = np.asarray(tails, dtype=np.int64), np.asarray(heads, dtype=np.int64)
+        if self.weighted:
+            weights = np.asarray(weights, dtype=np.float64)
+        self.chunks.append((tails, heads, weights))
 
-        # DFS on reverse of graph first from all nodes until all have been explored
-        for vert in self.vertices:
-            if vert not in explored:
-                fin = self.DFS(start=vert, forwards=False)
 
-        # reset explored verts to all being unexplored initially
-        explored = set()
+    def build(self):
+        ''' Return a CSRGraph of all of the edges and verts added so far. O(m*log(m)) '''
+        tails = np.concatenate([np.frombuffer(self.tails, dtype=np.int64)] + [c[0] for c in self.chunks])
+        heads = np.concatenate([np.frombuffer(self.heads, dtype=np.int64)] + [c[1] for c in self.chunks])
 
-        # DFS on original graph checking all verts from largest finish time to smallest
-        for vert in sorted([[t,v] for v,t in finish_times.items()], reverse=True):
-            if vert[1] not in explored:
-                leader = vert[1]
-                self.DFS(start=vert[1])  # passing through graph forwards, we will track leaders
+        # number the verts 0..n-1 in order of their labels, and order the edges by tail vertex
+        all_verts = np.concatenate((tails, heads, np.frombuffer(self.verts, dtype=np.int64)))
+        if len(all_verts) > 0 and all_verts.min() >= 0 and all_verts.max() < 4*len(all_verts):
+            # labels are (mostly) 0..n, like all our data files, so mark which labels are used
+            # in an array and number them with a running count, which is much faster than sorting
+            used = np.zeros(all_verts.max() + 1, dtype=bool)
+            used[all_verts] = True
+            labels = np.flatnonzero(used)
+            label_ids = (np.cumsum(used) - 1).astype(np.int32)
+            tails, heads = label_ids[tails], label_ids[heads]
+        else:
+            labels = np.unique(all_verts)
+            tails = np.searchsorted(labels, tails).astype(np.int32)
+            heads = np.searchsorted(labels, heads).astype(np.int32)
+        order = np.argsort(tails, kind='stable')
+        out_start = np.zeros(len(labels) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(tails, minlength=len(labels)), out=out_start[1:])
 
-        # the SCC's are now contained in the leaders dict
-        return leaders
+        out_weights = None
+        if self.weighted:
+            weights = np.concatenate([np.frombuffer(self.weights, dtype=np.float64)] + \
+                                     [c[2] for c in self.chunks])
+            out_weights = weights[order]
+        return CSRGraph(labels, out_start, heads[order], out_weights)
@@ -0,0 +1,177 @@
+'''
+    my implementation of a bulk loader for the graph data files used throughout the courses.
+    instead of parsing the files line by line with [int(v) for v in line.split()] and adding
+    one edge at a time, the whole file is parsed into typed numpy arrays at once, using numpy's
+    C-level text parsing (np.fromstring with a separator, which treats any whitespace - spaces,
+    tabs and newlines alike - as the separator). large files are read in chunks so we never
+    hold more than one chunk of raw text in memory at a time. the arrays can then be handed to
+    a graph's add_edges method to build the whole graph in one call. formats handled:
+      - edge lists, one edge per line as "tail head" or "tail head cost" (scc.txt, g1.txt, ...)
+      - any of these with a header line first (g1.txt has "n m", 2sat1.txt has "n", ...)
+      - adjacency lists, one vertex per line as "v\tdest,cost\tdest,cost..." (dijkstraData.txt)
+        or without costs as "v\tdest\tdest..." (kargerMinCut.txt)
+    since we rerun the drivers over and over on the same inputs, the loaders can also cache the
+    parsed arrays in a binary file next to the input (fname.gcache), which is just memory mapped
+    back on the next run instead of parsing the text again. the cache remembers the path, size
+    and modification time of the input file (and how it was parsed), so if the input changes the
+    cache is simply rebuilt. the same binary format (see write_arrays/read_arrays) can be used to
+    save any set of graph arrays, i.e. a CSRGraph from graph.py.
+'''
+
+import json
+import numpy as np
+import os
+
+
+# binary array files start with these magic bytes, then a json header line describing the arrays
+# (and the key they were saved with), padded with spaces so the raw arrays that follow it start
+# on a 64 byte boundary, which memory maps nicely
+ARRAYS_MAGIC = b'GRAPHARR'
+
+
+def write_arrays(fname, arrays, key=None):
+    '''
+       Save the list of numpy arrays (entries may also be None) to the binary file fname, along
+       with key (anything json can hold). The file is written under a temporary name first and
+       then renamed, so a crash partway through never leaves a half written file behind.
+    '''
+    specs = []
+    offset = 0
+    for arr in arrays:
+        if arr is None:
+            specs.append(None)
+            continue
+        arr = np.ascontiguousarray(arr)
+        specs.append([arr.dtype.str, list(arr.shape), offset])
+        offset += -(-arr.nbytes // 64) * 64  # keep every array 64 byte aligned
+
+    header = json.dumps({'key': key, 'arrays': specs}).encode() + b'\n'
+    header_size = -(-(len(ARRAYS_MAGIC) + len(header)) // 64) * 64
+    with open(fname + '.tmp', 'wb') as arrays_file:
+        arrays_file.write(ARRAYS_MAGIC + header.ljust(header_size - len(ARRAYS_MAGIC)))
+        for arr, spec in zip(arrays, specs):
+            if spec is None:
+                continue
+            arrays_file.seek(header_size + spec[2])
+            np.ascontiguousarray(arr).tofile(arrays_file)
+        arrays_file.truncate(header_size + offset)
+    os.replace(fname + '.tmp', fname)
+
+
+def read_arrays(fname, key=None):
+    '''
+       Memory map (read only) the list of arrays saved in binary file fname by write_arrays. If key
+       is given, it has to match the key the arrays were saved with. Returns None if the file does
+       not exist, is not a binary array file, or the key doesn't match.
+    '''
+    if not os.path.exists(fname):
+        return None
+    with open(fname, 'rb') as arrays_file:
+        if arrays_file.read(len(ARRAYS_MAGIC)) != ARRAYS_MAGIC:
+            return None
+        header = json.loads(arrays_file.readline())
+        header_size = -(-arrays_file.tell() // 64) * 64
+    if key is not None and header['key'] != key:
+        return None
+
+    arrays = []
+    for spec in header['arrays']:
+        if spec is None:
+            arrays.append(None)
+        elif np.prod(spec[1]) == 0:  # can't memory map an empty array
+            arrays.append(np.zeros(spec[1], dtype=spec[0]))
+        else:
+            arrays.append(np.memmap(fname, dtype=spec[0], mode='r', offset=header_size + spec[2],
+                                    shape=tuple(spec[1])))
+    return arrays
+
+
+def cache_key(fname, *args):
+    ''' Return the key identifying this version of input file fname, parsed with args. '''
+    stat = os.stat(fname)
+    return [os.path.abspath(fname), stat.st_size, stat.st_mtime_ns] + list(args)
+
+
+def read_ints(fname, header=False, chunk_size=2**26):
+    '''
+       Parse all of the whitespace separated integers in file fname into a single int64 array,
+       reading chunk_size bytes at a time. If header is True, the first line is parsed on its own
+       and returned separately. Returns the tuple (header values array or None, values array).
+    '''
+    header_vals = None
+    chunks = []
+    with open(fname, 'rb') as data:
+        if header:
+            header_vals = np.fromstring(data.readline(), dtype=np.int64, sep=' ')
+
+        leftover = b''
+        while True:
+            chunk = data.read(chunk_size)
+            if not chunk:
+                break
+            # only parse up to the last whitespace in this chunk, so we don't split a number in two
+            chunk = leftover + chunk
+            cut = max(chunk.rfind(b'\n'), chunk.rfind(b' '), chunk.rfind(b'\t')) + 1
+            leftover = chunk[cut:]
+            chunks.append(np.fromstring(chunk[:cut], dtype=np.int64, sep=' '))
+        chunks.append(np.fromstring(leftover, dtype=np.int64, sep=' '))
+
+    return header_vals, np.concatenate(chunks)
+
+
+def load_edge_list(fname, num_cols=2, header=False, cache=False):
+    '''
+       Load an edge list file with num_cols integers per line (2 for "tail head", 3 for
+       "tail head cost"), optionally with a header line first. Returns the tuple (header values
+       array or None, list of num_cols column arrays), i.e. (header, [tails, heads, costs]).
+       With cache=True, the arrays are memory mapped from fname.gcache if it is up to date.
+    '''
+    if cache:
+        key = cache_key(fname, 'edge_list', num_cols, header)
+        arrays = read_arrays(fname + '.gcache', key)
+        if arrays is None:
+            header_vals, cols = load_edge_list(fname, num_cols, header)
+            write_arrays(fname + '.gcache', [header_vals] + cols, key)
+            return header_vals, cols
+        return arrays[0], arrays[1:]
+
+    header_vals, vals = read_ints(fname, header)
+    if len(vals) % num_cols != 0:
+        raise ValueError('Warning: {0} does not have {1} values on every line'.format(fname, num_cols))
+    return header_vals, list(vals.reshape(-1, num_cols).T)
+
+
+def load_adjacency_list(fname, weighted=True, cache=False):
+    '''
+       Load an adjacency list file, with one vertex per line followed by the verts it points to,
+       each as "dest,cost" if weighted, or just "dest" if not. Returns the tuple of arrays
+       (tails, heads, costs) if weighted, else (tails, heads). Each line is parsed with a single
+       numpy call, and the edge arrays are put together at the end. With cache=True, the arrays
+       are memory mapped from fname.gcache if it is up to date.
+    '''
+    if cache:
+        key = cache_key(fname, 'adjacency_list', weighted)
+        arrays = read_arrays(fname + '.gcache', key)
+        if arrays is None:
+            arrays = load_adjacency_list(fname, weighted)
+            write_arrays(fname + '.gcache', arrays, key)
+        return tuple(arrays)
+
+    tails, heads, costs = [], [], []
+    with open(fname, 'rb') as data:
+        for line in data:
+            vals = np.fromstring(line.replace(b',', b' '), dtype=np.int64, sep=' ')
+            if len(vals) == 0:  # blank line
+                continue
+            if weighted:
+                heads.append(vals[1::2])
+                costs.append(vals[2::2])
+            else:
+                heads.append(vals[1:])
+            tails.append(np.full(len(heads[-1]), vals[0], dtype=np.int64))
+
+    if not tails:
+        tails = heads = costs = [np.zeros(0, dtype=np.int64)]
+    if weighted:
+        return np.concatenate(tails), np.concatenate(heads), np.concatenate(costs)
+    return np.concatenate(tails), np.concatenate(heads)